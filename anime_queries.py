@@ -0,0 +1,136 @@
+from functools import lru_cache
+from typing import Any, List, Optional, Tuple
+
+from pagination import keyset_branches, keyset_page_query, order_clause
+
+# 总数列名 - 由 split_total 从结果行中移除
+TOTAL_COLUMN = "total_count"
+
+
+# 检索模式 - fuzzy 依赖 pg_trgm (db_schema.trigram_ready)
+SEARCH_MODES = ("substring", "fuzzy")
+
+# fuzzy 检索的排序 (参数为检索词)
+FUZZY_ORDER = "word_similarity(%s, title) DESC, id ASC"
+
+# 列表查询的形状数量有限 (过滤条件组合 x 排序列 x 方向 x 分页方式)，上限仅用于防御；
+# 同时用于 SQL 文本缓存、预编译语句注册表 (statements) 与慢查询形状汇总 (slow_query)
+MAX_QUERY_SHAPES = 512
+
+
+def filter_terms(search=None, year_from=None, year_to=None, rating_from=None, rating_to=None,
+                 search_mode: str = "substring") -> Tuple[Tuple[str, ...], List[Any]]:
+    """列表查询的过滤条件 (psycopg2 占位符) 与参数；条件元组即查询形状的一部分"""
+    conditions = []
+    params = []
+
+    # 搜索过滤 - 存在 pg_trgm GIN 索引时 ILIKE 会直接使用它
+    if search and search_mode == "fuzzy":
+        conditions.append("%s <%% title")
+        params.append(search)
+    elif search:
+        conditions.append("title ILIKE %s")
+        params.append(f"%{search}%")
+
+    # 年份过滤
+    if year_from is not None:
+        conditions.append("year >= %s")
+        params.append(year_from)
+    if year_to is not None:
+        conditions.append("year <= %s")
+        params.append(year_to)
+
+    # 评分过滤
+    if rating_from is not None:
+        conditions.append("average_rating >= %s")
+        params.append(rating_from)
+    if rating_to is not None:
+        conditions.append("average_rating <= %s")
+        params.append(rating_to)
+
+    return tuple(conditions), params
+
+
+@lru_cache(maxsize=MAX_QUERY_SHAPES)
+def list_query_text(table: str, sort_by: str, sort_order: str, include_total: bool,
+                    conditions: Tuple[str, ...], fuzzy: bool, branch_kinds: Optional[Tuple[str, ...]]) -> str:
+    """一种查询形状的 SQL 文本；取值只以占位符出现，同一形状的请求复用同一字符串
+
+    branch_kinds 为 None 时按 OFFSET 分页，否则为游标之后各 keyset 分支的种类。
+    """
+    where_clause = " AND ".join(conditions) or "TRUE"
+    order_by = FUZZY_ORDER if fuzzy else order_clause(sort_by, sort_order)
+
+    if branch_kinds is not None:
+        # 游标模式 - 从 (排序键, id) 索引中的游标位置直接开始扫描；分支由游标值是否为 NULL 决定
+        position = (None, 0) if branch_kinds[0] == "null_after" else (0, 0)
+        page_query, _ = keyset_page_query(table, "*", where_clause, [], sort_by, sort_order, position, 0)
+    else:
+        page_query = f"SELECT * FROM {table} WHERE {where_clause} ORDER BY {order_by} LIMIT %s OFFSET %s"
+
+    if not include_total:
+        return page_query
+
+    return (
+        f"SELECT page.*, total.{TOTAL_COLUMN} "
+        f"FROM (SELECT COUNT(*) AS {TOTAL_COLUMN} FROM {table} WHERE {where_clause}) AS total "
+        f"LEFT JOIN ({page_query}) AS page ON TRUE "
+        f"ORDER BY {order_by}"
+    )
+
+
+def build_list_query(
+    sort_by: str,
+    sort_order: str,
+    limit: int,
+    offset: int = 0,
+    position: Optional[Tuple[Any, int]] = None,
+    include_total: bool = True,
+    table: str = "anime",
+    **filters
+) -> Tuple[str, List[Any]]:
+    """构建分页查询；include_total 时在同一条语句中返回过滤后的总数
+
+    总数子查询与分页子查询各自独立规划 (分页部分仍可走排序索引)，
+    通过 LEFT JOIN 合并为一次往返；页为空时仍返回一行只含总数的结果。
+    SQL 文本按形状缓存 (list_query_text)，每个请求只组装参数。
+    """
+    conditions, where_params = filter_terms(**filters)
+    search = filters.get("search")
+    fuzzy = bool(search) and filters.get("search_mode", "substring") == "fuzzy"
+    branches = keyset_branches(sort_order, position) if position is not None else None
+
+    query = list_query_text(
+        table, sort_by, sort_order, include_total, conditions, fuzzy,
+        tuple(branch[0] for branch in branches) if branches is not None else None,
+    )
+
+    order_params = [search] if fuzzy else []
+    if branches is None:
+        page_params = where_params + order_params + [limit, offset]
+    else:
+        # 与 keyset_page_query 相同的参数顺序: 每个分支为 过滤条件 + 游标位置 + LIMIT，多分支时再加外层 LIMIT
+        page_params = []
+        for branch in branches:
+            page_params += where_params + list(branch[1:]) + [limit]
+        if len(branches) > 1:
+            page_params.append(limit)
+
+    if not include_total:
+        return query, page_params
+    return query, where_params + page_params + order_params
+
+
+def split_total(rows, include_total: bool = True) -> Tuple[list, Optional[int]]:
+    """从 build_list_query 的结果中拆出数据行与总数"""
+    if not include_total:
+        return list(rows), None
+
+    total = rows[0][TOTAL_COLUMN] if rows else 0
+    data = []
+    for row in rows:
+        row.pop(TOTAL_COLUMN)
+        # 页为空时 LEFT JOIN 产生的占位行
+        if row["id"] is not None:
+            data.append(row)
+    return data, total
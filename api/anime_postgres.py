@@ -1,12 +1,33 @@
 from fastapi import APIRouter, Query, HTTPException, Depends
 from typing import Optional
-from sqlalchemy.orm import Session
-from sqlalchemy import func, or_
-from database import get_db, Anime
+from sqlalchemy.orm import Session, aliased
+from sqlalchemy import and_, func, literal, or_, select, tuple_, union_all
+from starlette.concurrency import run_in_threadpool
+from database import get_db, get_engine, Anime
+from db_schema import get_dataset_version, trigram_ready
+from response_cache import FallbackResponse, ResponseCache
+from pagination import InvalidCursor, decode_cursor, is_after, keyset_branches, next_cursor
+from server_timing import phase
+import metrics
 
 router = APIRouter()
 
+def _load_dataset_version_blocking():
+    raw_conn = get_engine().raw_connection()
+    try:
+        return get_dataset_version(raw_conn)
+    finally:
+        raw_conn.close()
+
+async def _load_dataset_version():
+    """响应缓存与 ETag 的数据版本 - 导入脚本写入后递增；取连接与查询在线程池中进行，不阻塞事件循环"""
+    return await run_in_threadpool(_load_dataset_version_blocking)
+
+response_cache = ResponseCache(_load_dataset_version)
+metrics.register_cache("anime", response_cache)
+
 @router.get("/")
+@response_cache.cached("/api/anime/")
 async def get_anime(
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
@@ -17,14 +38,35 @@ async def get_anime(
     rating_to: Optional[float] = Query(None, ge=0, le=10),
     sort_by: str = Query("collections", regex="^(title|year|average_rating|rating_count|collections|watched)$"),
     sort_order: str = Query("desc", regex="^(asc|desc)$"),
+    page_cursor: Optional[str] = Query(None, alias="cursor"),
+    search_mode: str = Query("substring", regex="^(substring|fuzzy)$"),
     db: Session = Depends(get_db)
 ):
+    # 相似度检索依赖 pg_trgm，未启用时退回子串匹配
+    fuzzy = bool(search) and search_mode == "fuzzy" and trigram_ready()
+    if fuzzy and page_cursor:
+        raise HTTPException(status_code=400, detail="cursor is not supported with search_mode=fuzzy")
+
+    # 游标模式 - 提供 cursor 时忽略 page，按 (排序键, id) 定位
+    position = None
+    if page_cursor:
+        try:
+            position = decode_cursor(page_cursor, sort_by, sort_order)
+        except InvalidCursor as exc:
+            raise HTTPException(status_code=400, detail=str(exc))
+
     try:
+        # 取出连接 (Session 在首次查询时才从连接池取连接)
+        with phase("pool"):
+            db.connection()
+
         # 构建查询
         query = db.query(Anime)
 
-        # 搜索过滤
-        if search:
+        # 搜索过滤 - 存在 pg_trgm GIN 索引时 ILIKE 会直接使用它
+        if fuzzy:
+            query = query.filter(literal(search).op("<%")(Anime.title))
+        elif search:
             query = query.filter(Anime.title.ilike(f"%{search}%"))
 
         # 年份过滤
@@ -39,60 +81,85 @@ async def get_anime(
         if rating_to is not None:
             query = query.filter(Anime.average_rating <= rating_to)
 
-        # 排序
-        order_column = getattr(Anime, sort_by)
-        if sort_order == "desc":
-            query = query.order_by(order_column.desc())
-        else:
-            query = query.order_by(order_column.asc())
-
         # 获取总数
-        total = query.count()
+        with phase("count"):
+            total = query.count()
+
+        # 排序 - id 作为稳定的次级排序键；fuzzy 检索按词相似度排列
+        def ordering(model):
+            order_column = getattr(model, sort_by)
+            if fuzzy:
+                return [func.word_similarity(search, model.title).desc(), model.id.asc()]
+            if sort_order == "desc":
+                return [order_column.desc(), model.id.desc()]
+            return [order_column.asc(), model.id.asc()]
 
-        # 分页
+        # 分页 - 多取一行用于判断是否有下一页
         total_pages = (total + page_size - 1) // page_size
-        start_idx = (page - 1) * page_size
 
-        anime_data = query.offset(start_idx).limit(page_size).all()
+        if position is not None:
+            # 游标模式 - 每个 keyset 分支单独走索引范围扫描并 LIMIT，多个分支时合并后再排序
+            nulls_high = db.get_bind().dialect.name != "sqlite"
+            branches = [
+                query.filter(_branch_filter(branch, sort_by, sort_order)).order_by(*ordering(Anime)).limit(page_size + 1)
+                for branch in keyset_branches(sort_order, position, nulls_high)
+            ]
+            with phase("query"):
+                if len(branches) == 1:
+                    anime_data = branches[0].all()
+                else:
+                    keyset_rows = aliased(Anime, union_all(*[select(branch.subquery()) for branch in branches]).subquery())
+                    anime_data = db.query(keyset_rows).order_by(*ordering(keyset_rows)).limit(page_size + 1).all()
+        else:
+            start_idx = (page - 1) * page_size
+            with phase("query"):
+                anime_data = query.order_by(*ordering(Anime)).offset(start_idx).limit(page_size + 1).all()
 
         # 转换为字典格式
-        anime_list = []
-        for anime in anime_data:
-            anime_list.append({
-                "id": anime.id,
-                "title": anime.title,
-                "year": anime.year,
-                "average_rating": anime.average_rating,
-                "rating_count": anime.rating_count,
-                "collections": anime.collections,
-                "watched": anime.watched,
-                "completion_rate": anime.completion_rate,
-                "img_url": anime.img_url
-            })
+        with phase("rows"):
+            anime_list = []
+            for anime in anime_data:
+                anime_list.append({
+                    "id": anime.id,
+                    "title": anime.title,
+                    "year": anime.year,
+                    "average_rating": anime.average_rating,
+                    "rating_count": anime.rating_count,
+                    "collections": anime.collections,
+                    "watched": anime.watched,
+                    "completion_rate": anime.completion_rate,
+                    "img_url": anime.img_url
+                })
 
         return {
-            "data": anime_list,
+            "data": anime_list[:page_size],
             "total": total,
             "page": page,
             "page_size": page_size,
-            "total_pages": total_pages
+            "total_pages": total_pages,
+            "next_cursor": None if fuzzy else next_cursor(anime_list, page_size, sort_by, sort_order)
         }
 
     except Exception as e:
-        # 如果数据库查询失败，返回示例数据作为后备
+        # 如果数据库查询失败，返回示例数据作为后备 (不写入响应缓存)
         print(f"Database error: {e}")
-        return get_fallback_data(page, page_size, search, year_from, year_to, rating_from, rating_to, sort_by, sort_order)
+        return FallbackResponse(get_fallback_data(page, page_size, search, year_from, year_to, rating_from, rating_to, sort_by, sort_order, position))
 
 @router.get("/stats")
+@response_cache.cached("/api/anime/stats")
 async def get_stats(db: Session = Depends(get_db)):
     try:
+        with phase("pool"):
+            db.connection()
+
         # 从数据库获取统计数据
-        total_anime = db.query(func.count(Anime.id)).scalar()
-        avg_rating = db.query(func.avg(Anime.average_rating)).scalar()
-        total_collections = db.query(func.sum(Anime.collections)).scalar()
-        total_watched = db.query(func.sum(Anime.watched)).scalar()
-        earliest_year = db.query(func.min(Anime.year)).scalar()
-        latest_year = db.query(func.max(Anime.year)).scalar()
+        with phase("query"):
+            total_anime = db.query(func.count(Anime.id)).scalar()
+            avg_rating = db.query(func.avg(Anime.average_rating)).scalar()
+            total_collections = db.query(func.sum(Anime.collections)).scalar()
+            total_watched = db.query(func.sum(Anime.watched)).scalar()
+            earliest_year = db.query(func.min(Anime.year)).scalar()
+            latest_year = db.query(func.max(Anime.year)).scalar()
 
         return {
             "total_anime": total_anime or 0,
@@ -106,9 +173,24 @@ async def get_stats(db: Session = Depends(get_db)):
     except Exception as e:
         # 如果数据库查询失败，返回示例统计数据
         print(f"Database stats error: {e}")
-        return get_fallback_stats()
+        return FallbackResponse(get_fallback_stats())
+
+def _branch_filter(branch, sort_by, sort_order):
+    """将 pagination.keyset_branches 的分支转换为 SQLAlchemy 条件"""
+    order_column = getattr(Anime, sort_by)
+    after = (lambda left, right: left < right) if sort_order == "desc" else (lambda left, right: left > right)
 
-def get_fallback_data(page, page_size, search, year_from, year_to, rating_from, rating_to, sort_by, sort_order):
+    kind = branch[0]
+    if kind == "after":
+        return after(tuple_(order_column, Anime.id), tuple_(branch[1], branch[2]))
+    if kind == "null_after":
+        return and_(order_column.is_(None), after(Anime.id, branch[1]))
+    if kind == "null":
+        return order_column.is_(None)
+    return order_column.isnot(None)
+
+@metrics.count_fallback("data")
+def get_fallback_data(page, page_size, search, year_from, year_to, rating_from, rating_to, sort_by, sort_order, position=None):
     """后备数据 - 当数据库不可用时使用"""
     sample_anime_data = [
         {
@@ -164,24 +246,30 @@ def get_fallback_data(page, page_size, search, year_from, year_to, rating_from,
 
     # 排序
     reverse = sort_order == "desc"
-    filtered_data.sort(key=lambda x: x[sort_by], reverse=reverse)
+    filtered_data.sort(key=lambda x: (x[sort_by], x["id"]), reverse=reverse)
 
     # 分页
     total = len(filtered_data)
     total_pages = (total + page_size - 1) // page_size
-    start_idx = (page - 1) * page_size
+    if position is not None:
+        filtered_data = [anime for anime in filtered_data if is_after(anime, sort_by, sort_order, position)]
+        start_idx = 0
+    else:
+        start_idx = (page - 1) * page_size
     end_idx = start_idx + page_size
 
-    paginated_data = filtered_data[start_idx:end_idx]
+    paginated_data = filtered_data[start_idx:end_idx + 1]
 
     return {
-        "data": paginated_data,
+        "data": paginated_data[:page_size],
         "total": total,
         "page": page,
         "page_size": page_size,
-        "total_pages": total_pages
+        "total_pages": total_pages,
+        "next_cursor": next_cursor(paginated_data, page_size, sort_by, sort_order)
     }
 
+@metrics.count_fallback("stats")
 def get_fallback_stats():
     """后备统计数据"""
     return {
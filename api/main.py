@@ -1,20 +1,34 @@
 from fastapi import FastAPI, Query, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
-from typing import Optional
+from fastapi.responses import FileResponse, JSONResponse
+from starlette.concurrency import run_in_threadpool
+from typing import TYPE_CHECKING, Optional
 from pathlib import Path
 from contextlib import contextmanager
+from functools import lru_cache
 import threading
 import atexit
 import os
-import psycopg2
-from psycopg2.extras import RealDictCursor
-from psycopg2.pool import SimpleConnectionPool, PoolError
-from dotenv import load_dotenv
-
-# 加载环境变量
-load_dotenv()
+import time
+from db_pool import ConnectionPool, PoolTimeout
+from statements import StatementRegistry, resolve_mode
+from response_cache import FallbackResponse, ResponseCache, VersionedResult
+from anime_queries import build_list_query, split_total
+from db_schema import DATASET_VERSION_SELECT_SQL, ensure_schema, trigram_ready
+from pagination import InvalidCursor, decode_cursor, is_after, next_cursor
+import metrics
+import slow_query
+import server_timing
+from server_timing import phase
+
+if TYPE_CHECKING:
+    # 仅用于类型注解；运行时 async_db 在 _initialise_async_db 中按需导入
+    import async_db
+
+# 加载环境变量 - Vercel 直接注入环境变量，不读取 .env
+if not os.environ.get("VERCEL"):
+    from dotenv import load_dotenv
+    load_dotenv()
 
 app = FastAPI(title="AnimeDB API", version="1.0.0")
 
@@ -22,10 +36,26 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 FRONTEND_DIR = BASE_DIR / "frontend"
 POOL_MIN_CONN = int(os.getenv("DB_POOL_MIN", "1"))
 POOL_MAX_CONN = int(os.getenv("DB_POOL_MAX", "5"))
-
-_db_pool: Optional[SimpleConnectionPool] = None
+# DB_DRIVER=psycopg: 使用 psycopg 3 的 asyncio 连接池，查询不阻塞事件循环
+DB_DRIVER = os.getenv("DB_DRIVER", "psycopg2").lower()
+# QUERY_ENGINE=memory: 在进程内 NumPy 列式快照上完成列表查询 (需要 numpy)
+QUERY_ENGINE = os.getenv("QUERY_ENGINE", "postgres").lower()
+SNAPSHOT_REFRESH_SECONDS = float(os.getenv("SNAPSHOT_REFRESH_SECONDS", "30"))
+# 冷启动模式: lazy 时启动阶段不建立连接池、不检查表结构，推迟到首个需要数据库的请求 (Vercel 默认)
+# psycopg2、psycopg 3 (async_db) 与 NumPy (columnar) 在任何模式下都只在首次用到时导入
+COLD_START_MODE = os.getenv("COLD_START_MODE", "lazy" if os.environ.get("VERCEL") else "eager").lower()
+
+_db_pool: Optional[ConnectionPool] = None
 _pool_lock = threading.Lock()
 
+_memory_engine: Optional["columnar.SnapshotEngine"] = None
+if QUERY_ENGINE == "memory":
+    import columnar
+    if columnar.available():
+        _memory_engine = columnar.SnapshotEngine(SNAPSHOT_REFRESH_SECONDS)
+    else:
+        print("QUERY_ENGINE=memory requires numpy, falling back to PostgreSQL queries")
+
 # CORS配置
 app.add_middleware(
     CORSMiddleware,
@@ -35,6 +65,15 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# 各阶段耗时写入 Server-Timing 头 / JSON 日志 (SERVER_TIMING、SERVER_TIMING_LOG)
+server_timing.install(app)
+
+# 请求数、耗时直方图、示例数据次数与连接池状态 (GET /metrics，METRICS=false 关闭)
+metrics.install(app)
+
+# 慢查询日志与执行计划汇总 (SLOW_QUERY_MS；SLOW_QUERY_ENDPOINT=true 时提供 /debug/slow-queries)
+slow_query.install(app)
+
 def _resolve_database_url(prefer_pool: bool = True) -> Optional[str]:
     """按照Vercel文档优先使用 POSTGRES_URL (连接池)"""
     pooled_url = os.getenv("POSTGRES_URL") if prefer_pool else None
@@ -50,7 +89,11 @@ def _resolve_database_url(prefer_pool: bool = True) -> Optional[str]:
     return database_url
 
 
-def _initialise_pool() -> Optional[SimpleConnectionPool]:
+# 列表查询的语句缓存 - POSTGRES_URL 经过事务级连接池，默认只在客户端复用 SQL
+statement_registry = StatementRegistry(resolve_mode(_resolve_database_url(prefer_pool=True), pooled=bool(os.getenv("POSTGRES_URL"))))
+
+
+def _initialise_pool() -> Optional[ConnectionPool]:
     global _db_pool
 
     with _pool_lock:
@@ -64,11 +107,13 @@ def _initialise_pool() -> Optional[SimpleConnectionPool]:
             return None
 
         try:
+            import psycopg2
+
             print(f"Initialising PostgreSQL connection pool (max {POOL_MAX_CONN})")
-            _db_pool = SimpleConnectionPool(
+            _db_pool = ConnectionPool(
+                lambda: psycopg2.connect(database_url),
                 POOL_MIN_CONN,
                 POOL_MAX_CONN,
-                dsn=database_url,
             )
 
             # 验证连接
@@ -90,25 +135,30 @@ def _initialise_pool() -> Optional[SimpleConnectionPool]:
 @contextmanager
 def get_db_connection():
     """提供一个可复用的数据库连接上下文 (Vercel 推荐连接池)"""
-    pool = _db_pool or _initialise_pool()
+    with phase("pool"):
+        pool = _db_pool or _initialise_pool()
 
     if pool is None:
         yield None
         return
 
+    import psycopg2
+
+    # 连接耗尽时排队等待；超时抛出 PoolTimeout (返回 503)，不再静默退回示例数据
     try:
-        conn = pool.getconn()
-    except PoolError as pool_error:
-        print(f"Database pool exhausted: {pool_error}")
+        with phase("pool"):
+            conn = pool.getconn()
+    except psycopg2.Error as exc:
+        print(f"Database connection failed: {exc}")
         yield None
         return
 
     try:
         yield conn
-        # 如调用方未提交事务，回滚以保持连接干净
+    finally:
+        # 如调用方未提交事务 (或查询出错)，回滚以保持连接干净
         if not conn.closed:
             conn.rollback()
-    finally:
         pool.putconn(conn)
 
 
@@ -122,6 +172,113 @@ def _close_pool():
 
 atexit.register(_close_pool)
 
+
+def _initialise_async_db() -> Optional["async_db.AsyncDatabase"]:
+    if DB_DRIVER != "psycopg":
+        return None
+    import async_db
+    if not async_db.available():
+        print("DB_DRIVER=psycopg requires psycopg[binary] and psycopg-pool, falling back to psycopg2")
+        return None
+
+    database_url = _resolve_database_url(prefer_pool=True)
+    if not database_url:
+        return None
+
+    print(f"Using async psycopg connection pool (max {POOL_MAX_CONN})")
+    return async_db.AsyncDatabase(database_url, POOL_MIN_CONN, POOL_MAX_CONN,
+                                  prepare=statement_registry.mode == "prepare")
+
+
+_async_db = _initialise_async_db()
+
+
+async def _fetch_all(query, params=None, prepare=False):
+    """按 DB_DRIVER 执行查询并返回字典行；数据库不可用时返回 None
+
+    prepare=True 的查询经由语句缓存执行，同一形状在每个连接上只解析与规划一次。
+    超过 SLOW_QUERY_MS 的查询记入慢查询日志，并在后台捕获执行计划。
+    """
+    if _async_db is not None:
+        with phase("schema"):
+            ready = await _async_db.ensure_schema(sample_anime_data)
+        if not ready:
+            return None
+        started = time.perf_counter()
+        rows = await _async_db.fetch_all(query, params, prepare=prepare)
+        slow_query.observe(query, params, time.perf_counter() - started, _explain_async)
+        return rows
+
+    # psycopg2 的取连接 (连接池耗尽时排队等待) 与查询都会阻塞，放到线程池中执行，不占用事件循环
+    return await run_in_threadpool(_fetch_all_blocking, query, params, prepare)
+
+
+def _fetch_all_blocking(query, params=None, prepare=False):
+    """psycopg2 连接池上的 _fetch_all (在线程池中调用)"""
+    with get_db_connection() as conn:
+        if not conn:
+            return None
+        with phase("schema"):
+            ready = ensure_schema(conn, sample_anime_data)
+        if not ready:
+            return None
+        from psycopg2.extras import RealDictCursor
+        with phase("query"), conn.cursor(cursor_factory=RealDictCursor) as cursor:
+            started = time.perf_counter()
+            if prepare:
+                statement_registry.execute(cursor, query, params)
+            else:
+                cursor.execute(query, params)
+            rows = cursor.fetchall()
+        slow_query.observe(query, params, time.perf_counter() - started, _explain)
+        return rows
+
+
+def _explain(explain_sql, params):
+    """在后台线程中为慢查询捕获执行计划 (使用连接池中的另一个连接)"""
+    with get_db_connection() as conn:
+        if not conn:
+            return None
+        with conn.cursor() as cursor:
+            cursor.execute(explain_sql, params)
+            return [row[0] for row in cursor.fetchall()]
+
+
+async def _explain_async(explain_sql, params):
+    rows = await _async_db.fetch_all(explain_sql, params)
+    return [row["QUERY PLAN"] for row in rows]
+
+
+def _current_snapshot() -> Optional["columnar.AnimeSnapshot"]:
+    """返回内存快照 (首次加载完成前为 None)；到达检查间隔时在后台按数据集版本刷新，不阻塞当前请求"""
+    if _memory_engine is None:
+        return None
+    _memory_engine.refresh_in_background(_load_dataset_version, _load_snapshot_rows)
+    return _memory_engine.snapshot
+
+
+async def _load_snapshot_rows():
+    """内存快照的全部行 - 与其他查询一样经 DB_DRIVER 选择的连接池读取
+
+    按 title, id 排序读取: 快照中标题的先后取自数据库的排序规则，与数据库路径的分页与游标一致。
+    """
+    rows = await _fetch_all("SELECT * FROM anime ORDER BY title, id")
+    if rows is None:
+        raise RuntimeError("database unavailable")
+    return rows
+
+
+async def _load_dataset_version():
+    """响应缓存与 ETag 的数据版本；数据库不可用时抛出异常，使请求绕过缓存"""
+    rows = await _fetch_all(DATASET_VERSION_SELECT_SQL)
+    if rows is None:
+        raise RuntimeError("database unavailable")
+    return (rows[0]["version"], rows[0]["updated_at"]) if rows else (0, None)
+
+
+response_cache = ResponseCache(_load_dataset_version)
+metrics.register_cache("anime", response_cache)
+
 # 示例数据 - 当数据库不可用时使用
 sample_anime_data = [
     {
@@ -160,6 +317,7 @@ sample_anime_data = [
 ]
 
 @app.get("/api/anime")
+@response_cache.cached("/api/anime")
 async def get_anime(
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
@@ -169,162 +327,122 @@ async def get_anime(
     rating_from: Optional[float] = Query(None, ge=0, le=10),
     rating_to: Optional[float] = Query(None, ge=0, le=10),
     sort_by: str = Query("collections", regex="^(title|year|average_rating|rating_count|collections|watched)$"),
-    sort_order: str = Query("desc", regex="^(asc|desc)$")
+    sort_order: str = Query("desc", regex="^(asc|desc)$"),
+    page_cursor: Optional[str] = Query(None, alias="cursor"),
+    include_total: bool = Query(True),
+    search_mode: str = Query("substring", regex="^(substring|fuzzy)$")
 ):
-    with get_db_connection() as conn:
-        if conn:
-            try:
-                with conn.cursor(cursor_factory=RealDictCursor) as cursor:
-                    # 首先检查表是否存在
-                    cursor.execute("""
-                    SELECT EXISTS (
-                        SELECT FROM information_schema.tables
-                        WHERE table_schema = 'public'
-                        AND table_name = 'anime'
-                    );
-                """)
-                    table_exists = cursor.fetchone()['exists']
-
-                    if not table_exists:
-                        print("Table 'anime' does not exist, creating it...")
-                        # 创建表
-                        cursor.execute("""
-                        CREATE TABLE anime (
-                            id SERIAL PRIMARY KEY,
-                            title VARCHAR(255) NOT NULL,
-                            year INTEGER,
-                            average_rating FLOAT,
-                            rating_count INTEGER,
-                            collections INTEGER,
-                            watched INTEGER,
-                            completion_rate FLOAT,
-                            img_url TEXT
-                        )
-                    """)
-
-                        # 插入示例数据
-                        for anime in sample_anime_data:
-                            cursor.execute("""
-                            INSERT INTO anime (title, year, average_rating, rating_count, collections, watched, completion_rate, img_url)
-                            VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-                        """, (
-                            anime['title'], anime['year'], anime['average_rating'],
-                            anime['rating_count'], anime['collections'], anime['watched'],
-                            anime['completion_rate'], anime['img_url']
-                        ))
-
-                        conn.commit()
-                        print("Table 'anime' created with sample data")
-
-                    # 构建查询
-                    query = "SELECT * FROM anime WHERE 1=1"
-                    params = []
-
-                    # 搜索过滤
-                    if search:
-                        query += " AND title ILIKE %s"
-                        params.append(f"%{search}%")
-
-                    # 年份过滤
-                    if year_from is not None:
-                        query += " AND year >= %s"
-                        params.append(year_from)
-                    if year_to is not None:
-                        query += " AND year <= %s"
-                        params.append(year_to)
-
-                    # 评分过滤
-                    if rating_from is not None:
-                        query += " AND average_rating >= %s"
-                        params.append(rating_from)
-                    if rating_to is not None:
-                        query += " AND average_rating <= %s"
-                        params.append(rating_to)
-
-                    # 排序
-                    order_column = sort_by
-                    order_direction = "DESC" if sort_order == "desc" else "ASC"
-                    query += f" ORDER BY {order_column} {order_direction}"
-
-                    # 获取总数
-                    count_query = "SELECT COUNT(*) FROM (" + query + ") as subquery"
-                    cursor.execute(count_query, params)
-                    total = cursor.fetchone()['count']
-
-                    # 分页
-                    offset = (page - 1) * page_size
-                    query += " LIMIT %s OFFSET %s"
-                    params.extend([page_size, offset])
-
-                    cursor.execute(query, params)
-                    anime_data = cursor.fetchall()
-
-                    total_pages = (total + page_size - 1) // page_size
-
-                    return {
-                        "data": anime_data,
-                        "total": total,
-                        "page": page,
-                        "page_size": page_size,
-                        "total_pages": total_pages
-                    }
-
-            except Exception as e:
-                print(f"Database query error: {e}")
-                return get_fallback_data(page, page_size, search, year_from, year_to, rating_from, rating_to, sort_by, sort_order)
-
-    # 使用示例数据
-    return get_fallback_data(page, page_size, search, year_from, year_to, rating_from, rating_to, sort_by, sort_order)
+    # 相似度检索依赖 pg_trgm，未启用时退回子串匹配
+    fuzzy = bool(search) and search_mode == "fuzzy" and trigram_ready()
+    if fuzzy and page_cursor:
+        raise HTTPException(status_code=400, detail="cursor is not supported with search_mode=fuzzy")
+
+    # 游标模式 - 提供 cursor 时忽略 page，按 (排序键, id) 定位
+    position = None
+    if page_cursor:
+        try:
+            position = decode_cursor(page_cursor, sort_by, sort_order)
+        except InvalidCursor as exc:
+            raise HTTPException(status_code=400, detail=str(exc))
+
+    # 内存列式引擎 - 过滤、排序与分页在快照上完成，不访问数据库
+    snapshot = None if fuzzy else _current_snapshot()
+    if snapshot is not None:
+        with phase("snapshot"):
+            result = snapshot.query(page, page_size, search, year_from, year_to, rating_from, rating_to,
+                                    sort_by, sort_order, position, include_total)
+        # 标题游标不在快照中 (如出自更新版本的数据) 时改为查询数据库
+        if result is not None:
+            return VersionedResult(result, snapshot.version)
+
+    # 页数据与过滤后的总数在一条语句中返回 - 多取一行用于判断是否有下一页
+    offset = 0 if position is not None else (page - 1) * page_size
+    query, params = build_list_query(
+        sort_by, sort_order, page_size + 1, offset,
+        position=position,
+        include_total=include_total,
+        search=search,
+        year_from=year_from,
+        year_to=year_to,
+        rating_from=rating_from,
+        rating_to=rating_to,
+        search_mode="fuzzy" if fuzzy else "substring",
+    )
+
+    try:
+        rows = await _fetch_all(query, params, prepare=True)
+    except PoolTimeout:
+        raise
+    except Exception as e:
+        print(f"Database query error: {e}")
+        rows = None
+
+    if rows is None:
+        # 使用示例数据 - 标记为后备响应，不写入响应缓存
+        return FallbackResponse(get_fallback_data(page, page_size, search, year_from, year_to, rating_from, rating_to, sort_by, sort_order, position))
+
+    anime_data, total = split_total(rows, include_total)
+    total_pages = (total + page_size - 1) // page_size if total is not None else None
+
+    return {
+        "data": anime_data[:page_size],
+        "total": total,
+        "page": page,
+        "page_size": page_size,
+        "total_pages": total_pages,
+        "next_cursor": None if fuzzy else next_cursor(anime_data, page_size, sort_by, sort_order)
+    }
 
 @app.get("/api/anime/stats")
+@response_cache.cached("/api/anime/stats")
 async def get_stats():
-    with get_db_connection() as conn:
-        if conn:
-            try:
-                with conn.cursor(cursor_factory=RealDictCursor) as cursor:
-                    # 检查表是否存在
-                    cursor.execute("""
-                    SELECT EXISTS (
-                        SELECT FROM information_schema.tables
-                        WHERE table_schema = 'public'
-                        AND table_name = 'anime'
-                    );
-                """)
-                    table_exists = cursor.fetchone()['exists']
-
-                    if not table_exists:
-                        return get_fallback_stats()
-
-                    cursor.execute("""
-                    SELECT
-                        COUNT(*) as total_anime,
-                        MIN(year) as earliest_year,
-                        MAX(year) as latest_year,
-                        AVG(average_rating) as avg_rating,
-                        SUM(collections) as total_collections,
-                        SUM(watched) as total_watched
-                    FROM anime
-                """)
-                    stats = cursor.fetchone()
-
-                    return {
-                        "total_anime": stats['total_anime'] or 0,
-                        "earliest_year": stats['earliest_year'] or 0,
-                        "latest_year": stats['latest_year'] or 0,
-                        "avg_rating": round(float(stats['avg_rating'] or 0), 2),
-                        "total_collections": stats['total_collections'] or 0,
-                        "total_watched": stats['total_watched'] or 0
-                    }
-
-            except Exception as e:
-                print(f"Database stats error: {e}")
-                return get_fallback_stats()
-
-    # 使用示例统计数据
-    return get_fallback_stats()
-
-def get_fallback_data(page, page_size, search, year_from, year_to, rating_from, rating_to, sort_by, sort_order):
+    snapshot = _current_snapshot()
+    if snapshot is not None:
+        return VersionedResult(snapshot.stats(), snapshot.version)
+
+    try:
+        rows = await _fetch_all("""
+            SELECT
+                COUNT(*) as total_anime,
+                MIN(year) as earliest_year,
+                MAX(year) as latest_year,
+                AVG(average_rating) as avg_rating,
+                SUM(collections) as total_collections,
+                SUM(watched) as total_watched
+            FROM anime
+        """, prepare=True)
+    except PoolTimeout:
+        raise
+    except Exception as e:
+        print(f"Database stats error: {e}")
+        rows = None
+
+    if not rows:
+        # 使用示例统计数据 - 不写入响应缓存
+        return FallbackResponse(get_fallback_stats())
+
+    stats = rows[0]
+    return {
+        "total_anime": stats['total_anime'] or 0,
+        "earliest_year": stats['earliest_year'] or 0,
+        "latest_year": stats['latest_year'] or 0,
+        "avg_rating": round(float(stats['avg_rating'] or 0), 2),
+        "total_collections": stats['total_collections'] or 0,
+        "total_watched": stats['total_watched'] or 0
+    }
+
+@metrics.count_fallback("data")
+def get_fallback_data(page, page_size, search, year_from, year_to, rating_from, rating_to, sort_by, sort_order, position=None):
     """后备数据 - 当数据库不可用时使用"""
+    import columnar
+
+    # 安装了 numpy 时与内存引擎共用同一套向量化查询
+    if columnar.available():
+        result = _sample_snapshot().query(page, page_size, search, year_from, year_to, rating_from, rating_to,
+                                          sort_by, sort_order, position)
+        if result is not None:
+            return result
+
     filtered_data = sample_anime_data.copy()
 
     # 搜索过滤
@@ -345,24 +463,36 @@ def get_fallback_data(page, page_size, search, year_from, year_to, rating_from,
 
     # 排序
     reverse = sort_order == "desc"
-    filtered_data.sort(key=lambda x: x[sort_by], reverse=reverse)
+    filtered_data.sort(key=lambda x: (x[sort_by], x["id"]), reverse=reverse)
 
     # 分页
     total = len(filtered_data)
     total_pages = (total + page_size - 1) // page_size
-    start_idx = (page - 1) * page_size
+    if position is not None:
+        filtered_data = [anime for anime in filtered_data if is_after(anime, sort_by, sort_order, position)]
+        start_idx = 0
+    else:
+        start_idx = (page - 1) * page_size
     end_idx = start_idx + page_size
 
-    paginated_data = filtered_data[start_idx:end_idx]
+    paginated_data = filtered_data[start_idx:end_idx + 1]
 
     return {
-        "data": paginated_data,
+        "data": paginated_data[:page_size],
         "total": total,
         "page": page,
         "page_size": page_size,
-        "total_pages": total_pages
+        "total_pages": total_pages,
+        "next_cursor": next_cursor(paginated_data, page_size, sort_by, sort_order)
     }
 
+@lru_cache(maxsize=1)
+def _sample_snapshot() -> "columnar.AnimeSnapshot":
+    import columnar
+    # 示例数据按码位顺序排列标题，与下方纯 Python 的后备路径一致
+    return columnar.AnimeSnapshot(sorted(sample_anime_data, key=lambda anime: (anime["title"], anime["id"])))
+
+@metrics.count_fallback("stats")
 def get_fallback_stats():
     """后备统计数据"""
     return {
@@ -374,6 +504,31 @@ def get_fallback_stats():
         "total_watched": sum(anime["watched"] for anime in sample_anime_data)
     }
 
+@app.on_event("startup")
+async def startup_event():
+    # lazy: 连接池与表结构初始化由首个查询完成 (_fetch_all)，不访问数据库的请求无需等待
+    if COLD_START_MODE == "lazy":
+        return
+
+    # 启动时完成一次表结构初始化，请求处理中不再探测 information_schema
+    if _async_db is not None:
+        await _async_db.open()
+        await _async_db.ensure_schema(sample_anime_data)
+        return
+
+    await run_in_threadpool(_ensure_schema_blocking)
+
+
+def _ensure_schema_blocking():
+    with get_db_connection() as conn:
+        if conn:
+            ensure_schema(conn, sample_anime_data)
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    if _async_db is not None:
+        await _async_db.close()
+
 @app.get("/")
 async def root():
     if FRONTEND_DIR.exists():
@@ -383,12 +538,28 @@ async def root():
         print("Warning: index.html not found in frontend directory")
     return {"message": "AnimeDB API is running"}
 
+@app.exception_handler(PoolTimeout)
+async def pool_timeout_handler(request, exc):
+    # 连接池在等待时间内没有空闲连接 - 告知客户端稍后重试，而不是返回示例数据
+    return JSONResponse(status_code=503, content={"detail": str(exc)}, headers={"Retry-After": "1"})
+
+def get_pool_stats():
+    """当前连接池的统计数据 (checkout 次数、等待时间、超时次数、使用中的连接数)"""
+    if _async_db is not None:
+        return _async_db.stats()
+    if _db_pool is not None:
+        return _db_pool.stats()
+    return None
+
+metrics.register_pool("postgres", get_pool_stats)
+
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy", "message": "AnimeDB API is working correctly"}
+    return {"status": "healthy", "message": "AnimeDB API is working correctly", "database_pool": get_pool_stats()}
 
 # 挂载前端静态文件 - 在Vercel中由静态构建处理
 if FRONTEND_DIR.exists():
+    from fastapi.staticfiles import StaticFiles
     app.mount("/", StaticFiles(directory=FRONTEND_DIR, html=True), name="frontend")
 else:
     print(f"Warning: frontend directory not found at {FRONTEND_DIR}")
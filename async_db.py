@@ -0,0 +1,131 @@
+import asyncio
+import time
+import weakref
+from contextlib import asynccontextmanager
+from typing import Any, Dict, List, Optional, Sequence
+
+try:
+    import psycopg
+    from psycopg.rows import dict_row
+    from psycopg_pool import AsyncConnectionPool
+    from psycopg_pool import PoolTimeout as AsyncPoolTimeout, TooManyRequests
+except ImportError:  # 可选依赖 - DB_DRIVER=psycopg 时需要 psycopg[binary] 与 psycopg-pool
+    psycopg = None
+
+from db_pool import (
+    POOL_MAX_IDLE, POOL_MAX_LIFETIME, POOL_MAX_WAITING, POOL_PING_IDLE, POOL_PRE_PING, POOL_TIMEOUT, PoolTimeout,
+)
+from db_schema import ensure_schema, schema_ready
+from server_timing import phase
+
+
+def available() -> bool:
+    """是否安装了 psycopg 3 与 psycopg-pool"""
+    return psycopg is not None
+
+
+class AsyncDatabase:
+    """psycopg 3 的 asyncio 连接池
+
+    查询在等待数据库 I/O 时让出事件循环，一个慢查询不会阻塞同一进程中的其他请求。
+    """
+
+    def __init__(self, dsn: str, min_size: int = 1, max_size: int = 5, timeout: float = POOL_TIMEOUT,
+                 prepare: bool = False):
+        self.dsn = dsn
+        self.prepare = prepare
+        # 连接最近一次归还的时间，用于只对空闲较久的连接探活
+        self._returned_at = weakref.WeakKeyDictionary()
+        self._pool = AsyncConnectionPool(
+            dsn,
+            min_size=min_size,
+            max_size=max_size,
+            timeout=timeout,
+            max_waiting=POOL_MAX_WAITING,
+            max_lifetime=POOL_MAX_LIFETIME,
+            max_idle=POOL_MAX_IDLE,
+            check=self._check if POOL_PRE_PING else None,
+            reset=self._mark_returned,
+            open=False,
+            # prepare=False 时关闭预编译 - 经过事务级连接池 (如 Vercel 的 POSTGRES_URL) 时跨事务的预编译语句不可用
+            kwargs={"row_factory": dict_row, "prepare_threshold": 5 if prepare else None},
+        )
+        self._opened = False
+        self._open_lock = asyncio.Lock()
+
+    async def _check(self, conn) -> None:
+        """与 db_pool.ConnectionPool 相同: 只对空闲超过 POOL_PING_IDLE 秒 (或从未使用) 的连接探活"""
+        if time.monotonic() - self._returned_at.get(conn, float("-inf")) >= POOL_PING_IDLE:
+            await AsyncConnectionPool.check_connection(conn)
+
+    async def _mark_returned(self, conn) -> None:
+        self._returned_at[conn] = time.monotonic()
+
+    async def open(self) -> None:
+        """打开连接池；连接在后台建立，不阻塞启动"""
+        async with self._open_lock:
+            if not self._opened:
+                await self._pool.open(wait=False)
+                self._opened = True
+
+    async def close(self) -> None:
+        if self._opened:
+            print("Closing async PostgreSQL connection pool")
+            await self._pool.close()
+            self._opened = False
+
+    @asynccontextmanager
+    async def transaction(self):
+        """取出一个连接并开启事务；正常退出时提交，异常时回滚"""
+        await self.open()
+        try:
+            with phase("pool"):
+                conn = await self._pool.getconn()
+        except (AsyncPoolTimeout, TooManyRequests) as exc:
+            raise PoolTimeout(str(exc)) from exc
+
+        try:
+            async with conn.transaction():
+                yield conn
+        finally:
+            await self._pool.putconn(conn)
+
+    async def fetch_all(self, query: str, params: Optional[Sequence[Any]] = None,
+                        prepare: bool = False) -> List[Dict[str, Any]]:
+        """prepare=True 时首次执行即在该连接上预编译 (由 psycopg 按连接缓存)"""
+        async with self.transaction() as conn:
+            with phase("query"):
+                async with conn.cursor() as cursor:
+                    await cursor.execute(query, params, prepare=True if prepare and self.prepare else None)
+                    return [row async for row in cursor]
+
+    def stats(self) -> Dict[str, Any]:
+        """与 db_pool.ConnectionPool.stats() 对应的统计数据 (等待队列已满也计入 timeouts)"""
+        stats = self._pool.get_stats()
+        size, idle = stats.get("pool_size", 0), stats.get("pool_available", 0)
+        return {
+            "checkouts": stats.get("requests_num", 0),
+            "timeouts": stats.get("requests_errors", 0),
+            "wait_time_total": stats.get("requests_wait_ms", 0) / 1000,
+            "connections_created": stats.get("connections_num", 0),
+            "ping_failures": stats.get("connections_lost", 0),
+            "size": size,
+            "idle": idle,
+            "in_use": size - idle,
+            "waiting": stats.get("requests_waiting", 0),
+            "max_size": stats.get("pool_max", 0),
+        }
+
+    async def ensure_schema(self, seed_rows=()) -> bool:
+        """表结构初始化复用 db_schema 的实现，首次调用时在线程中用一次性同步连接完成"""
+        if schema_ready():
+            return True
+        return await asyncio.to_thread(self._ensure_schema_sync, seed_rows)
+
+    def _ensure_schema_sync(self, seed_rows) -> bool:
+        try:
+            with psycopg.connect(self.dsn) as conn:
+                return ensure_schema(conn, seed_rows)
+        except psycopg.Error as exc:
+            print(f"Schema bootstrap failed: {exc}")
+            return False
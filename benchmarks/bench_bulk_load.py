@@ -0,0 +1,112 @@
+"""批量导入基准: executemany 逐行 INSERT vs COPY FROM STDIN
+
+在独立的 anime_load_bench 表中写入合成数据，不影响线上 anime 表:
+
+    DATABASE_URL=postgresql://... python benchmarks/bench_bulk_load.py --sizes 10000 100000 1000000
+"""
+import argparse
+import os
+import sys
+import time
+
+import psycopg2
+from dotenv import load_dotenv
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bulk_loader import copy_rows  # noqa: E402
+from db_schema import ANIME_TABLE_DDL  # noqa: E402
+
+TABLE = "anime_load_bench"
+
+INSERT_SQL = f"""
+    INSERT INTO {TABLE} (title, year, average_rating, rating_count, collections, watched, completion_rate, img_url)
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+"""
+
+
+def resolve_database_url():
+    database_url = os.getenv('POSTGRES_URL_NON_POOLING') or os.getenv('POSTGRES_URL') or os.getenv('DATABASE_URL')
+    if database_url and 'sslmode=' not in database_url:
+        database_url += ("&" if "?" in database_url else "?") + "sslmode=require"
+    return database_url
+
+
+def synthetic_rows(count):
+    """与 CSV 转换结果同结构的行，包含 NULL 与需要转义的标题"""
+    for i in range(count):
+        yield (
+            f"番剧 {i}\t第{i % 13}季" if i % 1000 == 0 else f"番剧 {i}",
+            1960 + i % 65 if i % 50 else None,
+            (i % 100) / 10.0,
+            i % 40000,
+            (i * 31) % 70000,
+            (i * 17) % 55000,
+            (i % 1000) / 1000.0,
+            f"https://example.invalid/{i}.jpg",
+        )
+
+
+def load(conn, method, count):
+    with conn.cursor() as cursor:
+        cursor.execute(f"TRUNCATE {TABLE}")
+        conn.commit()
+
+        started = time.perf_counter()
+        if method == "executemany":
+            cursor.executemany(INSERT_SQL, synthetic_rows(count))
+        else:
+            copy_rows(cursor, synthetic_rows(count), table=TABLE)
+        conn.commit()
+        elapsed = time.perf_counter() - started
+
+        cursor.execute(f"SELECT COUNT(*) FROM {TABLE}")
+        assert cursor.fetchone()[0] == count
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--executemany-limit", type=int, default=None,
+                        help="skip executemany above this row count (it is very slow at 1M rows)")
+    args = parser.parse_args()
+
+    load_dotenv()
+    database_url = resolve_database_url()
+    if not database_url:
+        print("Error: set POSTGRES_URL or DATABASE_URL")
+        return 1
+
+    conn = psycopg2.connect(database_url)
+    results = []
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(f"DROP TABLE IF EXISTS {TABLE}")
+            cursor.execute(ANIME_TABLE_DDL.format(table=TABLE))
+        conn.commit()
+
+        for count in args.sizes:
+            for method in ("executemany", "copy"):
+                if method == "executemany" and args.executemany_limit and count > args.executemany_limit:
+                    results.append((count, method, None))
+                    continue
+                results.append((count, method, load(conn, method, count)))
+    finally:
+        conn.rollback()
+        with conn.cursor() as cursor:
+            cursor.execute(f"DROP TABLE IF EXISTS {TABLE}")
+        conn.commit()
+        conn.close()
+
+    print(f"{'rows':>9} {'method':<12} {'seconds':>9} {'rows/s':>12}")
+    for count, method, elapsed in results:
+        if elapsed is None:
+            print(f"{count:>9} {method:<12} {'skipped':>9}")
+        else:
+            print(f"{count:>9} {method:<12} {elapsed:>9.2f} {count / elapsed:>12,.0f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,110 @@
+"""main.py 冷启动基准: 启动时建库 vs 构建阶段生成的只读快照
+
+每次在全新的临时目录中启动一个 Python 进程，测量 导入 -> startup -> 首个请求 的耗时:
+
+    python benchmarks/bench_cold_start.py --rows 100000 --runs 5
+
+场景:
+    seed           没有快照，启动时建表、建索引并写入示例数据 (原有行为)
+    csv            没有快照，启动时由 CSV 建立完整数据库
+    snapshot       只读打开快照 (immutable=1，模拟只读部署包)
+    snapshot-copy  启动时把快照复制到本地数据库路径
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from csv_transform import batch_rows, iter_csv_batches  # noqa: E402
+from generate_data import write_csv  # noqa: E402
+from sqlite_db import SQLITE_IMPORT_COLUMNS, build_snapshot  # noqa: E402
+
+CHILD = """
+import json, os, sys, time
+started = time.perf_counter()
+sys.path.insert(0, {root!r})
+import main
+imported = time.perf_counter()
+if {build_csv!r}:
+    from csv_transform import batch_rows, iter_csv_batches
+    from sqlite_db import SQLITE_IMPORT_COLUMNS, swap_database
+    swap_database("anime.db", (row for batch in iter_csv_batches({csv!r})
+                               for row in batch_rows(batch, SQLITE_IMPORT_COLUMNS)), SQLITE_IMPORT_COLUMNS)
+from fastapi.testclient import TestClient
+with TestClient(main.app) as client:
+    ready = time.perf_counter()
+    assert client.get("/api/anime?page_size=20").status_code == 200
+    first = time.perf_counter()
+    assert client.get("/api/anime", params={{"search": "少女"}}).status_code == 200
+    searched = time.perf_counter()
+print(json.dumps({{"import": imported - started, "startup": ready - imported,
+                  "first_request": first - ready, "first_search": searched - first,
+                  "total": searched - started}}))
+"""
+
+SCENARIOS = {
+    "seed": {"snapshot": False, "build_csv": False, "env": {}},
+    "csv": {"snapshot": False, "build_csv": True, "env": {}},
+    "snapshot": {"snapshot": True, "build_csv": False,
+                 "env": {"SQLITE_SNAPSHOT_MODE": "readonly", "SQLITE_IMMUTABLE": "true"}},
+    "snapshot-copy": {"snapshot": True, "build_csv": False, "env": {"SQLITE_SNAPSHOT_MODE": "copy"}},
+}
+
+
+def run_once(name, csv_path, snapshot_path):
+    scenario = SCENARIOS[name]
+    with tempfile.TemporaryDirectory() as directory:
+        os.symlink(os.path.join(ROOT, "frontend"), os.path.join(directory, "frontend"))
+        env = dict(os.environ, **scenario["env"])
+        env.pop("VERCEL", None)
+        env["SQLITE_SNAPSHOT"] = snapshot_path if scenario["snapshot"] else os.path.join(directory, "missing.db")
+        code = CHILD.format(root=ROOT, build_csv=scenario["build_csv"], csv=csv_path)
+
+        started = time.perf_counter()
+        output = subprocess.run([sys.executable, "-c", code], cwd=directory, env=env,
+                                capture_output=True, text=True, check=True).stdout
+        wall = time.perf_counter() - started
+    result = json.loads(output.strip().splitlines()[-1])
+    result["wall"] = wall
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--csv", default=None, help="CSV to load (default: generate --rows synthetic rows)")
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--scenarios", nargs="+", default=list(SCENARIOS), choices=list(SCENARIOS))
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        csv_path = args.csv or os.path.join(directory, "full_data.csv")
+        if not args.csv:
+            write_csv(csv_path, args.rows)
+
+        snapshot_path = os.path.join(directory, "snapshot", "anime.db")
+        os.makedirs(os.path.dirname(snapshot_path))
+        started = time.perf_counter()
+        build_snapshot(snapshot_path, (
+            row for batch in iter_csv_batches(csv_path) for row in batch_rows(batch, SQLITE_IMPORT_COLUMNS)
+        ), SQLITE_IMPORT_COLUMNS)
+        print(f"Snapshot build step: {time.perf_counter() - started:.2f}s")
+
+        print(f"{'scenario':<14} {'wall':>7} {'import':>7} {'startup':>8} {'1st req':>8} {'1st search':>10}  (median of {args.runs}, seconds)")
+        for name in args.scenarios:
+            runs = [run_once(name, csv_path, snapshot_path) for _ in range(args.runs)]
+            median = {key: statistics.median(run[key] for run in runs) for key in runs[0]}
+            print(f"{name:<14} {median['wall']:>7.3f} {median['import']:>7.3f} {median['startup']:>8.3f} "
+                  f"{median['first_request']:>8.3f} {median['first_search']:>10.3f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,132 @@
+"""并发基准: psycopg2 (阻塞) vs psycopg 3 asyncio 驱动
+
+分别以 DB_DRIVER=psycopg2 / psycopg 启动单进程 uvicorn 运行 api/main.py，
+用 50 与 200 个并发客户端请求 /api/anime，比较吞吐量与延迟。
+请求直接读取 anime 表，请在测试库上运行 (响应缓存在子进程中关闭):
+
+    DATABASE_URL=postgresql://... python benchmarks/bench_concurrency.py --duration 10
+"""
+import argparse
+import asyncio
+import os
+import random
+import subprocess
+import sys
+import time
+
+import httpx
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DRIVERS = ["psycopg2", "psycopg"]
+
+# 混合请求: 默认首页、翻页、年份与评分过滤，以及需要扫描标题的检索
+SEARCH_TERMS = ["魔法", "少女", "巨人", "石之门", "rock"]
+SORT_COLUMNS = ["collections", "year", "average_rating", "rating_count", "watched", "title"]
+
+
+def random_params(rng):
+    params = {"page": rng.randint(1, 20), "sort_by": rng.choice(SORT_COLUMNS), "sort_order": rng.choice(["asc", "desc"])}
+    if rng.random() < 0.3:
+        params["search"] = rng.choice(SEARCH_TERMS)
+    if rng.random() < 0.3:
+        params["year_from"] = rng.randint(1990, 2020)
+    if rng.random() < 0.3:
+        params["rating_from"] = rng.choice([6.0, 7.0, 8.0])
+    return params
+
+
+def start_server(driver, port, pool_max):
+    env = dict(os.environ, DB_DRIVER=driver, DB_POOL_MAX=str(pool_max), RESPONSE_CACHE_SIZE="0", QUERY_ENGINE="postgres")
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "api.main:app", "--port", str(port), "--log-level", "warning", "--no-access-log"],
+        cwd=ROOT_DIR, env=env, stdout=subprocess.DEVNULL,
+    )
+
+
+async def wait_ready(client, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            response = await client.get("/api/anime", params={"page_size": 1})
+            # ETag 只在数据库可用时出现 - 示例数据没有比较意义
+            if response.status_code == 200:
+                return "etag" in response.headers
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.2)
+    return False
+
+
+async def run_clients(client, clients, duration, seed):
+    latencies = []
+    errors = 0
+    deadline = time.monotonic() + duration
+
+    async def worker(worker_id):
+        nonlocal errors
+        rng = random.Random(seed + worker_id)
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            try:
+                response = await client.get("/api/anime", params=random_params(rng))
+                response.raise_for_status()
+                latencies.append(time.perf_counter() - started)
+            except httpx.HTTPError:
+                errors += 1
+
+    started = time.monotonic()
+    await asyncio.gather(*(worker(i) for i in range(clients)))
+    elapsed = time.monotonic() - started
+
+    latencies.sort()
+    count = len(latencies)
+    return {
+        "requests": count,
+        "errors": errors,
+        "rps": count / elapsed if elapsed else 0.0,
+        "p50": latencies[count // 2] * 1000 if count else 0.0,
+        "p99": latencies[min(count - 1, int(count * 0.99))] * 1000 if count else 0.0,
+    }
+
+
+async def bench_driver(driver, port, args):
+    server = start_server(driver, port, args.pool_max)
+    try:
+        limits = httpx.Limits(max_connections=max(args.clients), max_keepalive_connections=max(args.clients))
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=60.0) as client:
+            if not await wait_ready(client):
+                print(f"{driver}: server did not reach the database, skipping")
+                return {}
+            await run_clients(client, 10, 1.0, seed=0)  # 预热连接池
+            return {clients: await run_clients(client, clients, args.duration, seed=clients) for clients in args.clients}
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, nargs="+", default=[50, 200])
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--pool-max", type=int, default=10)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    if not (os.getenv("POSTGRES_URL") or os.getenv("DATABASE_URL")):
+        print("Error: set POSTGRES_URL or DATABASE_URL")
+        return 1
+
+    results = {}
+    for offset, driver in enumerate(DRIVERS):
+        results[driver] = asyncio.run(bench_driver(driver, args.port + offset, args))
+
+    print(f"{'driver':<10} {'clients':>7} {'req/s':>9} {'p50':>9} {'p99':>9} {'errors':>7}")
+    for driver, by_clients in results.items():
+        for clients, result in by_clients.items():
+            print(f"{driver:<10} {clients:>7} {result['rps']:>9.1f} {result['p50']:>7.1f}ms {result['p99']:>7.1f}ms {result['errors']:>7}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,105 @@
+"""并行导入扩展性基准: 单进程 vs 1..8 个进程按字节范围并行解析与 COPY
+
+由 generate_data.py 生成含中文表头的合成 CSV，写入独立的 anime_parallel_bench 表，不影响线上 anime 表:
+
+    DATABASE_URL=postgresql://... python benchmarks/bench_parallel_import.py --rows 1000000 --workers 1 2 4 8
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import psycopg2
+from dotenv import load_dotenv
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bulk_loader import ANIME_COLUMNS, copy_rows  # noqa: E402
+from csv_transform import batch_rows, iter_csv_batches  # noqa: E402
+from db_schema import ANIME_TABLE_DDL  # noqa: E402
+from generate_data import write_csv  # noqa: E402
+from parallel_import import parallel_copy  # noqa: E402
+
+TABLE = "anime_parallel_bench"
+
+
+def resolve_database_url():
+    database_url = os.getenv('POSTGRES_URL_NON_POOLING') or os.getenv('POSTGRES_URL') or os.getenv('DATABASE_URL')
+    if database_url and 'sslmode=' not in database_url:
+        database_url += ("&" if "?" in database_url else "?") + "sslmode=require"
+    return database_url
+
+
+def reset(conn):
+    with conn.cursor() as cursor:
+        cursor.execute(f"TRUNCATE {TABLE}")
+    conn.commit()
+
+
+def count_rows(conn):
+    with conn.cursor() as cursor:
+        cursor.execute(f"SELECT COUNT(*) FROM {TABLE}")
+        return cursor.fetchone()[0]
+
+
+def single_process(conn, csv_path):
+    with conn.cursor() as cursor:
+        copy_rows(cursor, (
+            row for batch in iter_csv_batches(csv_path) for row in batch_rows(batch, ("id",) + ANIME_COLUMNS)
+        ), table=TABLE, columns=("id",) + ANIME_COLUMNS)
+    conn.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    load_dotenv()
+    database_url = resolve_database_url()
+    if not database_url:
+        print("Error: set POSTGRES_URL or DATABASE_URL")
+        return 1
+
+    conn = psycopg2.connect(database_url)
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        csv_path = os.path.join(directory, "full_data.csv")
+        write_csv(csv_path, args.rows)
+        print(f"Generated {args.rows} rows ({os.path.getsize(csv_path) / 1e6:.1f} MB), {os.cpu_count()} CPUs")
+
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute(f"DROP TABLE IF EXISTS {TABLE}")
+                cursor.execute(ANIME_TABLE_DDL.format(table=TABLE))
+            conn.commit()
+
+            runs = [("single", None)] + [("parallel", workers) for workers in args.workers]
+            for method, workers in runs:
+                reset(conn)
+                started = time.perf_counter()
+                if workers is None:
+                    single_process(conn, csv_path)
+                else:
+                    parallel_copy(database_url, csv_path, workers, table=TABLE)
+                elapsed = time.perf_counter() - started
+                assert count_rows(conn) == args.rows
+                results.append((method, workers, elapsed))
+        finally:
+            conn.rollback()
+            with conn.cursor() as cursor:
+                cursor.execute(f"DROP TABLE IF EXISTS {TABLE}")
+            conn.commit()
+            conn.close()
+
+    baseline = results[0][2]
+    print(f"{'method':<10} {'workers':>7} {'seconds':>9} {'rows/s':>12} {'speedup':>8}")
+    for method, workers, elapsed in results:
+        print(f"{method:<10} {workers or 1:>7} {elapsed:>9.2f} {args.rows / elapsed:>12,.0f} {baseline / elapsed:>7.2f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,115 @@
+"""标题检索基准: ILIKE 全表扫描 vs pg_trgm GIN 索引
+
+在独立的 anime_search_bench 表中生成数据，不影响线上 anime 表:
+
+    DATABASE_URL=postgresql://... python benchmarks/bench_search.py --rows 200000
+"""
+import argparse
+import os
+import sys
+import time
+
+import psycopg2
+from dotenv import load_dotenv
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from anime_queries import build_list_query  # noqa: E402
+from db_schema import ANIME_TABLE_DDL, bootstrap_trigram  # noqa: E402
+
+TABLE = "anime_search_bench"
+
+# 共享词根的中文标题，模拟真实数据中大量重复的子串
+TITLE_WORDS = ["魔法", "少女", "进击", "巨人", "命运", "石之门", "孤独", "摇滚", "钢之", "炼金术师", "某科学的", "超电磁炮"]
+
+# 不同长度的检索词: 两字词无法构成完整三元组，用于观察索引的下限
+SEARCH_TERMS = ["魔法少女", "炼金术师", "石之门", "巨人", "摇滚 12"]
+
+
+def resolve_database_url():
+    database_url = os.getenv('POSTGRES_URL_NON_POOLING') or os.getenv('POSTGRES_URL') or os.getenv('DATABASE_URL')
+    if database_url and 'sslmode=' not in database_url:
+        database_url += ("&" if "?" in database_url else "?") + "sslmode=require"
+    return database_url
+
+
+def populate(cursor, rows):
+    cursor.execute(f"DROP TABLE IF EXISTS {TABLE}")
+    cursor.execute(ANIME_TABLE_DDL.format(table=TABLE))
+    words = "ARRAY[" + ", ".join(f"'{word}'" for word in TITLE_WORDS) + "]"
+    cursor.execute(f"""
+        INSERT INTO {TABLE} (title, year, average_rating, rating_count, collections, watched, completion_rate, img_url)
+        SELECT
+            ({words})[1 + (i * 7919) %% {len(TITLE_WORDS)}] ||
+            ({words})[1 + (i * 104729) %% {len(TITLE_WORDS)}] || ' ' || (i %% 97)::text,
+            1960 + i %% 65, (i %% 100) / 10.0, i %% 40000, (i * 31) %% 70000, (i * 17) %% 55000, (i %% 1000) / 1000.0, ''
+        FROM generate_series(1::bigint, %s) AS i
+    """, (rows,))
+    cursor.execute(f"ANALYZE {TABLE}")
+
+
+def time_query(cursor, query, params, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        cursor.execute(query, params)
+        cursor.fetchall()
+    return (time.perf_counter() - started) * 1000 / repeat
+
+
+def bench(cursor, search_mode, repeat):
+    results = {}
+    for term in SEARCH_TERMS:
+        query, params = build_list_query("collections", "desc", 20, table=TABLE, search=term, search_mode=search_mode)
+        results[term] = time_query(cursor, query, params, repeat)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    load_dotenv()
+    database_url = resolve_database_url()
+    if not database_url:
+        print("Error: set POSTGRES_URL or DATABASE_URL")
+        return 1
+
+    conn = psycopg2.connect(database_url)
+    try:
+        with conn.cursor() as cursor:
+            print(f"Populating {TABLE} with {args.rows} rows ...")
+            populate(cursor, args.rows)
+        conn.commit()
+
+        with conn.cursor() as cursor:
+            baseline = bench(cursor, "substring", args.repeat)
+
+        if not bootstrap_trigram(conn, table=TABLE, index_name=f"idx_{TABLE}_title_trgm"):
+            print("pg_trgm is not available on this server; only the ILIKE baseline was measured")
+            for term, ms in baseline.items():
+                print(f"  {term:<12} ilike {ms:8.2f} ms")
+            return 1
+
+        with conn.cursor() as cursor:
+            cursor.execute(f"ANALYZE {TABLE}")
+            indexed = bench(cursor, "substring", args.repeat)
+            fuzzy = bench(cursor, "fuzzy", args.repeat)
+
+        print(f"{'term':<12} {'ilike seq':>10} {'ilike trgm':>11} {'fuzzy':>9} {'speedup':>8}")
+        for term in SEARCH_TERMS:
+            speedup = baseline[term] / indexed[term] if indexed[term] else float("inf")
+            print(f"{term:<12} {baseline[term]:8.2f}ms {indexed[term]:9.2f}ms {fuzzy[term]:7.2f}ms {speedup:7.1f}x")
+    finally:
+        conn.rollback()
+        with conn.cursor() as cursor:
+            cursor.execute(f"DROP TABLE IF EXISTS {TABLE}")
+        conn.commit()
+        conn.close()
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,122 @@
+"""各入口的冷启动导入分析 (基于 python -X importtime)
+
+每个入口在全新进程中导入若干次，列出入口直接导入的模块 (累计耗时) 与各顶层包的自身耗时合计:
+
+    python benchmarks/import_profile.py
+    python benchmarks/import_profile.py --entry api.main --top 15 --first-response
+
+--first-response 额外测量 api/main.py (Vercel 函数) 从进程启动到首个 /api/anime 响应的耗时；
+设置了 POSTGRES_URL / DATABASE_URL 时查询数据库，否则返回示例数据。
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+from collections import defaultdict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ENTRY_POINTS = ("api.main", "main", "main_postgres", "main_vercel_postgres", "main_prisma_postgres", "main_simple")
+
+IMPORT_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+FIRST_RESPONSE = """
+import json, sys, time
+started = time.perf_counter()
+import api.main
+imported = time.perf_counter()
+from fastapi.testclient import TestClient
+with TestClient(api.main.app) as client:
+    ready = time.perf_counter()
+    assert client.get("/api/anime?page_size=20").status_code == 200
+    answered = time.perf_counter()
+print(json.dumps({"import": imported - started, "startup": ready - imported,
+                  "first_request": answered - ready, "total": answered - started}))
+"""
+
+
+def _environment(directory):
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    # 入口模块在导入时挂载相对路径 frontend/，在临时目录中运行以免写入仓库
+    os.symlink(os.path.join(ROOT, "frontend"), os.path.join(directory, "frontend"))
+    return env
+
+
+def profile_import(entry, directory, env):
+    """导入一次入口模块，返回 (总耗时 us, [(模块, 自身 us, 累计 us, 深度)])，只包含入口自身引起的导入"""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {entry}"],
+                            cwd=directory, env=env, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"import {entry} failed:\n{result.stderr[-2000:]}")
+
+    modules = []
+    for line in result.stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if match:
+            own, cumulative, indent, name = match.groups()
+            modules.append((name, int(own), int(cumulative), len(indent) // 2))
+    # importtime 先输出子模块再输出父模块: 入口之前最近一个顶层行之后的部分都由入口导入 (排除 site 等)
+    end = max(i for i, (name, _, _, depth) in enumerate(modules) if name == entry and depth == 0)
+    start = max([i + 1 for i, (_, _, _, depth) in enumerate(modules[:end]) if depth == 0] or [0])
+    return modules[end][2], modules[start:end]
+
+
+def offenders(modules):
+    """入口直接导入的模块 (按累计耗时)，以及各顶层包的自身耗时合计 (不重复计算嵌套导入)"""
+    direct = sorted(((cumulative, name) for name, _, cumulative, depth in modules if depth == 1), reverse=True)
+    packages = defaultdict(int)
+    for name, own, _, _ in modules:
+        packages[name.split(".")[0]] += own
+    return direct, sorted(((own, package) for package, own in packages.items()), reverse=True)
+
+
+def first_response(directory, env, runs):
+    samples = []
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, "-c", FIRST_RESPONSE], cwd=directory, env=env,
+                                capture_output=True, text=True, check=True).stdout
+        # 应用自身的日志 (如退出时关闭连接池) 也写入 stdout
+        samples.append(json.loads(next(line for line in reversed(output.splitlines()) if line.startswith("{"))))
+    return {key: statistics.median(sample[key] for sample in samples) for key in samples[0]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entry", nargs="+", default=list(ENTRY_POINTS))
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--first-response", action="store_true")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        env = _environment(directory)
+
+        for entry in args.entry:
+            profiles = [profile_import(entry, directory, env) for _ in range(args.runs)]
+            # 以总耗时居中的一次为代表，避免单次抖动
+            profiles.sort(key=lambda profile: profile[0])
+            total, modules = profiles[len(profiles) // 2]
+            direct, packages = offenders(modules)
+
+            print(f"\n== {entry}: {total / 1000:.1f} ms to import (median of {args.runs}), {len(modules)} modules")
+            print(f"   {'imported by ' + entry:<40} {'cumulative ms':>13}")
+            for cumulative, name in direct[:args.top]:
+                print(f"   {name:<40} {cumulative / 1000:>13.1f}")
+            print(f"   {'package (own time of all its modules)':<40} {'ms':>13}")
+            for own, package in packages[:args.top]:
+                print(f"   {package:<40} {own / 1000:>13.1f}")
+
+        if args.first_response:
+            timing = first_response(directory, env, args.runs)
+            print(f"\n== api.main first response (median of {args.runs}): import {timing['import'] * 1000:.0f} ms, "
+                  f"startup {timing['startup'] * 1000:.0f} ms, first request {timing['first_request'] * 1000:.0f} ms, "
+                  f"total {timing['total'] * 1000:.0f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
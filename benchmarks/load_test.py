@@ -0,0 +1,249 @@
+"""六个应用入口的端到端 HTTP 负载测试
+
+每个应用在独立的子进程中导入，经 httpx.ASGITransport 在进程内处理请求 (不经过网络与 uvicorn)，
+以固定并发数回放混合请求: 列表、标题检索、年份/评分过滤、深翻页、统计与详情。
+输出每个应用在各并发数下的 req/s 与 p50 / p95 / p99 延迟:
+
+    python benchmarks/load_test.py --rows 20000 --concurrency 1 8 32 --duration 5
+    DATABASE_URL=postgresql://... python benchmarks/load_test.py --apps api.main main_vercel_postgres
+
+SQLite 数据库文件在临时目录中由 CSV (--csv，缺省生成 --rows 行合成数据) 建立；
+PostgreSQL 后端读取 DATABASE_URL / POSTGRES_URL 指向的现有 anime 表 (请在测试库上先运行导入脚本)，
+未设置时跳过只支持 PostgreSQL 的应用。响应缓存默认关闭 (--cache 开启)，以比较后端本身。
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# 应用 -> 路由与支持的后端 (memory 为内置示例数据)
+APPS = {
+    "main": {"list": "/api/anime", "stats": "/api/stats", "detail": "/api/anime/{id}", "backends": ["sqlite"]},
+    "main_simple": {"list": "/api/anime/", "stats": "/api/anime/stats", "detail": None, "backends": ["memory"]},
+    "main_postgres": {"list": "/api/anime/", "stats": "/api/anime/stats", "detail": None,
+                      "backends": ["postgres", "sqlite"]},
+    "main_vercel_postgres": {"list": "/anime/", "stats": "/anime/stats", "detail": None, "backends": ["postgres"]},
+    "main_prisma_postgres": {"list": "/api/anime/", "stats": "/api/anime/stats", "detail": None,
+                             "backends": ["postgres"]},
+    "api.main": {"list": "/api/anime", "stats": "/api/anime/stats", "detail": None, "backends": ["postgres"]},
+}
+
+# 请求类型与权重；没有详情路由的应用按其余权重重新分配
+REQUEST_MIX = {"list": 35, "search": 15, "filter": 20, "deep_page": 10, "stats": 10, "detail": 10}
+
+SORT_COLUMNS = ["collections", "year", "average_rating", "rating_count", "watched", "title"]
+
+
+class Workload:
+    """由应用首页数据生成的请求序列 (检索词取自真实标题，详情 id 取自真实行)"""
+
+    def __init__(self, routes, titles, ids, total_pages):
+        self.routes = routes
+        self.terms = sorted({title[i:i + 2] for title in titles for i in range(0, max(len(title) - 1, 1), 2)
+                             if title[i:i + 2].strip()}) or ["a"]
+        self.ids = ids or [1]
+        self.total_pages = max(total_pages or 1, 1)
+        kinds = [kind for kind in REQUEST_MIX if kind != "detail" or routes["detail"]]
+        self.kinds = kinds
+        self.weights = [REQUEST_MIX[kind] for kind in kinds]
+
+    def request(self, rng):
+        """返回 (请求类型, 路径, 查询参数)"""
+        kind = rng.choices(self.kinds, self.weights)[0]
+        sort = {"sort_by": rng.choice(SORT_COLUMNS), "sort_order": rng.choice(["asc", "desc"])}
+        if kind == "list":
+            return kind, self.routes["list"], {"page": rng.randint(1, min(5, self.total_pages)), **sort}
+        if kind == "search":
+            return kind, self.routes["list"], {"search": rng.choice(self.terms), **sort}
+        if kind == "filter":
+            params = {"year_from": rng.randint(1990, 2015), "rating_from": rng.choice([6.0, 7.0, 8.0]), **sort}
+            if rng.random() < 0.5:
+                params["year_to"] = params["year_from"] + rng.randint(1, 10)
+            return kind, self.routes["list"], params
+        if kind == "deep_page":
+            # 后半部分的页 - OFFSET 分页在这里代价最高
+            return kind, self.routes["list"], {"page": rng.randint((self.total_pages + 1) // 2, self.total_pages), **sort}
+        if kind == "stats":
+            return kind, self.routes["stats"], {}
+        return kind, self.routes["detail"].format(id=rng.choice(self.ids)), {}
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+async def run_level(client, workload, concurrency, duration, seed):
+    latencies = []
+    by_kind = {}
+    errors = 0
+    deadline = time.monotonic() + duration
+
+    async def worker(worker_id):
+        nonlocal errors
+        rng = random.Random(seed * 1000 + worker_id)
+        while time.monotonic() < deadline:
+            kind, path, params = workload.request(rng)
+            started = time.perf_counter()
+            response = await client.get(path, params=params)
+            elapsed = time.perf_counter() - started
+            if response.status_code != 200:
+                errors += 1
+                continue
+            latencies.append(elapsed)
+            by_kind.setdefault(kind, []).append(elapsed)
+
+    started = time.monotonic()
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    elapsed = time.monotonic() - started
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": len(latencies) / elapsed if elapsed else 0.0,
+        "p50": percentile(latencies, 0.50) * 1000,
+        "p95": percentile(latencies, 0.95) * 1000,
+        "p99": percentile(latencies, 0.99) * 1000,
+        "p50_by_kind": {kind: percentile(sorted(values), 0.50) * 1000 for kind, values in sorted(by_kind.items())},
+    }
+
+
+async def bench_app(app_name, concurrency, duration, warmup):
+    """子进程内: 导入应用，执行启动事件后以给定并发数回放请求"""
+    import importlib
+
+    import httpx
+
+    routes = APPS[app_name]
+    app = importlib.import_module(app_name).app
+    transport = httpx.ASGITransport(app=app)
+
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://load-test") as client:
+            # 取几页真实数据作为检索词与详情 id 的来源
+            titles, ids, total_pages = [], [], 1
+            for sort_by in ("collections", "year"):
+                response = await client.get(routes["list"], params={"page_size": 100, "sort_by": sort_by})
+                response.raise_for_status()
+                body = response.json()
+                titles += [row["title"] for row in body["data"] if row.get("title")]
+                ids += [row["id"] for row in body["data"]]
+                total_pages = (body.get("total_pages") or 1) * 5  # page_size=100 -> 默认 page_size=20
+            workload = Workload(routes, titles, ids, total_pages)
+
+            await run_level(client, workload, concurrency, warmup, seed=0)
+            return await run_level(client, workload, concurrency, duration, seed=concurrency)
+
+
+def child_main(args):
+    result = asyncio.run(bench_app(args.child, args.concurrency[0], args.duration, args.warmup))
+    print(json.dumps(result))
+    return 0
+
+
+def build_sqlite(directory, csv_path):
+    from csv_transform import batch_rows, iter_csv_batches
+    from sqlite_db import SQLITE_IMPORT_COLUMNS, build_database
+
+    build_database(os.path.join(directory, "anime.db"), (
+        row for batch in iter_csv_batches(csv_path) for row in batch_rows(batch, SQLITE_IMPORT_COLUMNS)
+    ), SQLITE_IMPORT_COLUMNS)
+
+
+def run_child(app_name, backend, concurrency, directory, args):
+    """每个并发数使用新的子进程，一个并发数卡住 (例如连接池耗尽) 不影响其余结果"""
+    env = dict(os.environ, PYTHONPATH=ROOT, SQLITE_SNAPSHOT=os.path.join(directory, "missing.db"))
+    env.pop("VERCEL", None)
+    if not args.cache:
+        env["RESPONSE_CACHE_SIZE"] = "0"
+    if backend != "postgres":
+        # 未配置数据库 URL 时 main_postgres 使用当前目录下的 anime.db
+        env.pop("DATABASE_URL", None)
+        env.pop("POSTGRES_URL", None)
+        env.pop("POSTGRES_URL_NON_POOLING", None)
+
+    command = [sys.executable, os.path.abspath(__file__), "--child", app_name, "--duration", str(args.duration),
+               "--warmup", str(args.warmup), "--concurrency", str(concurrency)]
+    try:
+        result = subprocess.run(command, cwd=directory, env=env, capture_output=True, text=True,
+                                timeout=args.warmup + args.duration + args.timeout)
+    except subprocess.TimeoutExpired:
+        print(f"{app_name} ({backend}) at concurrency {concurrency}: no progress after {args.timeout:.0f}s, stopped")
+        return None
+    if result.returncode != 0:
+        print(f"{app_name} ({backend}) at concurrency {concurrency} failed:\n{result.stderr[-2000:]}")
+        return None
+    # 应用自身的日志也写入 stdout，结果为最后一行 JSON
+    return json.loads(next(line for line in reversed(result.stdout.splitlines()) if line.startswith("{")))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--apps", nargs="+", default=list(APPS), choices=list(APPS))
+    parser.add_argument("--csv", default=None, help="CSV for the SQLite database (default: generate --rows synthetic rows)")
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--warmup", type=float, default=1.0)
+    parser.add_argument("--timeout", type=float, default=60.0, help="seconds allowed past --duration per run")
+    parser.add_argument("--cache", action="store_true", help="keep the response cache enabled")
+    parser.add_argument("--child", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        return child_main(args)
+
+    has_postgres = bool(os.getenv("POSTGRES_URL") or os.getenv("DATABASE_URL"))
+    if not has_postgres:
+        print("DATABASE_URL / POSTGRES_URL not set - PostgreSQL-only apps are skipped")
+
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        # 应用在导入时挂载相对路径 frontend/，SQLite 应用读取当前目录下的 anime.db
+        os.symlink(os.path.join(ROOT, "frontend"), os.path.join(directory, "frontend"))
+        csv_path = args.csv
+        if not csv_path:
+            from generate_data import write_csv
+
+            csv_path = os.path.join(directory, "full_data.csv")
+            write_csv(csv_path, args.rows)
+        build_sqlite(directory, csv_path)
+
+        for app_name in args.apps:
+            for backend in APPS[app_name]["backends"]:
+                if backend == "postgres" and not has_postgres:
+                    continue
+                print(f"Running {app_name} ({backend}) ...")
+                by_level = {}
+                for concurrency in args.concurrency:
+                    result = run_child(app_name, backend, concurrency, directory, args)
+                    if result:
+                        by_level[concurrency] = result
+                if by_level:
+                    results.append((app_name, backend, by_level))
+
+    print(f"\n{'app':<22} {'backend':<9} {'conc':>4} {'req/s':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'errors':>6}  (ms)")
+    for app_name, backend, by_level in results:
+        for level, result in by_level.items():
+            print(f"{app_name:<22} {backend:<9} {level:>4} {result['rps']:>8.1f} {result['p50']:>8.2f} "
+                  f"{result['p95']:>8.2f} {result['p99']:>8.2f} {result['errors']:>6}")
+
+    print("\np50 by request type at the highest concurrency (ms)")
+    for app_name, backend, by_level in results:
+        by_kind = by_level[max(by_level)]["p50_by_kind"]
+        print(f"{app_name:<22} {backend:<9} " + "  ".join(f"{kind} {value:.2f}" for kind, value in by_kind.items()))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,28 @@
+import argparse
+import os
+import sys
+from csv_transform import batch_rows, iter_csv_batches
+from sqlite_db import SQLITE_IMPORT_COLUMNS, build_snapshot
+
+# 与 main.py 中 SQLITE_SNAPSHOT 的默认位置一致
+DEFAULT_SNAPSHOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "anime.db")
+
+def main():
+    """构建阶段: 由CSV生成带完整索引的只读SQLite快照，随部署包发布"""
+    parser = argparse.ArgumentParser(description="Build the read-only SQLite snapshot served by main.py")
+    parser.add_argument("--csv", default="full_data.csv")
+    parser.add_argument("--output", default=os.getenv("SQLITE_SNAPSHOT", DEFAULT_SNAPSHOT))
+    args = parser.parse_args()
+
+    if not os.path.exists(args.csv):
+        print(f"Error: CSV file not found at {args.csv}")
+        return 1
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    build_snapshot(args.output, (
+        row for batch in iter_csv_batches(args.csv) for row in batch_rows(batch, SQLITE_IMPORT_COLUMNS)
+    ), SQLITE_IMPORT_COLUMNS)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,60 @@
+import io
+import os
+import time
+from itertools import islice
+from typing import Any, Iterable, Sequence
+
+# 与 ANIME_INSERT_SQL 相同的列顺序
+ANIME_COLUMNS = ("title", "year", "average_rating", "rating_count", "collections", "watched", "completion_rate", "img_url")
+
+# 每批写入 COPY 缓冲区的行数 - 内存占用只与批大小有关，与文件大小无关
+COPY_BATCH_SIZE = int(os.getenv("COPY_BATCH_SIZE", "50000"))
+
+_COPY_ESCAPES = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"})
+
+
+def _copy_value(value: Any) -> str:
+    """COPY 文本格式的单个字段: NULL 写为 \\N，转义反斜杠与分隔符"""
+    if value is None:
+        return "\\N"
+    if isinstance(value, float) and value != value:  # NaN
+        return "\\N"
+    if isinstance(value, str):
+        return value.translate(_COPY_ESCAPES)
+    return str(value)
+
+
+def _copy_buffer(rows: Sequence[Sequence[Any]]) -> io.StringIO:
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write("\t".join(_copy_value(value) for value in row))
+        buffer.write("\n")
+    buffer.seek(0)
+    return buffer
+
+
+def copy_rows(cursor, rows: Iterable[Sequence[Any]], table: str = "anime",
+              columns: Sequence[str] = ANIME_COLUMNS, batch_size: int = COPY_BATCH_SIZE) -> int:
+    """以 COPY ... FROM STDIN 分批流式写入，返回写入的行数 (在调用方的事务中执行)"""
+    statement = f"COPY {table} ({', '.join(columns)}) FROM STDIN"
+    iterator = iter(rows)
+    total = 0
+    started = time.perf_counter()
+
+    while True:
+        batch = list(islice(iterator, batch_size))
+        if not batch:
+            break
+        buffer = _copy_buffer(batch)
+        if hasattr(cursor, "copy_expert"):
+            cursor.copy_expert(statement, buffer)
+        else:
+            # psycopg 3 (SQLAlchemy 2 默认的 postgresql 驱动)
+            with cursor.copy(statement) as copy:
+                copy.write(buffer.getvalue())
+        total += len(batch)
+
+    elapsed = time.perf_counter() - started
+    rate = total / elapsed if elapsed > 0 else 0.0
+    print(f"COPY loaded {total} rows into {table} in {elapsed:.2f}s ({rate:,.0f} rows/s)")
+    return total
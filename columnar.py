@@ -0,0 +1,219 @@
+import asyncio
+import contextvars
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # 可选依赖 - 未安装时内存引擎不可用
+    np = None
+
+from pagination import SORTABLE_COLUMNS, next_cursor
+
+# 数值列在快照中统一存为 float64，NULL 记为 NaN (比较结果为 False，与 SQL 过滤语义一致)
+NUMERIC_COLUMNS = ("year", "average_rating", "rating_count", "collections", "watched", "completion_rate")
+
+
+def available() -> bool:
+    """是否安装了 NumPy"""
+    return np is not None
+
+
+class AnimeSnapshot:
+    """anime 表的只读列式快照
+
+    每个数值列是一个 NumPy 数组，标题单独存为字符串列；每个可排序列预先计算
+    按 (列, id) 升序的 argsort 排列，降序直接反转，与 SQL 的 ORDER BY col, id 一致。
+
+    rows 须按数据库的 ORDER BY title, id 排列: 标题的先后由数据库的排序规则 (collation) 决定，
+    与 NumPy 的码位顺序不同，因此标题列按其在该顺序中的名次排序与比较。
+    """
+
+    def __init__(self, rows: List[Dict[str, Any]], version=None):
+        self.rows = rows
+        self.version = version
+        self.ids = np.array([row["id"] for row in rows], dtype=np.int64)
+        self.titles = np.array([row["title"] or "" for row in rows], dtype=str)
+        self.titles_lower = np.char.lower(self.titles)
+        self.columns = {
+            column: np.array(
+                [np.nan if row.get(column) is None else row[column] for row in rows],
+                dtype=np.float64,
+            )
+            for column in NUMERIC_COLUMNS
+        }
+        # 相同标题名次相同，名次之内再按 id 排序
+        title_ranks = np.zeros(len(rows), dtype=np.int64)
+        if len(rows) > 1:
+            title_ranks[1:] = np.cumsum(self.titles[1:] != self.titles[:-1])
+        self.title_ranks = {title: rank for title, rank in zip(self.titles.tolist(), title_ranks.tolist())}
+        self.columns["title"] = title_ranks
+        self.orders = {
+            column: np.lexsort((self.ids, self.columns[column]))
+            for column in SORTABLE_COLUMNS
+        }
+
+    @classmethod
+    def from_cursor(cls, cursor, version=None) -> "AnimeSnapshot":
+        """从已执行 SELECT 的游标构建快照"""
+        names = [description[0] for description in cursor.description]
+        return cls([dict(zip(names, row)) for row in cursor.fetchall()], version)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def _filter_mask(self, search, year_from, year_to, rating_from, rating_to):
+        mask = np.ones(len(self.rows), dtype=bool)
+
+        # 搜索过滤 - 不区分大小写的子串匹配 (与 ILIKE 一致)
+        if search:
+            mask &= np.char.find(self.titles_lower, search.lower()) >= 0
+
+        # 年份过滤
+        year = self.columns["year"]
+        if year_from is not None:
+            mask &= year >= year_from
+        if year_to is not None:
+            mask &= year <= year_to
+
+        # 评分过滤
+        rating = self.columns["average_rating"]
+        if rating_from is not None:
+            mask &= rating >= rating_from
+        if rating_to is not None:
+            mask &= rating <= rating_to
+
+        return mask
+
+    def _after_mask(self, sort_by, sort_order, position: Tuple[Any, int]):
+        """游标之后的行；NaN 与 PostgreSQL 的 NULL 一样视为最大值
+
+        标题游标按名次比较；标题不在快照中 (无法确定其在排序规则中的位置) 时返回 None。
+        """
+        value, last_id = position
+        column = self.columns[sort_by]
+        ids_after = self.ids < last_id if sort_order == "desc" else self.ids > last_id
+
+        if sort_by == "title":
+            value = self.title_ranks.get(value)
+            if value is None:
+                return None
+            if sort_order == "desc":
+                return (column < value) | ((column == value) & ids_after)
+            return (column > value) | ((column == value) & ids_after)
+
+        nulls = np.isnan(column)
+        if value is None:
+            # 游标位于 NULL 块内: 升序时 NULL 块之后已无数据，降序时其后是全部非 NULL 行
+            return (nulls & ids_after) | (~nulls if sort_order == "desc" else False)
+        if sort_order == "desc":
+            return (column < value) | ((column == value) & ids_after)
+        return (column > value) | ((column == value) & ids_after) | nulls
+
+    def query(self, page, page_size, search, year_from, year_to, rating_from, rating_to,
+              sort_by, sort_order, position=None, include_total=True) -> Optional[Dict[str, Any]]:
+        """在快照上完成过滤、排序与分页，返回与数据库路径相同结构的结果
+
+        标题游标无法在快照中定位时返回 None，由调用方改为查询数据库。
+        """
+        mask = self._filter_mask(search, year_from, year_to, rating_from, rating_to)
+        total = int(np.count_nonzero(mask)) if include_total else None
+
+        if position is not None:
+            after = self._after_mask(sort_by, sort_order, position)
+            if after is None:
+                return None
+            mask &= after
+            start_idx = 0
+        else:
+            start_idx = (page - 1) * page_size
+
+        order = self.orders[sort_by]
+        if sort_order == "desc":
+            order = order[::-1]
+        selected = order[mask[order]]
+
+        # 多取一行用于判断是否有下一页
+        page_rows = [self.rows[i] for i in selected[start_idx:start_idx + page_size + 1]]
+
+        return {
+            "data": page_rows[:page_size],
+            "total": total,
+            "page": page,
+            "page_size": page_size,
+            "total_pages": (total + page_size - 1) // page_size if total is not None else None,
+            "next_cursor": next_cursor(page_rows, page_size, sort_by, sort_order)
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        """与 /api/anime/stats 相同结构的统计数据"""
+        if not self.rows:
+            return {
+                "total_anime": 0,
+                "earliest_year": 0,
+                "latest_year": 0,
+                "avg_rating": 0,
+                "total_collections": 0,
+                "total_watched": 0
+            }
+
+        year = self.columns["year"]
+        rating = self.columns["average_rating"]
+        has_year = not np.all(np.isnan(year))
+        has_rating = not np.all(np.isnan(rating))
+        return {
+            "total_anime": len(self.rows),
+            "earliest_year": int(np.nanmin(year)) if has_year else 0,
+            "latest_year": int(np.nanmax(year)) if has_year else 0,
+            "avg_rating": round(float(np.nanmean(rating)), 2) if has_rating else 0,
+            "total_collections": int(np.nansum(self.columns["collections"])),
+            "total_watched": int(np.nansum(self.columns["watched"]))
+        }
+
+
+class SnapshotEngine:
+    """管理进程内快照：按间隔检查数据集版本，版本变化时在后台整表重新加载
+
+    刷新作为当前事件循环中的任务运行，请求不等待刷新，期间 (以及刷新失败时) 继续使用旧快照；
+    首次加载完成前 snapshot 为 None，调用方直接查询数据库。
+    """
+
+    def __init__(self, refresh_interval: float = 30.0):
+        self.refresh_interval = refresh_interval
+        self._snapshot: Optional[AnimeSnapshot] = None
+        self._checked_at = float("-inf")
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def snapshot(self) -> Optional[AnimeSnapshot]:
+        return self._snapshot
+
+    def needs_refresh(self) -> bool:
+        return self._task is None and time.monotonic() - self._checked_at >= self.refresh_interval
+
+    def refresh_in_background(self, load_version: Callable[[], Awaitable[Any]],
+                              load_rows: Callable[[], Awaitable[List[Dict[str, Any]]]]) -> None:
+        """到达检查间隔且没有进行中的刷新时启动一次刷新
+
+        load_version() 与 load_rows() 为协程函数，经应用配置的数据库驱动返回数据集版本与 anime 表的全部行；
+        构建快照 (NumPy 数组与排序) 在线程池中进行，不占用事件循环。
+        """
+        if self.needs_refresh():
+            # 在空上下文中创建任务：不继承触发请求的 contextvars (如 server_timing 的阶段记录)
+            loop = asyncio.get_running_loop()
+            self._task = contextvars.Context().run(loop.create_task, self._refresh(load_version, load_rows))
+
+    async def _refresh(self, load_version, load_rows) -> None:
+        try:
+            # 先读版本再读数据: 两次读取之间发生导入时，快照标记为旧版本，下一次检查会重新加载
+            version = await load_version()
+            if self._snapshot is None or self._snapshot.version != version:
+                rows = await load_rows()
+                self._snapshot = await asyncio.to_thread(AnimeSnapshot, rows, version)
+                print(f"Loaded in-memory snapshot: {len(self._snapshot)} rows (version {version[0]})")
+        except Exception as exc:
+            print(f"Snapshot refresh failed: {exc}")
+        finally:
+            # 失败时同样等待一个间隔再重试，期间使用旧快照或直接查询数据库
+            self._checked_at = time.monotonic()
+            self._task = None
@@ -0,0 +1,140 @@
+import hashlib
+import io
+import os
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import pandas as pd
+
+from bulk_loader import ANIME_COLUMNS
+
+# full_data.csv 的中文列名与 anime 表列名的对应关系
+CSV_COLUMNS = {
+    "标题": "title",
+    "年份": "year",
+    "平均评分": "average_rating",
+    "评分人数": "rating_count",
+    "收藏数": "collections",
+    "看过人数": "watched",
+    "完成率": "completion_rate",
+    "图片链接": "img_url",
+}
+
+INTEGER_COLUMNS = ("year", "rating_count", "collections", "watched")
+FLOAT_COLUMNS = ("average_rating", "completion_rate")
+TEXT_COLUMNS = ("title", "img_url")
+
+# 自然键各部分之间的分隔符 (不会出现在标题中)
+NATURAL_KEY_SEPARATOR = "\x1f"
+
+# 每次读取的行数 - 内存占用只与块大小有关，与文件大小无关
+CSV_CHUNK_SIZE = int(os.getenv("CSV_CHUNK_SIZE", "50000"))
+
+
+def transform_chunk(chunk: pd.DataFrame, start: int = 0,
+                    rejects: Optional[List[pd.DataFrame]] = None) -> pd.DataFrame:
+    """按列完成重命名、缺失值填充与类型转换
+
+    缺失值按原导入逻辑填 0 / 空字符串；存在但无法解析为数字的值所在的行被丢弃
+    (与原来逐行 int()/float() 失败时跳过该行一致)，传入 rejects 时原始行追加到其中。
+    id 为行在文件中的序号 + 1。
+    """
+    original = chunk
+    chunk = chunk.rename(columns=CSV_COLUMNS)
+    result = pd.DataFrame({"id": pd.RangeIndex(start + 1, start + len(chunk) + 1)}, index=chunk.index)
+    invalid = pd.Series(False, index=chunk.index)
+
+    for column in INTEGER_COLUMNS + FLOAT_COLUMNS:
+        raw = chunk[column] if column in chunk else pd.Series(None, index=chunk.index, dtype=object)
+        numeric = pd.to_numeric(raw, errors="coerce")
+        invalid |= raw.notna() & numeric.isna()
+        numeric = numeric.fillna(0)
+        result[column] = numeric.astype("int64") if column in INTEGER_COLUMNS else numeric.astype("float64")
+
+    for column in TEXT_COLUMNS:
+        raw = chunk[column] if column in chunk else pd.Series("", index=chunk.index)
+        result[column] = raw.fillna("").astype(str)
+
+    if invalid.any():
+        for position in result.index[invalid]:
+            print(f"Error processing row {position}: non-numeric value")
+        if rejects is not None:
+            rejects.append(original[invalid])
+        result = result[~invalid]
+
+    return result[["id", *ANIME_COLUMNS]]
+
+
+def iter_csv_batches(csv_path: str, chunk_size: int = CSV_CHUNK_SIZE) -> Iterator[pd.DataFrame]:
+    """分块读取 CSV 并逐块转换，产出可直接导入的 DataFrame"""
+    start = 0
+    # 全部按字符串读取，由 transform_chunk 统一转换并识别无法解析的值
+    for chunk in pd.read_csv(csv_path, chunksize=chunk_size, dtype=str):
+        yield transform_chunk(chunk, start)
+        start += len(chunk)
+
+
+def iter_csv_byte_chunks(csv_path: str, offset: Optional[int] = None,
+                         chunk_size: int = CSV_CHUNK_SIZE) -> Iterator[Tuple[int, pd.DataFrame]]:
+    """按行分块读取未转换的原始数据，并给出每块结束处的字节偏移，可从任一块边界继续读取
+
+    与并行导入相同，要求字段中不含换行符。
+    """
+    with open(csv_path, "rb") as f:
+        header = f.readline()
+        if offset is not None:
+            f.seek(offset)
+        while True:
+            lines = list(islice(f, chunk_size))
+            if not lines:
+                break
+            yield f.tell(), pd.read_csv(io.BytesIO(header + b"".join(lines)), dtype=str)
+
+
+def batch_rows(batch: pd.DataFrame, columns: Sequence[str] = ANIME_COLUMNS) -> List[Tuple]:
+    """将一块数据转换为 Python 原生类型的元组列表 (executemany / COPY / ORM 通用)"""
+    return list(batch[list(columns)].itertuples(index=False, name=None))
+
+
+def rows_to_batch(rows: Iterable[Sequence[Any]], columns: Sequence[str] = ANIME_COLUMNS) -> pd.DataFrame:
+    """将已转换好的元组 (如示例数据) 包装为与 iter_csv_batches 相同结构的一块"""
+    batch = pd.DataFrame(list(rows), columns=list(columns))
+    batch.insert(0, "id", pd.RangeIndex(1, len(batch) + 1))
+    return batch
+
+
+def row_hashes(batch: pd.DataFrame) -> List[int]:
+    """每行导入列的内容哈希: 规范化文本 (整数、float repr、原文，以分隔符连接) 的 SHA-1 前 8 字节
+
+    结果为有符号 64 位整数 (anime_import_state.row_hash 为 BIGINT)，不随 pandas 版本或列的 dtype 变化。
+    """
+    columns = []
+    for column in ANIME_COLUMNS:
+        values = batch[column].tolist()
+        if column in INTEGER_COLUMNS:
+            columns.append([str(int(value)) for value in values])
+        elif column in FLOAT_COLUMNS:
+            columns.append([repr(float(value)) for value in values])
+        else:
+            columns.append([str(value) for value in values])
+    return [
+        int.from_bytes(hashlib.sha1(NATURAL_KEY_SEPARATOR.join(parts).encode("utf-8")).digest()[:8], "big", signed=True)
+        for parts in zip(*columns)
+    ]
+
+
+def with_import_keys(batches: Iterable[pd.DataFrame]) -> Iterator[pd.DataFrame]:
+    """为每行附加自然键 natural_key 与内容哈希 row_hash (增量导入)
+
+    自然键 = 标题 + 年份 + 同名同年条目在文件中的序号，不随行号变化；
+    内容哈希见 row_hashes，覆盖全部导入列。
+    """
+    seen: Dict[str, int] = {}
+    for batch in batches:
+        base = batch["title"] + NATURAL_KEY_SEPARATOR + batch["year"].astype(str)
+        # 之前各块中已出现的同名同年条目数 + 块内序号
+        ordinal = base.groupby(base).cumcount() + base.map(seen).fillna(0).astype("int64")
+        for key, count in base.value_counts().items():
+            seen[key] = seen.get(key, 0) + count
+
+        yield batch.assign(natural_key=base + NATURAL_KEY_SEPARATOR + ordinal.astype(str), row_hash=row_hashes(batch))
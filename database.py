@@ -3,6 +3,8 @@ from sqlalchemy import create_engine, Column, Integer, String, Float, Text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from dotenv import load_dotenv
+import slow_query
+from db_schema import DATASET_VERSION_DDL, DATASET_VERSION_INIT_SQL, SEARCH_ENGINE, bootstrap_trigram
 
 # 加载环境变量
 load_dotenv()
@@ -22,7 +24,8 @@ def get_engine():
     global engine, SessionLocal
 
     if engine is None:
-        if not DATABASE_URL:
+        database_url = DATABASE_URL
+        if not database_url:
             # 如果没有数据库URL，使用SQLite作为后备
             engine = create_engine("sqlite:///./anime.db", connect_args={"check_same_thread": False})
             print("Warning: Using SQLite database for local development")
@@ -30,18 +33,18 @@ def get_engine():
             # 使用PostgreSQL - 确保连接字符串包含SSL模式
             try:
                 # 确保连接字符串包含sslmode
-                if 'sslmode=' not in DATABASE_URL:
-                    if '?' in DATABASE_URL:
-                        DATABASE_URL += "&sslmode=require"
+                if 'sslmode=' not in database_url:
+                    if '?' in database_url:
+                        database_url += "&sslmode=require"
                     else:
-                        DATABASE_URL += "?sslmode=require"
+                        database_url += "?sslmode=require"
 
-                engine = create_engine(DATABASE_URL)
+                engine = create_engine(database_url)
                 print("Successfully connected to PostgreSQL database")
 
                 # 测试连接
                 with engine.connect() as conn:
-                    conn.execute("SELECT 1")
+                    conn.exec_driver_sql("SELECT 1")
                     print("Database connection test passed")
 
             except Exception as e:
@@ -50,6 +53,10 @@ def get_engine():
                 engine = create_engine("sqlite:///./anime.db", connect_args={"check_same_thread": False})
                 print("Falling back to SQLite database")
 
+        # 慢查询日志 (SLOW_QUERY_MS)，PostgreSQL 上同时捕获执行计划
+        if slow_query.enabled():
+            slow_query.instrument_engine(engine)
+
         # 创建SessionLocal
         SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
@@ -74,6 +81,27 @@ def create_tables():
     engine = get_engine()
     Base.metadata.create_all(bind=engine)
 
+    # 数据集版本表 - 导入脚本写入后递增，供响应缓存判断数据是否变化
+    with engine.begin() as conn:
+        conn.exec_driver_sql(DATASET_VERSION_DDL)
+        conn.exec_driver_sql(DATASET_VERSION_INIT_SQL)
+
+    # 可选的 pg_trgm 标题索引 (SEARCH_ENGINE=trigram)
+    if SEARCH_ENGINE == "trigram" and engine.dialect.name == "postgresql":
+        raw_conn = engine.raw_connection()
+        try:
+            bootstrap_trigram(raw_conn)
+        finally:
+            raw_conn.close()
+
+# 连接池使用情况 (/metrics)
+def pool_stats():
+    """引擎尚未创建或连接池不计数 (如 NullPool) 时返回 None"""
+    if engine is None or not hasattr(engine.pool, "checkedout"):
+        return None
+    pool = engine.pool
+    return {"in_use": pool.checkedout(), "idle": pool.checkedin(), "size": pool.size(), "overflow": pool.overflow()}
+
 # 数据库依赖
 def get_db():
     get_engine()  # 确保引擎已创建
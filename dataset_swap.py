@@ -0,0 +1,174 @@
+"""导入时的原子数据集切换 (PostgreSQL)
+
+数据先写入暂存表 anime_staging，建好索引并 ANALYZE 后，在一个短事务中改名为 anime；
+原来的 anime 改名为 anime_previous 保留一代，可随时切回:
+
+    python dataset_swap.py rollback
+"""
+import os
+import re
+import sys
+from typing import Any, Iterable, Sequence
+
+from bulk_loader import ANIME_COLUMNS, copy_rows
+from db_schema import ANIME_TABLE_DDL, IMPORT_LOCK_ID, bump_dataset_version, import_lock
+
+# IMPORT_MODE=swap (默认): 暂存表 + 原子改名；IMPORT_MODE=replace: 在线上表中 DELETE 后重新写入；
+# IMPORT_MODE=incremental: 按自然键与内容哈希只写入变化的行 (见 incremental_import.py)；
+# IMPORT_MODE=resumable: 分批提交并记录检查点，可断点续传 (见 resumable_import.py)
+IMPORT_MODE = os.getenv("IMPORT_MODE", "swap").lower()
+
+# 切换事务等待表锁的上限，避免排在长查询之后阻塞所有新请求
+SWAP_LOCK_TIMEOUT = os.getenv("SWAP_LOCK_TIMEOUT", "5s")
+
+LIVE_TABLE = "anime"
+STAGING_TABLE = "anime_staging"
+PREVIOUS_TABLE = "anime_previous"
+
+# 每一代的索引与序列名称 = 线上名称 + 后缀 (索引名在 schema 内全局唯一)
+STAGING_SUFFIX = "_staging"
+PREVIOUS_SUFFIX = "_previous"
+
+_INDEX_DEF = re.compile(r"^(CREATE (?:UNIQUE )?INDEX )(\S+)( ON (?:ONLY )?)(\S+)( .*)$")
+
+
+def _rename(name: str, strip: str = "", append: str = "") -> str:
+    if strip and name.endswith(strip):
+        name = name[:-len(strip)]
+    return name + append
+
+
+def _table_indexes(cursor, table: str):
+    """表上的索引: [(名称, 是否主键, 定义)]"""
+    cursor.execute("""
+        SELECT c.relname, i.indisprimary, pg_get_indexdef(i.indexrelid)
+        FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid
+        WHERE i.indrelid = %s::regclass
+        ORDER BY c.relname
+    """, (table,))
+    return cursor.fetchall()
+
+
+def _id_sequence(cursor, table: str):
+    cursor.execute("SELECT pg_get_serial_sequence(%s, 'id')", (table,))
+    sequence = cursor.fetchone()[0]
+    return sequence.split(".")[-1].strip('"') if sequence else None
+
+
+def _rename_generation(cursor, table: str, new_table: str, strip: str = "", append: str = "") -> None:
+    """表连同索引 (含主键) 与 id 序列一起改名"""
+    for name, _, _ in _table_indexes(cursor, table):
+        cursor.execute(f'ALTER INDEX "{name}" RENAME TO "{_rename(name, strip, append)}"')
+    sequence = _id_sequence(cursor, table)
+    if sequence:
+        cursor.execute(f'ALTER SEQUENCE "{sequence}" RENAME TO "{_rename(sequence, strip, append)}"')
+    cursor.execute(f"ALTER TABLE {table} RENAME TO {new_table}")
+
+
+def _table_exists(cursor, table: str) -> bool:
+    cursor.execute("SELECT to_regclass(%s) IS NOT NULL", (f"public.{table}",))
+    return cursor.fetchone()[0]
+
+
+def create_staging(conn) -> None:
+    """重建空的暂存表；主键与序列按线上名称加后缀命名"""
+    with conn.cursor() as cursor:
+        cursor.execute(f"DROP TABLE IF EXISTS {STAGING_TABLE}")
+        cursor.execute(ANIME_TABLE_DDL.format(table=STAGING_TABLE))
+        cursor.execute(f'ALTER INDEX "{STAGING_TABLE}_pkey" RENAME TO "{LIVE_TABLE}_pkey{STAGING_SUFFIX}"')
+        cursor.execute(
+            f'ALTER SEQUENCE "{STAGING_TABLE}_id_seq" RENAME TO "{LIVE_TABLE}_id_seq{STAGING_SUFFIX}"'
+        )
+    conn.commit()
+
+
+def build_staging(conn) -> None:
+    """按线上表现有的索引定义为暂存表建索引 (包括 pg_trgm 等可选索引)，然后 ANALYZE"""
+    with conn.cursor() as cursor:
+        live_indexes = _table_indexes(cursor, LIVE_TABLE) if _table_exists(cursor, LIVE_TABLE) else []
+        for name, primary, definition in live_indexes:
+            match = _INDEX_DEF.match(definition)
+            if primary or not match:
+                continue
+            prefix, _, on, _, rest = match.groups()
+            cursor.execute(f'{prefix}"{name}{STAGING_SUFFIX}"{on}{STAGING_TABLE}{rest}')
+
+        # 导入可能显式写入 id，序列从现有最大值之后继续
+        cursor.execute(
+            f"SELECT setval(pg_get_serial_sequence(%s, 'id'), COALESCE(MAX(id), 0) + 1, false) FROM {STAGING_TABLE}",
+            (STAGING_TABLE,),
+        )
+        cursor.execute(f"ANALYZE {STAGING_TABLE}")
+    conn.commit()
+    print(f"Staging table {STAGING_TABLE} indexed and analyzed")
+
+
+def swap_in(conn) -> None:
+    """短事务: 线上表改名为 anime_previous，暂存表改名为 anime，并递增数据集版本"""
+    with conn.cursor() as cursor:
+        cursor.execute(f"SET LOCAL lock_timeout = '{SWAP_LOCK_TIMEOUT}'")
+        cursor.execute(f"DROP TABLE IF EXISTS {PREVIOUS_TABLE}")
+        if _table_exists(cursor, LIVE_TABLE):
+            _rename_generation(cursor, LIVE_TABLE, PREVIOUS_TABLE, append=PREVIOUS_SUFFIX)
+        _rename_generation(cursor, STAGING_TABLE, LIVE_TABLE, strip=STAGING_SUFFIX)
+        bump_dataset_version(cursor)
+    conn.commit()
+    print(f"Swapped {STAGING_TABLE} in as {LIVE_TABLE}; previous generation kept as {PREVIOUS_TABLE}")
+
+
+def rollback(conn) -> bool:
+    """切回上一代数据: anime 与 anime_previous 互换；没有上一代时返回 False"""
+    with conn.cursor() as cursor:
+        # 不与进行中的导入交错 (导入结束时会把 anime 换成新数据)
+        cursor.execute("SELECT pg_advisory_xact_lock(%s)", (IMPORT_LOCK_ID,))
+        cursor.execute(f"SET LOCAL lock_timeout = '{SWAP_LOCK_TIMEOUT}'")
+        if not _table_exists(cursor, PREVIOUS_TABLE):
+            conn.rollback()
+            print(f"No previous generation ({PREVIOUS_TABLE}) to roll back to")
+            return False
+        cursor.execute(f"DROP TABLE IF EXISTS {STAGING_TABLE}")
+        _rename_generation(cursor, LIVE_TABLE, STAGING_TABLE, append=STAGING_SUFFIX)
+        _rename_generation(cursor, PREVIOUS_TABLE, LIVE_TABLE, strip=PREVIOUS_SUFFIX)
+        _rename_generation(cursor, STAGING_TABLE, PREVIOUS_TABLE, strip=STAGING_SUFFIX, append=PREVIOUS_SUFFIX)
+        bump_dataset_version(cursor)
+    conn.commit()
+    print(f"Rolled back: {PREVIOUS_TABLE} is live again")
+    return True
+
+
+def swap_import(conn, rows: Iterable[Sequence[Any]], columns: Sequence[str] = ANIME_COLUMNS) -> int:
+    """写入暂存表并原子切换为线上表，返回导入的行数；失败时线上表保持不变
+
+    整个过程持有导入锁，两个同时运行的导入不会重建彼此正在写入的暂存表。
+    """
+    with import_lock(conn):
+        create_staging(conn)
+        with conn.cursor() as cursor:
+            imported = copy_rows(cursor, rows, table=STAGING_TABLE, columns=columns)
+        conn.commit()
+        build_staging(conn)
+        swap_in(conn)
+    return imported
+
+
+if __name__ == "__main__":
+    import psycopg2
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    if sys.argv[1:] != ["rollback"]:
+        print("Usage: python dataset_swap.py rollback")
+        sys.exit(2)
+
+    database_url = os.getenv('POSTGRES_URL_NON_POOLING') or os.getenv('POSTGRES_URL') or os.getenv('DATABASE_URL')
+    if not database_url:
+        print("Error: set POSTGRES_URL or DATABASE_URL")
+        sys.exit(1)
+    if 'sslmode=' not in database_url:
+        database_url += ("&" if "?" in database_url else "?") + "sslmode=require"
+
+    conn = psycopg2.connect(database_url)
+    try:
+        sys.exit(0 if rollback(conn) else 1)
+    finally:
+        conn.close()
@@ -0,0 +1,202 @@
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict
+
+# 连接池参数 - 同时用于 psycopg2 连接池与 psycopg 3 异步连接池
+POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "5"))
+# 同时排队等待连接的请求上限，超出时立即失败 (0 表示不限)
+POOL_MAX_WAITING = int(os.getenv("DB_POOL_MAX_WAITING", "0"))
+# 连接最长存活时间与空闲回收时间 (秒) - Serverless 实例冻结后连接可能已被服务端断开
+POOL_MAX_LIFETIME = float(os.getenv("DB_POOL_MAX_LIFETIME", "1800"))
+POOL_MAX_IDLE = float(os.getenv("DB_POOL_MAX_IDLE", "300"))
+POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+# 只对空闲超过该时间 (秒) 的连接探活；刚归还的连接直接复用，免去每次取出的一次往返
+POOL_PING_IDLE = float(os.getenv("DB_POOL_PING_IDLE", "30"))
+
+
+class PoolTimeout(Exception):
+    """在 acquire 超时时间内没有可用连接 (或等待队列已满)"""
+
+
+class ConnectionPool:
+    """阻塞式连接池
+
+    连接耗尽时请求在条件变量上排队等待，直到有连接归还或超时；取出时回收超龄与
+    空闲过久的连接，并可选地对空闲超过 ping_idle 秒的连接执行 SELECT 1 探活。
+    统计数据通过 stats() 提供给监控。
+
+    getconn 会阻塞调用线程，异步处理函数中应经线程池调用 (starlette.concurrency.run_in_threadpool)。
+    """
+
+    def __init__(self, connect: Callable[[], Any], min_conn: int = 1, max_conn: int = 5,
+                 timeout: float = POOL_TIMEOUT, max_waiting: int = POOL_MAX_WAITING,
+                 max_lifetime: float = POOL_MAX_LIFETIME, max_idle: float = POOL_MAX_IDLE,
+                 pre_ping: bool = POOL_PRE_PING, ping_idle: float = POOL_PING_IDLE):
+        self._connect = connect
+        self.max_conn = max_conn
+        self.timeout = timeout
+        self.max_waiting = max_waiting
+        self.max_lifetime = max_lifetime
+        self.max_idle = max_idle
+        self.pre_ping = pre_ping
+        self.ping_idle = ping_idle
+
+        self._cond = threading.Condition()
+        self._idle = deque()  # (conn, 归还时间)，后进先出以便多余连接自然空闲并被回收
+        self._created_at: Dict[int, float] = {}
+        self._size = 0
+        self._waiting = 0
+        self._closed = False
+        self._counters = {
+            "checkouts": 0,
+            "timeouts": 0,
+            "rejected": 0,
+            "wait_time_total": 0.0,
+            "wait_time_max": 0.0,
+            "connections_created": 0,
+            "connections_closed": 0,
+            "pings": 0,
+            "ping_failures": 0,
+        }
+
+        for _ in range(min_conn):
+            conn = self._open()
+            self._idle.append((conn, time.monotonic()))
+
+    def _open(self):
+        conn = self._connect()
+        with self._cond:
+            self._size += 1
+            self._created_at[id(conn)] = time.monotonic()
+            self._counters["connections_created"] += 1
+        return conn
+
+    def _discard(self, conn) -> None:
+        """关闭连接并释放名额 (调用方持有锁)"""
+        self._size -= 1
+        self._created_at.pop(id(conn), None)
+        self._counters["connections_closed"] += 1
+        try:
+            conn.close()
+        except Exception:
+            pass
+        self._cond.notify()
+
+    def _expired(self, conn, now: float) -> bool:
+        return self.max_lifetime > 0 and now - self._created_at.get(id(conn), now) >= self.max_lifetime
+
+    def _reap_idle(self, now: float) -> None:
+        """回收空闲过久或超龄的连接 (调用方持有锁)"""
+        for conn, returned_at in list(self._idle):
+            if (self.max_idle > 0 and now - returned_at >= self.max_idle) or self._expired(conn, now):
+                self._idle.remove((conn, returned_at))
+                self._discard(conn)
+
+    def _ping(self, conn) -> bool:
+        if getattr(conn, "closed", False):
+            return False
+        try:
+            cursor = conn.cursor()
+            try:
+                cursor.execute("SELECT 1")
+                cursor.fetchone()
+            finally:
+                cursor.close()
+            conn.rollback()
+            return True
+        except Exception:
+            return False
+
+    def getconn(self):
+        """取出一个连接；没有空闲连接且已达上限时阻塞等待，超时抛出 PoolTimeout"""
+        started = time.monotonic()
+        deadline = started + self.timeout
+
+        while True:
+            conn = None
+            returned_at = 0.0
+            with self._cond:
+                if self._closed:
+                    raise PoolTimeout("Connection pool is closed")
+
+                while True:
+                    now = time.monotonic()
+                    self._reap_idle(now)
+                    if self._idle:
+                        conn, returned_at = self._idle.pop()
+                        break
+                    if self._size < self.max_conn:
+                        # 预占名额，在锁外建立连接
+                        self._size += 1
+                        break
+
+                    remaining = deadline - now
+                    if self.max_waiting and self._waiting >= self.max_waiting:
+                        self._counters["rejected"] += 1
+                        raise PoolTimeout(f"Connection pool wait queue is full ({self.max_waiting})")
+                    if remaining <= 0:
+                        self._counters["timeouts"] += 1
+                        raise PoolTimeout(f"No database connection available within {self.timeout:.1f}s")
+
+                    self._waiting += 1
+                    try:
+                        self._cond.wait(remaining)
+                    finally:
+                        self._waiting -= 1
+
+            if conn is None:
+                try:
+                    conn = self._connect()
+                except Exception:
+                    with self._cond:
+                        self._size -= 1
+                        self._cond.notify()
+                    raise
+                with self._cond:
+                    self._created_at[id(conn)] = time.monotonic()
+                    self._counters["connections_created"] += 1
+            elif self.pre_ping and time.monotonic() - returned_at >= self.ping_idle:
+                alive = self._ping(conn)
+                with self._cond:
+                    self._counters["pings"] += 1
+                    if not alive:
+                        self._counters["ping_failures"] += 1
+                        self._discard(conn)
+                if not alive:
+                    continue
+
+            waited = time.monotonic() - started
+            with self._cond:
+                self._counters["checkouts"] += 1
+                self._counters["wait_time_total"] += waited
+                self._counters["wait_time_max"] = max(self._counters["wait_time_max"], waited)
+            return conn
+
+    def putconn(self, conn, close: bool = False) -> None:
+        """归还连接；已断开、已超龄或指定 close 时直接关闭"""
+        with self._cond:
+            if close or self._closed or getattr(conn, "closed", False) or self._expired(conn, time.monotonic()):
+                self._discard(conn)
+                return
+            self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    def closeall(self) -> None:
+        with self._cond:
+            self._closed = True
+            while self._idle:
+                self._discard(self._idle.pop()[0])
+            self._cond.notify_all()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                **self._counters,
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": self._size - len(self._idle),
+                "waiting": self._waiting,
+                "max_size": self.max_conn,
+            }
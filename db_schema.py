@@ -0,0 +1,197 @@
+import os
+import threading
+from contextlib import contextmanager
+
+# PostgreSQL 表结构 - 应用启动与导入脚本共用同一份定义
+ANIME_TABLE_DDL = """
+    CREATE TABLE IF NOT EXISTS {table} (
+        id SERIAL PRIMARY KEY,
+        title VARCHAR(255) NOT NULL,
+        year INTEGER,
+        average_rating FLOAT,
+        rating_count INTEGER,
+        collections INTEGER,
+        watched INTEGER,
+        completion_rate FLOAT,
+        img_url TEXT
+    )
+"""
+
+# 排序列 + id 的复合索引，同时服务于范围过滤与 keyset 分页 (ORDER BY col, id)
+ANIME_INDEXES = [
+    ("idx_anime_title_id", "title, id"),
+    ("idx_anime_year_id", "year, id"),
+    ("idx_anime_average_rating_id", "average_rating, id"),
+    ("idx_anime_rating_count_id", "rating_count, id"),
+    ("idx_anime_collections_id", "collections, id"),
+    ("idx_anime_watched_id", "watched, id"),
+]
+
+ANIME_INSERT_SQL = """
+    INSERT INTO anime (title, year, average_rating, rating_count, collections, watched, completion_rate, img_url)
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+"""
+
+# 数据集版本 - 导入脚本在每次写入后递增，供快照、缓存与 ETag 判断数据是否变化
+# (DDL 与 SQL 同时兼容 PostgreSQL 与 SQLite)
+DATASET_VERSION_DDL = """
+    CREATE TABLE IF NOT EXISTS anime_dataset_version (
+        id INTEGER PRIMARY KEY,
+        version BIGINT NOT NULL,
+        updated_at TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+
+DATASET_VERSION_INIT_SQL = """
+    INSERT INTO anime_dataset_version (id, version) VALUES (1, 1)
+    ON CONFLICT (id) DO NOTHING
+"""
+
+DATASET_VERSION_BUMP_SQL = """
+    INSERT INTO anime_dataset_version (id, version) VALUES (1, 1)
+    ON CONFLICT (id) DO UPDATE SET
+        version = anime_dataset_version.version + 1,
+        updated_at = CURRENT_TIMESTAMP
+"""
+
+DATASET_VERSION_SELECT_SQL = "SELECT version, updated_at FROM anime_dataset_version WHERE id = 1"
+
+# 可选的 pg_trgm 检索引擎 - SEARCH_ENGINE=trigram 时在初始化阶段建立 GIN 索引，
+# ILIKE '%词%' 可直接走该索引，并支持 search_mode=fuzzy 的相似度排序
+SEARCH_ENGINE = os.getenv("SEARCH_ENGINE", "ilike").lower()
+TRIGRAM_INDEX_NAME = "idx_anime_title_trgm"
+
+# 多个实例同时冷启动时，用 advisory lock 串行化建表
+BOOTSTRAP_LOCK_ID = 20251001
+# 各导入方式 (swap / parallel / resumable / incremental / replace) 与 dataset_swap rollback 之间互斥
+IMPORT_LOCK_ID = 20251002
+
+_schema_ready = False
+_trigram_ready = False
+_schema_lock = threading.Lock()
+
+
+def schema_ready() -> bool:
+    """当前进程是否已完成表结构初始化"""
+    return _schema_ready
+
+
+def trigram_ready() -> bool:
+    """pg_trgm 扩展与标题索引是否可用"""
+    return _trigram_ready
+
+
+def bootstrap_schema(conn, seed_rows=()):
+    """创建表与索引；仅在本次新建表时写入示例数据"""
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT pg_advisory_xact_lock(%s)", (BOOTSTRAP_LOCK_ID,))
+        cursor.execute("SELECT to_regclass('public.anime') IS NULL")
+        created = cursor.fetchone()[0]
+
+        cursor.execute(ANIME_TABLE_DDL.format(table="anime"))
+        for index_name, columns in ANIME_INDEXES:
+            cursor.execute(f"CREATE INDEX IF NOT EXISTS {index_name} ON anime ({columns})")
+
+        cursor.execute(DATASET_VERSION_DDL)
+        cursor.execute(DATASET_VERSION_INIT_SQL)
+
+        if created and seed_rows:
+            cursor.executemany(ANIME_INSERT_SQL, [
+                (
+                    anime['title'], anime['year'], anime['average_rating'],
+                    anime['rating_count'], anime['collections'], anime['watched'],
+                    anime['completion_rate'], anime['img_url']
+                )
+                for anime in seed_rows
+            ])
+            print(f"Table 'anime' created with {len(seed_rows)} sample rows")
+
+    conn.commit()
+
+
+@contextmanager
+def import_lock(conn):
+    """会话级 advisory lock: 跨多个事务的导入期间持有，其他导入等待其完成；连接断开时服务端自动释放
+
+    单事务的导入改用 pg_advisory_xact_lock(IMPORT_LOCK_ID)，两者互斥。进入时会提交连接上已有的事务。
+    """
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT pg_try_advisory_lock(%s)", (IMPORT_LOCK_ID,))
+        if not cursor.fetchone()[0]:
+            print("Another import is running; waiting for it to finish")
+            cursor.execute("SELECT pg_advisory_lock(%s)", (IMPORT_LOCK_ID,))
+    conn.commit()
+    try:
+        yield
+    finally:
+        if not conn.closed:
+            try:
+                # 导入失败时事务处于中止状态，先回滚才能释放锁
+                conn.rollback()
+                with conn.cursor() as cursor:
+                    cursor.execute("SELECT pg_advisory_unlock(%s)", (IMPORT_LOCK_ID,))
+                conn.commit()
+            except Exception as exc:
+                # 连接已断开: 锁随会话结束释放，不掩盖导入本身的异常
+                print(f"Import lock release failed: {exc}")
+
+
+def get_dataset_version(conn):
+    """读取当前数据集版本，返回 (version, updated_at)"""
+    cursor = conn.cursor()
+    try:
+        cursor.execute(DATASET_VERSION_SELECT_SQL)
+        row = cursor.fetchone()
+    finally:
+        cursor.close()
+    return (row[0], row[1]) if row else (0, None)
+
+
+def bump_dataset_version(cursor):
+    """在导入事务中递增数据集版本 (随导入一起提交)"""
+    cursor.execute(DATASET_VERSION_DDL)
+    cursor.execute(DATASET_VERSION_BUMP_SQL)
+
+
+def bootstrap_trigram(conn, table: str = "anime", index_name: str = TRIGRAM_INDEX_NAME) -> bool:
+    """安装 pg_trgm 并为标题建立 GIN 三元组索引；扩展不可用时返回 False"""
+    global _trigram_ready
+
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+            cursor.execute(f"CREATE INDEX IF NOT EXISTS {index_name} ON {table} USING gin (title gin_trgm_ops)")
+        conn.commit()
+    except Exception as exc:
+        print(f"Trigram search unavailable, falling back to ILIKE: {exc}")
+        conn.rollback()
+        return False
+
+    _trigram_ready = True
+    return True
+
+
+def ensure_schema(conn, seed_rows=()) -> bool:
+    """进程内只初始化一次表结构，之后直接返回，不再产生额外查询"""
+    global _schema_ready
+
+    if _schema_ready:
+        return True
+
+    with _schema_lock:
+        if _schema_ready:
+            return True
+
+        try:
+            bootstrap_schema(conn, seed_rows)
+        except Exception as exc:
+            print(f"Schema bootstrap failed: {exc}")
+            conn.rollback()
+            return False
+
+        if SEARCH_ENGINE == "trigram":
+            bootstrap_trigram(conn)
+
+        _schema_ready = True
+        print("Database schema ready")
+        return True
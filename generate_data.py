@@ -0,0 +1,191 @@
+"""可复现的合成番剧数据 (规模测试用)
+
+按固定种子分块生成，内存占用只与块大小有关；相同的种子与行数总是得到相同的数据:
+
+    python generate_data.py --rows 1000000 --output full_data.csv
+    python generate_data.py --rows 1000000 --format parquet --output anime.parquet
+    python generate_data.py --rows 1000000 --format postgres   # 经暂存表 COPY 并原子切换 (dataset_swap.py)
+
+分布: 收藏数为长尾 (对数正态)，看过/评分人数随收藏数按比例抽样；年份集中在几个年代；
+标题由共享词根组合而成 (大量重复子串，便于检验检索)；约 8% 的条目没有图片链接，约 2% 没有年份。
+"""
+import argparse
+import os
+import sys
+from typing import Iterator, Optional
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # 可选依赖 - --format parquet 时需要 pyarrow
+    pa = None
+
+from bulk_loader import ANIME_COLUMNS
+from csv_transform import CSV_COLUMNS, batch_rows, transform_chunk
+
+# 每块生成的行数；种子按块派生，因此它也是可复现性的一部分，不随环境变量变化
+GENERATOR_CHUNK_SIZE = 100000
+
+# 标题: [前缀] + 两字名 + 词根 + [后缀]
+TITLE_PREFIXES = ["某科学的", "魔法", "进击的", "命运", "孤独", "钢之", "机动战士", "银河", "星之", "我的", "关于", "在"]
+TITLE_NAME_CHARS = list("春夏秋冬花月雪风山海星空光影梦樱紫青白黑红金银天龙凤猫狐樱岚雷火水森林铃音")
+TITLE_CORES = ["少女", "巨人", "石之门", "摇滚", "炼金术师", "超电磁炮", "物语", "勇者", "高达", "乐队", "偶像",
+               "侦探", "学园", "魔王", "骑士", "恋爱", "日常", "冒险", "战记", "食堂"]
+TITLE_SUFFIXES = ["", " 第二季", " 第三季", " 剧场版", " OVA", " 续篇", " 最终章", " 特别篇"]
+SUFFIX_WEIGHTS = [0.70, 0.10, 0.05, 0.05, 0.04, 0.03, 0.02, 0.01]
+
+# 年份: 几个集中的年代 (中心, 标准差, 权重)，另有 5% 均匀分布在 1960-2025
+YEAR_CLUSTERS = [(1998, 5.0, 0.15), (2008, 3.0, 0.30), (2016, 3.0, 0.30), (2021, 2.0, 0.20)]
+
+
+def parquet_available() -> bool:
+    """是否安装了 pyarrow"""
+    return pa is not None
+
+
+def _weights(count: int, skew: float = 1.1) -> np.ndarray:
+    """Zipf 式权重: 靠前的词根更常见"""
+    weights = 1.0 / np.arange(1, count + 1) ** skew
+    return weights / weights.sum()
+
+
+def _titles(rng: np.random.Generator, size: int) -> np.ndarray:
+    prefixes = np.array([""] + TITLE_PREFIXES, dtype=object)
+    prefix_index = np.where(rng.random(size) < 0.35, rng.integers(1, len(prefixes), size), 0)
+    first = rng.integers(0, len(TITLE_NAME_CHARS), size)
+    second = rng.integers(0, len(TITLE_NAME_CHARS), size)
+    core = rng.choice(len(TITLE_CORES), size, p=_weights(len(TITLE_CORES)))
+    suffix = rng.choice(len(TITLE_SUFFIXES), size, p=SUFFIX_WEIGHTS)
+
+    names = np.array(TITLE_NAME_CHARS, dtype=object)
+    return (prefixes[prefix_index] + names[first] + names[second]
+            + np.array(TITLE_CORES, dtype=object)[core] + np.array(TITLE_SUFFIXES, dtype=object)[suffix])
+
+
+def _years(rng: np.random.Generator, size: int) -> pd.api.extensions.ExtensionArray:
+    centers, spreads, weights = (np.array(values) for values in zip(*YEAR_CLUSTERS))
+    cluster = rng.choice(len(YEAR_CLUSTERS) + 1, size, p=np.append(weights, 1 - weights.sum()))
+    clustered = rng.normal(centers[np.minimum(cluster, len(centers) - 1)], spreads[np.minimum(cluster, len(spreads) - 1)])
+    years = np.where(cluster == len(YEAR_CLUSTERS), rng.integers(1960, 2026, size), np.rint(clustered))
+    years = pd.array(np.clip(years, 1960, 2025).astype("int64"), dtype="Int64")
+    years[rng.random(size) < 0.02] = pd.NA
+    return years
+
+
+def generate_frame(rng: np.random.Generator, start: int, size: int) -> pd.DataFrame:
+    """一块原始数据 (中文列名，缺失值为空)，与 full_data.csv 读入后的结构一致"""
+    collections = np.minimum(rng.lognormal(5.5, 1.7, size), 150000).astype("int64")
+    watched = (collections * rng.beta(5, 2, size)).astype("int64")
+    rating_count = (watched * rng.beta(4, 3, size)).astype("int64")
+    completion_rate = np.round(np.divide(watched, collections, out=np.zeros(size), where=collections > 0), 3)
+    # 收藏越多的条目评分略高
+    rating = rng.normal(6.6 + 0.12 * (np.log1p(collections) - 5.5), 0.8)
+    average_rating = np.round(np.clip(rating, 1.5, 9.6), 1)
+
+    ids = np.arange(start + 1, start + size + 1)
+    tokens = rng.integers(0, 16 ** 5, size)
+    img_url = np.array([f"https://lain.bgm.tv/r/400/pic/cover/l/{i % 256:02x}/{(i // 256) % 256:02x}/{i}_{t:05x}.jpg"
+                        for i, t in zip(ids, tokens)], dtype=object)
+    img_url[rng.random(size) < 0.08] = None
+
+    english = {
+        "title": _titles(rng, size),
+        "year": _years(rng, size),
+        "average_rating": average_rating,
+        "rating_count": rating_count,
+        "collections": collections,
+        "watched": watched,
+        "completion_rate": completion_rate,
+        "img_url": img_url,
+    }
+    headers = {column: header for header, column in CSV_COLUMNS.items()}
+    return pd.DataFrame({headers[column]: english[column] for column in ANIME_COLUMNS},
+                        index=pd.RangeIndex(start, start + size))
+
+
+def generate_frames(rows: int, seed: int = 0, chunk_size: int = GENERATOR_CHUNK_SIZE) -> Iterator[pd.DataFrame]:
+    """按块产出 rows 行原始数据；第 k 块使用种子 (seed, k)"""
+    for number, start in enumerate(range(0, rows, chunk_size)):
+        rng = np.random.default_rng([seed, number])
+        yield generate_frame(rng, start, min(chunk_size, rows - start))
+
+
+def write_csv(path: str, rows: int, seed: int = 0) -> int:
+    """写出与 full_data.csv 相同表头的 CSV"""
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        for number, frame in enumerate(generate_frames(rows, seed)):
+            frame.to_csv(f, header=number == 0, index=False)
+    return rows
+
+
+def write_parquet(path: str, rows: int, seed: int = 0) -> int:
+    """写出中文列名的 Parquet 文件 (每块一个 row group)"""
+    if not parquet_available():
+        raise RuntimeError("--format parquet requires pyarrow")
+    writer: Optional["pq.ParquetWriter"] = None
+    try:
+        for frame in generate_frames(rows, seed):
+            table = pa.Table.from_pandas(frame, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(path, table.schema)
+            writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
+    return rows
+
+
+def iter_import_rows(rows: int, seed: int = 0) -> Iterator[tuple]:
+    """经过与导入脚本相同的转换 (transform_chunk) 后的行，含 id 列"""
+    for frame in generate_frames(rows, seed):
+        yield from batch_rows(transform_chunk(frame, int(frame.index[0])), ("id",) + ANIME_COLUMNS)
+
+
+def load_postgres(rows: int, seed: int = 0) -> int:
+    """直接 COPY 到暂存表并原子切换为线上 anime 表"""
+    import psycopg2
+    from dotenv import load_dotenv
+
+    from dataset_swap import swap_import
+
+    load_dotenv()
+    database_url = os.getenv('POSTGRES_URL_NON_POOLING') or os.getenv('POSTGRES_URL') or os.getenv('DATABASE_URL')
+    if not database_url:
+        raise RuntimeError("set POSTGRES_URL or DATABASE_URL")
+    if 'sslmode=' not in database_url:
+        database_url += ("&" if "?" in database_url else "?") + "sslmode=require"
+
+    conn = psycopg2.connect(database_url)
+    try:
+        return swap_import(conn, iter_import_rows(rows, seed), ("id",) + ANIME_COLUMNS)
+    finally:
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a deterministic synthetic anime catalogue")
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--format", choices=["csv", "parquet", "postgres"], default="csv")
+    parser.add_argument("--output", default=None, help="output file (default: full_data.csv / anime.parquet)")
+    args = parser.parse_args()
+
+    try:
+        if args.format == "postgres":
+            written = load_postgres(args.rows, args.seed)
+            print(f"Loaded {written} synthetic rows into anime (seed {args.seed})")
+        else:
+            output = args.output or ("full_data.csv" if args.format == "csv" else "anime.parquet")
+            (write_csv if args.format == "csv" else write_parquet)(output, args.rows, args.seed)
+            print(f"Wrote {args.rows} synthetic rows to {output} (seed {args.seed})")
+    except RuntimeError as exc:
+        print(f"Error: {exc}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
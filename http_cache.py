@@ -0,0 +1,61 @@
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Dict, Optional
+
+# 浏览器可以保存响应，但每次使用前都要带验证器回源确认
+CACHE_CONTROL = "no-cache"
+
+
+def _as_utc(updated_at: Any) -> Optional[datetime]:
+    """数据集版本的更新时间 - PostgreSQL 返回 datetime，SQLite 返回 UTC 字符串"""
+    if updated_at is None:
+        return None
+    if isinstance(updated_at, str):
+        try:
+            updated_at = datetime.fromisoformat(updated_at)
+        except ValueError:
+            return None
+    if updated_at.tzinfo is None:
+        updated_at = updated_at.replace(tzinfo=timezone.utc)
+    return updated_at.astimezone(timezone.utc).replace(microsecond=0)
+
+
+def validator_headers(generation, key: str) -> Dict[str, str]:
+    """由 (数据集版本, 更新时间) 与规范化的请求键生成强 ETag 与 Last-Modified"""
+    version, updated_at = generation
+    digest = hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+    headers = {"ETag": f'"{version}-{digest}"', "Cache-Control": CACHE_CONTROL}
+
+    last_modified = _as_utc(updated_at)
+    if last_modified is not None:
+        headers["Last-Modified"] = format_datetime(last_modified, usegmt=True)
+    return headers
+
+
+def _etag_matches(if_none_match: str, etag: str, exists: bool) -> bool:
+    """If-None-Match 使用弱比较 (RFC 9110 13.1.2)；* 只在资源存在时匹配"""
+    if if_none_match.strip() == "*":
+        return exists
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    return any(candidate.removeprefix("W/") == etag for candidate in candidates)
+
+
+def is_not_modified(request_headers, headers: Dict[str, str], exists: bool = True) -> bool:
+    """客户端的验证器与当前版本一致时返回 True；存在 If-None-Match 时忽略 If-Modified-Since
+
+    exists=False 用于执行端点之前: 此时还不知道资源是否存在 (例如详情 id 不存在时应返回 404)，
+    If-None-Match: * 不视为匹配。
+    """
+    if_none_match = request_headers.get("if-none-match")
+    if if_none_match is not None:
+        return _etag_matches(if_none_match, headers["ETag"], exists)
+
+    if_modified_since = request_headers.get("if-modified-since")
+    last_modified = headers.get("Last-Modified")
+    if if_modified_since and last_modified:
+        try:
+            return parsedate_to_datetime(last_modified) <= parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+    return False
@@ -1,7 +1,13 @@
-import pandas as pd
 import os
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, text
+from bulk_loader import ANIME_COLUMNS, copy_rows
+from csv_transform import batch_rows, iter_csv_batches
+from dataset_swap import IMPORT_MODE, swap_import
+from incremental_import import incremental_import
+from parallel_import import IMPORT_WORKERS, parallel_swap_import
+from resumable_import import ResumableImport
 from database import Anime, Base
+from db_schema import DATASET_VERSION_BUMP_SQL, DATASET_VERSION_DDL, IMPORT_LOCK_ID
 from dotenv import load_dotenv
 
 # 加载环境变量
@@ -30,28 +36,40 @@ def import_csv_to_postgres():
             print(f"Error: CSV file not found at {csv_path}")
             return
 
-        # 读取CSV数据
-        df = pd.read_csv(csv_path)
+        columns = ("id",) + ANIME_COLUMNS
+        if engine.dialect.name == "postgresql" and IMPORT_MODE == "incremental":
+            # 以 标题 + 年份 为自然键比较内容哈希，只写入新增、修改与删除的行；新行的 id 由序列分配
+            raw_conn = engine.raw_connection()
+            try:
+                incremental_import(raw_conn, iter_csv_batches(csv_path))
+            finally:
+                raw_conn.close()
+            return
 
-        # 数据清理和映射
-        anime_data = []
-        for index, row in df.iterrows():
+        if engine.dialect.name == "postgresql" and IMPORT_MODE == "resumable":
+            # 分批提交并记录检查点，中断后重新运行从最后提交的批次继续；坏行写入拒绝文件
+            dsn = engine.url.set(drivername="postgresql").render_as_string(hide_password=False)
+            imported = ResumableImport(dsn, csv_path).run()
+            print(f"Successfully imported {imported} anime records")
+            return
+
+        if engine.dialect.name == "postgresql" and IMPORT_MODE == "swap":
+            # 写入暂存表，建索引并 ANALYZE 后原子切换，导入期间线上表保持完整可读
+            raw_conn = engine.raw_connection()
             try:
-                anime = Anime(
-                    id=index + 1,
-                    title=row.get('标题', ''),
-                    year=int(row.get('年份', 0)) if pd.notna(row.get('年份')) else 0,
-                    average_rating=float(row.get('平均评分', 0)) if pd.notna(row.get('平均评分')) else 0,
-                    rating_count=int(row.get('评分人数', 0)) if pd.notna(row.get('评分人数')) else 0,
-                    collections=int(row.get('收藏数', 0)) if pd.notna(row.get('收藏数')) else 0,
-                    watched=int(row.get('看过人数', 0)) if pd.notna(row.get('看过人数')) else 0,
-                    completion_rate=float(row.get('完成率', 0)) if pd.notna(row.get('完成率')) else 0,
-                    img_url=row.get('图片链接', '')
-                )
-                anime_data.append(anime)
-            except Exception as e:
-                print(f"Error processing row {index}: {e}")
-                continue
+                if IMPORT_WORKERS > 1:
+                    # 多进程并行解析，经多个连接写入暂存表 (id 同样为行号 + 1)
+                    dsn = engine.url.set(drivername="postgresql").render_as_string(hide_password=False)
+                    imported = parallel_swap_import(raw_conn, dsn, csv_path)
+                else:
+                    imported = swap_import(raw_conn, (
+                        row for batch in iter_csv_batches(csv_path) for row in batch_rows(batch, columns)
+                    ), columns=columns)
+            finally:
+                raw_conn.close()
+
+            print(f"Successfully imported {imported} anime records")
+            return
 
         # 批量插入数据
         from sqlalchemy.orm import sessionmaker
@@ -59,14 +77,32 @@ def import_csv_to_postgres():
         db = SessionLocal()
 
         try:
-            # 清空现有数据
+            # 清空现有数据 (PostgreSQL 上与其他导入互斥，锁随事务提交释放)
+            if engine.dialect.name == "postgresql":
+                db.execute(text("SELECT pg_advisory_xact_lock(:lock_id)"), {"lock_id": IMPORT_LOCK_ID})
             db.query(Anime).delete()
 
-            # 批量插入新数据
-            db.bulk_save_objects(anime_data)
+            # 分块读取并按列转换；PostgreSQL 使用 COPY 流式写入，其他数据库使用 ORM 批量插入
+            imported = 0
+            if engine.dialect.name == "postgresql":
+                raw_cursor = db.connection().connection.cursor()
+                try:
+                    imported = copy_rows(raw_cursor, (
+                        row for batch in iter_csv_batches(csv_path) for row in batch_rows(batch, columns)
+                    ), columns=columns)
+                finally:
+                    raw_cursor.close()
+            else:
+                for batch in iter_csv_batches(csv_path):
+                    db.bulk_insert_mappings(Anime, batch.to_dict("records"))
+                    imported += len(batch)
+
+            # 递增数据集版本，通知应用刷新快照与缓存
+            db.execute(text(DATASET_VERSION_DDL))
+            db.execute(text(DATASET_VERSION_BUMP_SQL))
             db.commit()
 
-            print(f"Successfully imported {len(anime_data)} anime records")
+            print(f"Successfully imported {imported} anime records")
 
         except Exception as e:
             db.rollback()
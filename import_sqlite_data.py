@@ -0,0 +1,32 @@
+import os
+import sys
+from csv_transform import batch_rows, iter_csv_batches
+from sqlite_db import SQLITE_IMPORT_COLUMNS, rollback_database, swap_database
+
+def import_csv_to_sqlite():
+    """将CSV数据导入到main.py使用的SQLite数据库 (原子替换数据库文件)"""
+
+    # 与 main.py 相同的数据库路径
+    db_path = '/tmp/anime.db' if os.environ.get('VERCEL') else 'anime.db'
+
+    # 读取CSV文件
+    csv_path = "full_data.csv"
+    if not os.path.exists(csv_path):
+        print(f"Error: CSV file not found at {csv_path}")
+        return
+
+    try:
+        # 分块读取并按列转换，写入暂存文件后原子换入；上一代保留为 anime.db.previous
+        imported = swap_database(db_path, (
+            row for batch in iter_csv_batches(csv_path) for row in batch_rows(batch, SQLITE_IMPORT_COLUMNS)
+        ), SQLITE_IMPORT_COLUMNS)
+        print(f"Successfully imported {imported} anime records")
+    except Exception as e:
+        print(f"Error during data import: {e}")
+
+if __name__ == "__main__":
+    if sys.argv[1:] == ["rollback"]:
+        # 切回上一代数据库文件
+        rollback_database('/tmp/anime.db' if os.environ.get('VERCEL') else 'anime.db')
+    else:
+        import_csv_to_sqlite()
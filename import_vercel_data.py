@@ -1,7 +1,13 @@
-import pandas as pd
 import os
 import psycopg2
 from dotenv import load_dotenv
+from bulk_loader import copy_rows
+from csv_transform import batch_rows, iter_csv_batches, rows_to_batch
+from dataset_swap import IMPORT_MODE, swap_import
+from db_schema import IMPORT_LOCK_ID, bootstrap_schema, bump_dataset_version
+from incremental_import import incremental_import
+from parallel_import import IMPORT_WORKERS, parallel_swap_import
+from resumable_import import ResumableImport
 
 # 加载环境变量
 load_dotenv()
@@ -30,23 +36,8 @@ def import_csv_to_vercel_postgres():
 
         print("Connected to Vercel PostgreSQL database")
 
-        # 创建表
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS anime (
-                id SERIAL PRIMARY KEY,
-                title VARCHAR(255) NOT NULL,
-                year INTEGER,
-                average_rating FLOAT,
-                rating_count INTEGER,
-                collections INTEGER,
-                watched INTEGER,
-                completion_rate FLOAT,
-                img_url TEXT
-            )
-        """)
-
-        # 清空现有数据
-        cursor.execute("DELETE FROM anime")
+        # 创建表与索引 (与应用启动共用 db_schema 中的定义)
+        bootstrap_schema(conn)
 
         # 读取CSV文件
         csv_path = "full_data.csv"
@@ -61,45 +52,38 @@ def import_csv_to_vercel_postgres():
                 ("孤独摇滚", 2022, 8.4, 35009, 62391, 52665, 0.892, "https://lain.bgm.tv/r/400/pic/cover/l/2e/62/29889_C2QHh.jpg")
             ]
 
-            cursor.executemany("""
-                INSERT INTO anime (title, year, average_rating, rating_count, collections, watched, completion_rate, img_url)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-            """, sample_data)
-
-            print("Inserted 3 sample anime records")
+            batches = [rows_to_batch(sample_data)]
 
         else:
-            # 读取CSV数据
-            df = pd.read_csv(csv_path)
-
-            # 数据清理和映射
-            anime_data = []
-            for index, row in df.iterrows():
-                try:
-                    anime_data.append((
-                        row.get('标题', ''),
-                        int(row.get('年份', 0)) if pd.notna(row.get('年份')) else 0,
-                        float(row.get('平均评分', 0)) if pd.notna(row.get('平均评分')) else 0,
-                        int(row.get('评分人数', 0)) if pd.notna(row.get('评分人数')) else 0,
-                        int(row.get('收藏数', 0)) if pd.notna(row.get('收藏数')) else 0,
-                        int(row.get('看过人数', 0)) if pd.notna(row.get('看过人数')) else 0,
-                        float(row.get('完成率', 0)) if pd.notna(row.get('完成率')) else 0,
-                        row.get('图片链接', '')
-                    ))
-                except Exception as e:
-                    print(f"Error processing row {index}: {e}")
-                    continue
-
-            # 批量插入数据
-            cursor.executemany("""
-                INSERT INTO anime (title, year, average_rating, rating_count, collections, watched, completion_rate, img_url)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-            """, anime_data)
-
-            print(f"Successfully imported {len(anime_data)} anime records")
-
-        # 提交事务
-        conn.commit()
+            # 分块读取并按列转换
+            batches = iter_csv_batches(csv_path)
+
+        rows = (row for batch in batches for row in batch_rows(batch))
+        if IMPORT_MODE == "incremental":
+            # 按自然键与内容哈希只写入变化的行 (有变化时递增数据集版本并提交)
+            imported = incremental_import(conn, batches)["total"]
+        elif IMPORT_MODE == "resumable" and os.path.exists(csv_path):
+            # 分批提交并记录检查点，中断后重新运行从最后提交的批次继续；坏行写入拒绝文件
+            imported = ResumableImport(database_url, csv_path).run()
+        elif IMPORT_MODE == "swap" and IMPORT_WORKERS > 1 and os.path.exists(csv_path):
+            # 多进程按字节范围并行解析，经多个连接写入暂存表后原子切换
+            imported = parallel_swap_import(conn, database_url, csv_path)
+        elif IMPORT_MODE == "swap":
+            # 写入暂存表，建索引并 ANALYZE 后原子切换 (同时递增数据集版本并提交)
+            imported = swap_import(conn, rows)
+        else:
+            # 清空现有数据后以 COPY 分批流式写入 (与其他导入互斥，锁随事务提交释放)
+            cursor.execute("SELECT pg_advisory_xact_lock(%s)", (IMPORT_LOCK_ID,))
+            cursor.execute("DELETE FROM anime")
+            imported = copy_rows(cursor, rows)
+
+            # 递增数据集版本，通知应用刷新快照与缓存
+            bump_dataset_version(cursor)
+
+            # 提交事务
+            conn.commit()
+
+        print(f"Successfully imported {imported} anime records")
         print("Data import completed successfully")
 
         # 验证数据
@@ -0,0 +1,164 @@
+"""增量导入 (PostgreSQL): 按自然键比较每行的内容哈希，只写入新增、修改与删除的行
+
+anime_import_state 记录 自然键 -> anime.id 与上次导入的内容哈希。该状态只对写入它时的数据集版本有效；
+全量导入 (swap / replace) 或回滚之后版本号变化，下一次增量导入会先按自然键重新认领线上表中的行。
+"""
+from typing import Dict, Iterable
+
+import pandas as pd
+
+from bulk_loader import ANIME_COLUMNS, copy_rows
+from csv_transform import NATURAL_KEY_SEPARATOR, with_import_keys
+from db_schema import DATASET_VERSION_DDL, DATASET_VERSION_INIT_SQL, IMPORT_LOCK_ID, bump_dataset_version
+
+INCOMING_TABLE = "anime_import_incoming"
+
+IMPORT_STATE_DDL = """
+    CREATE TABLE IF NOT EXISTS anime_import_state (
+        natural_key TEXT PRIMARY KEY,
+        anime_id INTEGER NOT NULL,
+        row_hash BIGINT
+    )
+"""
+
+# 状态表对应的数据集版本 (单行)
+IMPORT_STATE_VERSION_DDL = """
+    CREATE TABLE IF NOT EXISTS anime_import_state_version (
+        id INTEGER PRIMARY KEY,
+        version BIGINT NOT NULL
+    )
+"""
+
+# 按与 csv_transform.with_import_keys 相同的规则为线上表的行计算自然键；
+# 认领的行没有哈希 (NULL)，首次比较时按列内容判断是否变化
+ADOPT_SQL = f"""
+    INSERT INTO anime_import_state (natural_key, anime_id, row_hash)
+    SELECT COALESCE(title, '') || chr({ord(NATURAL_KEY_SEPARATOR)}) || COALESCE(year, 0)::text
+           || chr({ord(NATURAL_KEY_SEPARATOR)})
+           || (ROW_NUMBER() OVER (PARTITION BY COALESCE(title, ''), COALESCE(year, 0) ORDER BY id) - 1)::text,
+           id, NULL
+    FROM anime
+"""
+
+DELETE_SQL = f"""
+    WITH gone AS (
+        DELETE FROM anime_import_state s
+        WHERE NOT EXISTS (SELECT 1 FROM {INCOMING_TABLE} i WHERE i.natural_key = s.natural_key)
+        RETURNING s.anime_id
+    )
+    DELETE FROM anime a USING gone WHERE a.id = gone.anime_id
+"""
+
+_ASSIGNMENTS = ", ".join(f"{column} = i.{column}" for column in ANIME_COLUMNS)
+_CURRENT = ", ".join(f"a.{column}" for column in ANIME_COLUMNS)
+_INCOMING = ", ".join(f"i.{column}" for column in ANIME_COLUMNS)
+
+# 哈希不同的行才比较列内容；只有内容确实变化的行才写入 anime
+UPDATE_SQL = f"""
+    WITH changed AS (
+        UPDATE anime_import_state s SET row_hash = i.row_hash
+        FROM {INCOMING_TABLE} i
+        WHERE s.natural_key = i.natural_key AND s.row_hash IS DISTINCT FROM i.row_hash
+        RETURNING s.anime_id, s.natural_key
+    )
+    UPDATE anime a SET {_ASSIGNMENTS}
+    FROM changed c JOIN {INCOMING_TABLE} i ON i.natural_key = c.natural_key
+    WHERE a.id = c.anime_id AND ({_CURRENT}) IS DISTINCT FROM ({_INCOMING})
+"""
+
+INSERT_SQL = f"""
+    WITH new_rows AS (
+        SELECT i.*, nextval(%s) AS new_id
+        FROM {INCOMING_TABLE} i
+        WHERE NOT EXISTS (SELECT 1 FROM anime_import_state s WHERE s.natural_key = i.natural_key)
+    ), inserted AS (
+        INSERT INTO anime (id, {", ".join(ANIME_COLUMNS)})
+        SELECT new_id, {", ".join(ANIME_COLUMNS)} FROM new_rows
+    )
+    INSERT INTO anime_import_state (natural_key, anime_id, row_hash)
+    SELECT natural_key, new_id, row_hash FROM new_rows
+"""
+
+
+def _current_version(cursor) -> int:
+    cursor.execute("SELECT version FROM anime_dataset_version WHERE id = 1")
+    return cursor.fetchone()[0]
+
+
+def _prepare_state(cursor) -> bool:
+    """状态表与当前数据集版本不一致时重新认领线上表的行；返回是否重建了状态"""
+    cursor.execute(IMPORT_STATE_DDL)
+    cursor.execute(IMPORT_STATE_VERSION_DDL)
+    cursor.execute(DATASET_VERSION_DDL)
+    cursor.execute(DATASET_VERSION_INIT_SQL)
+
+    cursor.execute("SELECT version FROM anime_import_state_version WHERE id = 1")
+    row = cursor.fetchone()
+    if row and row[0] == _current_version(cursor):
+        return False
+
+    cursor.execute("TRUNCATE anime_import_state")
+    cursor.execute(ADOPT_SQL)
+    print(f"Import state rebuilt: adopted {cursor.rowcount} existing rows by natural key")
+    return True
+
+
+def _load_incoming(cursor, batches: Iterable[pd.DataFrame]) -> int:
+    cursor.execute(f"""
+        CREATE TEMP TABLE {INCOMING_TABLE} ON COMMIT DROP AS
+        SELECT ''::text AS natural_key, 0::bigint AS row_hash, {", ".join(ANIME_COLUMNS)}
+        FROM anime WITH NO DATA
+    """)
+    columns = ("natural_key", "row_hash") + ANIME_COLUMNS
+    total = copy_rows(cursor, (
+        row for batch in with_import_keys(batches)
+        for row in batch[list(columns)].itertuples(index=False, name=None)
+    ), table=INCOMING_TABLE, columns=columns)
+    cursor.execute(f"ALTER TABLE {INCOMING_TABLE} ADD PRIMARY KEY (natural_key)")
+    cursor.execute(f"ANALYZE {INCOMING_TABLE}")
+    return total
+
+
+def incremental_import(conn, batches: Iterable[pd.DataFrame]) -> Dict[str, int]:
+    """在一个事务中应用差异并提交；没有任何变化时不递增数据集版本 (缓存保持有效)"""
+    with conn.cursor() as cursor:
+        # 与其他导入互斥 (全量导入在整个过程中持有同一把会话级锁，见 db_schema.import_lock)
+        cursor.execute("SELECT pg_advisory_xact_lock(%s)", (IMPORT_LOCK_ID,))
+        _prepare_state(cursor)
+        total = _load_incoming(cursor, batches)
+
+        cursor.execute(DELETE_SQL)
+        deleted = cursor.rowcount
+        cursor.execute(UPDATE_SQL)
+        updated = cursor.rowcount
+
+        # 新行的 id 接在现有最大值之后 (全量导入可能显式写入了 id 而未推进序列)
+        cursor.execute("SELECT pg_get_serial_sequence('anime', 'id')")
+        sequence = cursor.fetchone()[0]
+        cursor.execute(
+            f"SELECT setval(%s, GREATEST(COALESCE(MAX(id), 0), (SELECT last_value FROM {sequence}))) FROM anime",
+            (sequence,),
+        )
+        cursor.execute(INSERT_SQL, (sequence,))
+        inserted = cursor.rowcount
+
+        if inserted or updated or deleted:
+            bump_dataset_version(cursor)
+        cursor.execute("""
+            INSERT INTO anime_import_state_version (id, version) VALUES (1, %s)
+            ON CONFLICT (id) DO UPDATE SET version = EXCLUDED.version
+        """, (_current_version(cursor),))
+    conn.commit()
+
+    summary = {
+        "total": total,
+        "inserted": inserted,
+        "updated": updated,
+        "deleted": deleted,
+        "unchanged": total - inserted - updated,
+    }
+    print(
+        f"Incremental import: {summary['inserted']} inserted, {summary['updated']} updated, "
+        f"{summary['deleted']} deleted, {summary['unchanged']} unchanged"
+    )
+    return summary
@@ -7,6 +7,17 @@ import json
 import os
 from typing import Optional, List
 from pydantic import BaseModel
+from pagination import InvalidCursor, decode_cursor, encode_cursor, keyset_page_query, order_clause
+from db_schema import get_dataset_version
+from response_cache import ResponseCache
+from sqlite_db import (
+    SQLITE_ANIME_DDL, copy_snapshot, detect_fts, enable_wal, ensure_dataset_version, ensure_fts, ensure_indexes,
+    missing_indexes, search_join, swap_database,
+)
+from sqlite_pool import SQLitePool
+import metrics
+import server_timing
+from server_timing import phase
 
 app = FastAPI(title="AnimeDB API", version="1.0.0")
 
@@ -19,86 +30,112 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# 数据库初始化
-def init_database():
+# 各阶段耗时写入 Server-Timing 头 / JSON 日志 (SERVER_TIMING、SERVER_TIMING_LOG)
+server_timing.install(app)
+
+# 请求数、耗时直方图、示例数据次数与连接池状态 (GET /metrics，METRICS=false 关闭)
+metrics.install(app)
+
+# 示例数据的列顺序 (不含 img_url 与 tags)
+SAMPLE_COLUMNS = ("id", "title", "year", "average_rating", "rating_count", "collections", "watched", "completion_rate")
+
+# 构建阶段生成的快照 (python build_snapshot.py)，随部署包一起发布
+SQLITE_SNAPSHOT = os.getenv("SQLITE_SNAPSHOT", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "anime.db"))
+# readonly (默认): 直接从部署包中只读打开快照；copy: 复制到本地数据库路径后使用 (运行时需要写入或替换数据时)
+SQLITE_SNAPSHOT_MODE = os.getenv("SQLITE_SNAPSHOT_MODE", "readonly").lower()
+
+def resolve_db_path():
+    """本地数据库已存在时使用它；否则在 readonly 模式下直接使用快照"""
     # 在Vercel环境中，使用临时文件路径
     db_path = '/tmp/anime.db' if os.environ.get('VERCEL') else 'anime.db'
+    if not os.path.exists(db_path) and SQLITE_SNAPSHOT_MODE == "readonly" and os.path.exists(SQLITE_SNAPSHOT):
+        return SQLITE_SNAPSHOT
+    return db_path
+
+# 每个 worker 进程复用的只读连接 (WAL、mmap、页缓存与预编译语句缓存)
+sqlite_pool = SQLitePool(resolve_db_path())
+metrics.register_pool("sqlite", sqlite_pool.stats)
+
+# 数据库初始化
+def init_database():
+    db_path = sqlite_pool.db_path
+
+    # 只读快照已包含索引、全文索引与数据集版本，冷启动时不做任何写入
+    if db_path == SQLITE_SNAPSHOT:
+        print(f"Serving read-only snapshot {db_path}")
+        conn = sqlite_pool.getconn()
+        try:
+            detect_fts(conn)
+            missing = missing_indexes(conn)
+            if missing:
+                print(f"Snapshot {db_path} lacks indexes {', '.join(missing)}; rebuild it with build_snapshot.py")
+        finally:
+            sqlite_pool.putconn(conn)
+        return
 
-    # 如果数据库文件已存在，直接返回
+    # 如果数据库文件已存在，只需补建并同步标题全文索引
     if os.path.exists(db_path):
         print(f"Database already exists at {db_path}")
+        conn = sqlite3.connect(db_path)
+        try:
+            ensure_indexes(conn)
+            ensure_dataset_version(conn)
+            ensure_fts(conn)
+            enable_wal(conn)
+        finally:
+            conn.close()
         return
 
-    conn = sqlite3.connect(db_path)
-
     try:
-        # 读取CSV数据 - 在Vercel中需要从其他位置读取
-        # 这里我们使用一个简单的内存数据集作为演示
-        # 在实际部署中，您需要将CSV文件上传到Vercel或使用外部存储
-        print("Initializing database...")
-
-        # 创建一个简单的示例数据集
-        sample_data = [
-            (1, "命运石之门", 2011, 8.8, 35783, 66311, 52705, 0.762),
-            (2, "魔法少女小圆", 2011, 8.6, 34624, 60794, 51845, 0.843),
-            (3, "孤独摇滚", 2022, 8.4, 35009, 62391, 52665, 0.892),
-            (4, "进击的巨人", 2013, 8.9, 29908, 56614, 44579, 0.796),
-            (5, "钢之炼金术师", 2009, 9.1, 28567, 51262, 43455, 0.912)
-        ]
-
-        # 创建表
-        conn.execute('''
-            CREATE TABLE anime (
-                id INTEGER PRIMARY KEY,
-                title TEXT,
-                year INTEGER,
-                average_rating REAL,
-                rating_count INTEGER,
-                collections INTEGER,
-                watched INTEGER,
-                completion_rate REAL,
-                img_url TEXT,
-                tags TEXT
-            )
-        ''')
-
-        # 插入示例数据
-        for data in sample_data:
-            conn.execute('''
-                INSERT INTO anime (id, title, year, average_rating, rating_count, collections, watched, completion_rate)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            ''', data)
-
-        # 创建索引
-        conn.execute("CREATE INDEX idx_year ON anime(year)")
-        conn.execute("CREATE INDEX idx_rating ON anime(average_rating)")
-        conn.execute("CREATE INDEX idx_collections ON anime(collections)")
-        conn.execute("CREATE INDEX idx_title ON anime(title)")
-
-        conn.commit()
+        if os.path.exists(SQLITE_SNAPSHOT):
+            # copy 模式: 复制已建好索引的快照，无需重新建表
+            copy_snapshot(SQLITE_SNAPSHOT, db_path)
+        else:
+            # 没有快照时使用一个简单的内存数据集作为演示
+            print("Initializing database...")
+
+            # 创建一个简单的示例数据集
+            sample_data = [
+                (1, "命运石之门", 2011, 8.8, 35783, 66311, 52705, 0.762),
+                (2, "魔法少女小圆", 2011, 8.6, 34624, 60794, 51845, 0.843),
+                (3, "孤独摇滚", 2022, 8.4, 35009, 62391, 52665, 0.892),
+                (4, "进击的巨人", 2013, 8.9, 29908, 56614, 44579, 0.796),
+                (5, "钢之炼金术师", 2009, 9.1, 28567, 51262, 43455, 0.912)
+            ]
+
+            # 在暂存文件中建好表、索引与全文索引后原子换入，其他进程不会读到半成品
+            swap_database(db_path, sample_data, SAMPLE_COLUMNS)
         print("Database initialized successfully")
 
     except Exception as e:
         print(f"Database initialization failed: {e}")
         # 如果初始化失败，创建一个空的数据库结构
-        conn.execute('''
-            CREATE TABLE IF NOT EXISTS anime (
-                id INTEGER PRIMARY KEY,
-                title TEXT,
-                year INTEGER,
-                average_rating REAL,
-                rating_count INTEGER,
-                collections INTEGER,
-                watched INTEGER,
-                completion_rate REAL,
-                img_url TEXT,
-                tags TEXT
-            )
-        ''')
+        conn = sqlite3.connect(db_path)
+        conn.execute(SQLITE_ANIME_DDL)
         conn.commit()
+        conn.close()
+
+    # 排序索引、数据集版本表与标题全文索引 (FTS5 trigram) - 连接必须在换入之后打开
+    conn = sqlite3.connect(db_path)
+    try:
+        ensure_indexes(conn)
+        ensure_dataset_version(conn)
+        ensure_fts(conn)
+        enable_wal(conn)
     finally:
         conn.close()
 
+def _load_dataset_version():
+    """响应缓存与 ETag 的数据版本 - 导入脚本写入后递增"""
+    conn = sqlite_pool.getconn()
+    try:
+        return get_dataset_version(conn)
+    finally:
+        sqlite_pool.putconn(conn)
+
+response_cache = ResponseCache(_load_dataset_version)
+metrics.register_cache("anime", response_cache)
+
 # 响应模型
 class AnimeResponse(BaseModel):
     id: int
@@ -118,6 +155,7 @@ class PaginatedResponse(BaseModel):
     page: int
     page_size: int
     total_pages: int
+    next_cursor: Optional[str] = None
 
 # API路由
 @app.get("/")
@@ -125,6 +163,7 @@ async def root():
     return {"message": "AnimeDB API is running"}
 
 @app.get("/api/anime")
+@response_cache.cached("/api/anime")
 async def get_anime(
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
@@ -134,16 +173,29 @@ async def get_anime(
     rating_from: Optional[float] = Query(None, ge=0, le=10),
     rating_to: Optional[float] = Query(None, ge=0, le=10),
     sort_by: str = Query("collections", regex="^(title|year|average_rating|rating_count|collections|watched)$"),
-    sort_order: str = Query("desc", regex="^(asc|desc)$")
+    sort_order: str = Query("desc", regex="^(asc|desc)$"),
+    page_cursor: Optional[str] = Query(None, alias="cursor"),
+    search_mode: str = Query("substring", regex="^(substring|ranked)$")
 ):
-    db_path = '/tmp/anime.db' if os.environ.get('VERCEL') else 'anime.db'
-    conn = sqlite3.connect(db_path)
+    # 标题检索优先走 FTS5 三元组索引，过短的检索词或不支持 FTS5 时退回 LIKE
+    fts_join, join_params = search_join(search, ranked=search_mode == "ranked") if search else ("", [])
+    ranked = bool(fts_join) and search_mode == "ranked"
+    if ranked and page_cursor:
+        raise HTTPException(status_code=400, detail="cursor is not supported with search_mode=ranked")
+
+    # 游标模式 - 提供 cursor 时忽略 page，按 (排序键, id) 定位
+    position = None
+    if page_cursor:
+        try:
+            position = decode_cursor(page_cursor, sort_by, sort_order)
+        except InvalidCursor as exc:
+            raise HTTPException(status_code=400, detail=str(exc))
 
     # 构建查询条件
     where_conditions = []
     params = []
 
-    if search:
+    if search and not fts_join:
         where_conditions.append("title LIKE ?")
         params.append(f"%{search}%")
 
@@ -165,93 +217,112 @@ async def get_anime(
 
     where_clause = " AND ".join(where_conditions) if where_conditions else "1=1"
 
-    # 获取总数
-    count_query = f"SELECT COUNT(*) FROM anime WHERE {where_clause}"
-    total = conn.execute(count_query, params).fetchone()[0]
-
     # 计算分页
     offset = (page - 1) * page_size
-    total_pages = (total + page_size - 1) // page_size
 
-    # 构建排序
-    order_clause = f"{sort_by} {sort_order.upper()}"
-
-    # 执行查询
-    query = f"""
-        SELECT rowid as id, title, year, average_rating, rating_count,
-               collections, watched, completion_rate, img_url, tags
-        FROM anime
-        WHERE {where_clause}
-        ORDER BY {order_clause}
-        LIMIT ? OFFSET ?
+    columns = """
+        anime.rowid as id, title, year, average_rating, rating_count,
+        collections, watched, completion_rate, img_url, tags
     """
 
-    params.extend([page_size, offset])
-    cursor = conn.execute(query, params)
-
-    results = []
-    for row in cursor:
-        results.append(AnimeResponse(
-            id=row[0],
-            title=row[1],
-            year=row[2],
-            average_rating=row[3],
-            rating_count=row[4],
-            collections=row[5],
-            watched=row[6],
-            completion_rate=row[7],
-            img_url=row[8],
-            tags=row[9]
-        ))
-
-    conn.close()
+    if position is not None:
+        # 游标模式 - 跳过已返回的行，无需 OFFSET 扫描 (SQLite 中 NULL 视为最小值)
+        query, query_params = keyset_page_query(
+            f"anime {fts_join}", columns, where_clause, join_params + params,
+            sort_by, sort_order, position, page_size + 1,
+            placeholder="?", nulls_high=False
+        )
+    else:
+        # 相关度排序使用 bm25 (数值越小越相关)
+        order_by = "fts.search_rank, anime.id" if ranked else order_clause(sort_by, sort_order)
+
+        # 执行查询 - 多取一行用于判断是否有下一页
+        query = f"""
+            SELECT {columns}
+            FROM anime {fts_join}
+            WHERE {where_clause}
+            ORDER BY {order_by}
+            LIMIT ? OFFSET ?
+        """
+        query_params = join_params + params + [page_size + 1, offset]
+
+    with sqlite_pool.connection() as conn:
+        # 获取总数
+        count_query = f"SELECT COUNT(*) FROM anime {fts_join} WHERE {where_clause}"
+        with phase("count"):
+            total = conn.execute(count_query, join_params + params).fetchone()[0]
+
+        # SQLite 逐行返回结果，行对象的构建计入 query
+        with phase("query"):
+            cursor = conn.execute(query, query_params)
+
+            results = []
+            for row in cursor:
+                results.append(AnimeResponse(
+                    id=row[0],
+                    title=row[1],
+                    year=row[2],
+                    average_rating=row[3],
+                    rating_count=row[4],
+                    collections=row[5],
+                    watched=row[6],
+                    completion_rate=row[7],
+                    img_url=row[8],
+                    tags=row[9]
+                ))
+
+    total_pages = (total + page_size - 1) // page_size
+
+    next_page_cursor = None
+    if len(results) > page_size:
+        results = results[:page_size]
+        last = results[-1]
+        if not ranked:
+            next_page_cursor = encode_cursor(sort_by, sort_order, {sort_by: getattr(last, sort_by), "id": last.id})
 
     return PaginatedResponse(
         data=results,
         total=total,
         page=page,
         page_size=page_size,
-        total_pages=total_pages
+        total_pages=total_pages,
+        next_cursor=next_page_cursor
     )
 
 @app.get("/api/anime/{anime_id}")
+@response_cache.cached("/api/anime/{anime_id}")
 async def get_anime_detail(anime_id: int):
-    db_path = '/tmp/anime.db' if os.environ.get('VERCEL') else 'anime.db'
-    conn = sqlite3.connect(db_path)
-
     query = """
         SELECT * FROM anime WHERE rowid = ?
     """
 
-    cursor = conn.execute(query, (anime_id,))
-    row = cursor.fetchone()
+    with sqlite_pool.connection() as conn:
+        cursor = conn.execute(query, (anime_id,))
+        row = cursor.fetchone()
 
     if not row:
-        conn.close()
         raise HTTPException(status_code=404, detail="Anime not found")
 
     # 获取列名
     columns = [description[0] for description in cursor.description]
     anime_data = dict(zip(columns, row))
 
-    conn.close()
     return anime_data
 
 @app.get("/api/stats")
+@response_cache.cached("/api/stats")
 async def get_stats():
-    db_path = '/tmp/anime.db' if os.environ.get('VERCEL') else 'anime.db'
-    conn = sqlite3.connect(db_path)
+    with sqlite_pool.connection() as conn:
+        with phase("query"):
+            stats = {
+                "total_anime": conn.execute("SELECT COUNT(*) FROM anime").fetchone()[0],
+                "earliest_year": conn.execute("SELECT MIN(year) FROM anime").fetchone()[0],
+                "latest_year": conn.execute("SELECT MAX(year) FROM anime").fetchone()[0],
+                "avg_rating": conn.execute("SELECT AVG(average_rating) FROM anime WHERE average_rating > 0").fetchone()[0],
+                "total_collections": conn.execute("SELECT SUM(collections) FROM anime").fetchone()[0],
+                "total_watched": conn.execute("SELECT SUM(watched) FROM anime").fetchone()[0]
+            }
 
-    stats = {
-        "total_anime": conn.execute("SELECT COUNT(*) FROM anime").fetchone()[0],
-        "earliest_year": conn.execute("SELECT MIN(year) FROM anime").fetchone()[0],
-        "latest_year": conn.execute("SELECT MAX(year) FROM anime").fetchone()[0],
-        "avg_rating": conn.execute("SELECT AVG(average_rating) FROM anime WHERE average_rating > 0").fetchone()[0],
-        "total_collections": conn.execute("SELECT SUM(collections) FROM anime").fetchone()[0],
-        "total_watched": conn.execute("SELECT SUM(watched) FROM anime").fetchone()[0]
-    }
-
-    conn.close()
     return stats
 
 # 初始化数据库
@@ -263,6 +334,10 @@ async def startup_event():
     except Exception as e:
         print(f"Database initialization failed: {e}")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    sqlite_pool.closeall()
+
 # 挂载前端静态文件
 app.mount("/", StaticFiles(directory="frontend", html=True), name="frontend")
 
@@ -2,7 +2,10 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from api.anime_postgres import router as anime_router
-from database import create_tables
+from database import create_tables, pool_stats
+import metrics
+import slow_query
+import server_timing
 
 app = FastAPI(title="AnimeDB API", version="1.0.0")
 
@@ -15,6 +18,16 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# 各阶段耗时写入 Server-Timing 头 / JSON 日志 (SERVER_TIMING、SERVER_TIMING_LOG)
+server_timing.install(app)
+
+# 请求数、耗时直方图、示例数据次数与连接池状态 (GET /metrics，METRICS=false 关闭)
+metrics.install(app)
+metrics.register_pool("sqlalchemy", pool_stats)
+
+# 慢查询日志与执行计划汇总 (SLOW_QUERY_MS；SLOW_QUERY_ENDPOINT=true 时提供 /debug/slow-queries)
+slow_query.install(app)
+
 # 创建数据库表
 @app.on_event("startup")
 async def startup_event():
@@ -6,6 +6,9 @@ import os
 import psycopg2
 from psycopg2.extras import RealDictCursor
 from dotenv import load_dotenv
+from anime_queries import build_list_query, split_total
+from db_schema import ensure_schema, trigram_ready
+import metrics
 
 # 加载环境变量
 load_dotenv()
@@ -21,6 +24,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# 请求数、耗时直方图与示例数据次数 (GET /metrics，METRICS=false 关闭)
+metrics.install(app)
+
 def get_db_connection():
     """获取数据库连接 - 专门处理Prisma PostgreSQL"""
     try:
@@ -104,99 +110,41 @@ async def get_anime(
     rating_from: Optional[float] = Query(None, ge=0, le=10),
     rating_to: Optional[float] = Query(None, ge=0, le=10),
     sort_by: str = Query("collections", regex="^(title|year|average_rating|rating_count|collections|watched)$"),
-    sort_order: str = Query("desc", regex="^(asc|desc)$")
+    sort_order: str = Query("desc", regex="^(asc|desc)$"),
+    include_total: bool = Query(True),
+    search_mode: str = Query("substring", regex="^(substring|fuzzy)$")
 ):
+    # 相似度检索依赖 pg_trgm，未启用时退回子串匹配
+    if search_mode == "fuzzy" and not trigram_ready():
+        search_mode = "substring"
+
     conn = get_db_connection()
 
+    if conn and not ensure_schema(conn, sample_anime_data):
+        conn.close()
+        conn = None
+
     if conn:
         # 使用Prisma PostgreSQL数据库
         try:
             with conn.cursor(cursor_factory=RealDictCursor) as cursor:
-                # 首先检查表是否存在
-                cursor.execute("""
-                    SELECT EXISTS (
-                        SELECT FROM information_schema.tables
-                        WHERE table_schema = 'public'
-                        AND table_name = 'anime'
-                    );
-                """)
-                table_exists = cursor.fetchone()['exists']
-
-                if not table_exists:
-                    print("Table 'anime' does not exist, creating it...")
-                    # 创建表
-                    cursor.execute("""
-                        CREATE TABLE anime (
-                            id SERIAL PRIMARY KEY,
-                            title VARCHAR(255) NOT NULL,
-                            year INTEGER,
-                            average_rating FLOAT,
-                            rating_count INTEGER,
-                            collections INTEGER,
-                            watched INTEGER,
-                            completion_rate FLOAT,
-                            img_url TEXT
-                        )
-                    """)
-
-                    # 插入示例数据
-                    for anime in sample_anime_data:
-                        cursor.execute("""
-                            INSERT INTO anime (title, year, average_rating, rating_count, collections, watched, completion_rate, img_url)
-                            VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-                        """, (
-                            anime['title'], anime['year'], anime['average_rating'],
-                            anime['rating_count'], anime['collections'], anime['watched'],
-                            anime['completion_rate'], anime['img_url']
-                        ))
-
-                    conn.commit()
-                    print("Table 'anime' created with sample data")
-
-                # 构建查询
-                query = "SELECT * FROM anime WHERE 1=1"
-                params = []
-
-                # 搜索过滤
-                if search:
-                    query += " AND title ILIKE %s"
-                    params.append(f"%{search}%")
-
-                # 年份过滤
-                if year_from is not None:
-                    query += " AND year >= %s"
-                    params.append(year_from)
-                if year_to is not None:
-                    query += " AND year <= %s"
-                    params.append(year_to)
-
-                # 评分过滤
-                if rating_from is not None:
-                    query += " AND average_rating >= %s"
-                    params.append(rating_from)
-                if rating_to is not None:
-                    query += " AND average_rating <= %s"
-                    params.append(rating_to)
-
-                # 排序
-                order_column = sort_by
-                order_direction = "DESC" if sort_order == "desc" else "ASC"
-                query += f" ORDER BY {order_column} {order_direction}"
-
-                # 获取总数
-                count_query = "SELECT COUNT(*) FROM (" + query + ") as subquery"
-                cursor.execute(count_query, params)
-                total = cursor.fetchone()['count']
-
-                # 分页
+                # 页数据与过滤后的总数在一条语句中返回
                 offset = (page - 1) * page_size
-                query += " LIMIT %s OFFSET %s"
-                params.extend([page_size, offset])
+                query, params = build_list_query(
+                    sort_by, sort_order, page_size, offset,
+                    include_total=include_total,
+                    search=search,
+                    year_from=year_from,
+                    year_to=year_to,
+                    rating_from=rating_from,
+                    rating_to=rating_to,
+                    search_mode=search_mode,
+                )
 
                 cursor.execute(query, params)
-                anime_data = cursor.fetchall()
+                anime_data, total = split_total(cursor.fetchall(), include_total)
 
-                total_pages = (total + page_size - 1) // page_size
+                total_pages = (total + page_size - 1) // page_size if total is not None else None
 
                 return {
                     "data": anime_data,
@@ -223,23 +171,14 @@ async def get_anime(
 async def get_stats():
     conn = get_db_connection()
 
+    if conn and not ensure_schema(conn, sample_anime_data):
+        conn.close()
+        conn = None
+
     if conn:
         # 使用Prisma PostgreSQL数据库
         try:
             with conn.cursor(cursor_factory=RealDictCursor) as cursor:
-                # 检查表是否存在
-                cursor.execute("""
-                    SELECT EXISTS (
-                        SELECT FROM information_schema.tables
-                        WHERE table_schema = 'public'
-                        AND table_name = 'anime'
-                    );
-                """)
-                table_exists = cursor.fetchone()['exists']
-
-                if not table_exists:
-                    return get_fallback_stats()
-
                 cursor.execute("""
                     SELECT
                         COUNT(*) as total_anime,
@@ -274,6 +213,7 @@ async def get_stats():
         # 使用示例统计数据
         return get_fallback_stats()
 
+@metrics.count_fallback("data")
 def get_fallback_data(page, page_size, search, year_from, year_to, rating_from, rating_to, sort_by, sort_order):
     """后备数据 - 当数据库不可用时使用"""
     filtered_data = sample_anime_data.copy()
@@ -314,6 +254,7 @@ def get_fallback_data(page, page_size, search, year_from, year_to, rating_from,
         "total_pages": total_pages
     }
 
+@metrics.count_fallback("stats")
 def get_fallback_stats():
     """后备统计数据"""
     return {
@@ -325,6 +266,16 @@ def get_fallback_stats():
         "total_watched": sum(anime["watched"] for anime in sample_anime_data)
     }
 
+@app.on_event("startup")
+async def startup_event():
+    # 启动时完成一次表结构初始化，请求处理中不再探测 information_schema
+    conn = get_db_connection()
+    if conn:
+        try:
+            ensure_schema(conn, sample_anime_data)
+        finally:
+            conn.close()
+
 @app.get("/")
 async def root():
     return {"message": "AnimeDB API is running"}
@@ -0,0 +1,197 @@
+import os
+import time
+from bisect import bisect_left
+from functools import wraps
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from starlette.responses import Response
+
+# METRICS=false: 不挂载 /metrics，也不统计请求
+METRICS_ENABLED = os.getenv("METRICS", "true").lower() == "true"
+
+# 请求耗时直方图的固定桶 (秒)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class _RouteStats:
+    """一个 (方法, 路由) 的计数与耗时直方图；各桶分别计数，输出时再累加"""
+
+    __slots__ = ("statuses", "errors", "buckets", "total_seconds", "count")
+
+    def __init__(self):
+        self.statuses: Dict[int, int] = {}
+        self.errors = 0
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.total_seconds = 0.0
+        self.count = 0
+
+
+# 计数只在事件循环线程中更新 (中间件与异步处理函数)，单一写入方，无需加锁
+_routes: Dict[Tuple[str, str], _RouteStats] = {}
+_fallbacks: Dict[str, int] = {"data": 0, "stats": 0}
+_pools: List[Tuple[str, Callable[[], Optional[Dict[str, Any]]]]] = []
+_caches: List[Tuple[str, Any]] = []
+
+
+def observe(method: str, route: str, status: int, seconds: float) -> None:
+    """记录一个已完成的请求"""
+    stats = _routes.get((method, route))
+    if stats is None:
+        stats = _routes[(method, route)] = _RouteStats()
+    stats.statuses[status] = stats.statuses.get(status, 0) + 1
+    if status >= 500:
+        stats.errors += 1
+    stats.buckets[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+    stats.total_seconds += seconds
+    stats.count += 1
+
+
+def count_fallback(kind: str):
+    """装饰 get_fallback_data / get_fallback_stats: 每次以示例数据代替真实数据时计数"""
+    def decorator(function):
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            _fallbacks[kind] = _fallbacks.get(kind, 0) + 1
+            return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def register_pool(name: str, load_stats: Callable[[], Optional[Dict[str, Any]]]) -> None:
+    """连接池统计 (db_pool / async_db / sqlite_pool 的 stats())，在抓取时读取；返回 None 表示尚未建立"""
+    _pools.append((name, load_stats))
+
+
+def register_cache(name: str, cache) -> None:
+    """response_cache.ResponseCache 的命中与未命中次数"""
+    _caches.append((name, cache))
+
+
+def _route_label(scope) -> str:
+    """路由模板 (如 /api/anime/{anime_id})，避免按实际路径产生无限多的标签值；未匹配的请求归为 unmatched"""
+    route = scope.get("route")
+    if route is not None:
+        # include_router 的路由在部分 FastAPI 版本中不含前缀: 按模板的层数从实际路径取回前缀
+        template = getattr(route, "path_format", route.path)
+        prefix = scope["path"].split("/")[:-template.count("/")]
+        return "/".join(prefix) + template
+    if "endpoint" in scope:
+        # 挂载的子应用 (前端静态文件) 只设置 endpoint 与 root_path
+        return f"{scope.get('root_path', '')}/*"
+    return "unmatched"
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(**labels) -> str:
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render() -> str:
+    """Prometheus 文本格式"""
+    lines = [
+        "# HELP anime_http_requests_total HTTP requests by route and status code.",
+        "# TYPE anime_http_requests_total counter",
+    ]
+    routes = sorted(_routes.items())
+    for (method, route), stats in routes:
+        for status, count in sorted(stats.statuses.items()):
+            lines.append(f"anime_http_requests_total{_labels(method=method, route=route, status=status)} {count}")
+
+    lines += ["# HELP anime_http_request_errors_total Requests that failed with a 5xx status or an exception.",
+              "# TYPE anime_http_request_errors_total counter"]
+    for (method, route), stats in routes:
+        lines.append(f"anime_http_request_errors_total{_labels(method=method, route=route)} {stats.errors}")
+
+    lines += ["# HELP anime_http_request_duration_seconds Request latency.",
+              "# TYPE anime_http_request_duration_seconds histogram"]
+    for (method, route), stats in routes:
+        cumulative = 0
+        for bound, count in zip(LATENCY_BUCKETS + (float("inf"),), stats.buckets):
+            cumulative += count
+            le = "+Inf" if bound == float("inf") else repr(bound)
+            lines.append(f"anime_http_request_duration_seconds_bucket{_labels(method=method, route=route, le=le)} {cumulative}")
+        lines.append(f"anime_http_request_duration_seconds_sum{_labels(method=method, route=route)} {stats.total_seconds!r}")
+        lines.append(f"anime_http_request_duration_seconds_count{_labels(method=method, route=route)} {stats.count}")
+
+    lines += ["# HELP anime_fallback_responses_total Responses served from sample data instead of the database.",
+              "# TYPE anime_fallback_responses_total counter"]
+    for kind, count in sorted(_fallbacks.items()):
+        lines.append(f"anime_fallback_responses_total{_labels(kind=kind)} {count}")
+
+    pool_gauges = [("in_use", "anime_db_pool_connections_in_use", "Connections checked out of the pool."),
+                   ("idle", "anime_db_pool_connections_idle", "Idle connections held by the pool."),
+                   ("waiting", "anime_db_pool_waiting", "Requests waiting for a connection."),
+                   ("timeouts", "anime_db_pool_timeouts_total", "Checkouts that timed out waiting for a connection.")]
+    pool_stats = []
+    for name, load_stats in _pools:
+        try:
+            stats = load_stats()
+        except Exception as exc:
+            print(f"Metrics pool stats failed for {name}: {exc}")
+            stats = None
+        if stats:
+            pool_stats.append((name, stats))
+    for key, metric, description in pool_gauges:
+        samples = [(name, stats[key]) for name, stats in pool_stats if stats.get(key) is not None]
+        if samples:
+            lines += [f"# HELP {metric} {description}",
+                      f"# TYPE {metric} {'counter' if metric.endswith('_total') else 'gauge'}"]
+            lines += [f"{metric}{_labels(pool=name)} {_number(value)}" for name, value in samples]
+
+    if _caches:
+        for outcome, attribute in (("hits", "hits"), ("misses", "misses")):
+            metric = f"anime_response_cache_{outcome}_total"
+            lines += [f"# HELP {metric} Response cache {outcome}.", f"# TYPE {metric} counter"]
+            lines += [f"{metric}{_labels(cache=name)} {getattr(cache, attribute)}" for name, cache in _caches]
+
+    return "\n".join(lines) + "\n"
+
+
+class MetricsMiddleware:
+    """ASGI 中间件: 按路由模板记录请求数、状态码与耗时；异常按 500 计入后继续抛出"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            observe(scope["method"], _route_label(scope), status, time.perf_counter() - started)
+
+
+async def metrics_endpoint():
+    return Response(render(), media_type=CONTENT_TYPE)
+
+
+def install(app) -> None:
+    """添加统计中间件与 GET /metrics；METRICS=false 时不做任何事
+
+    需在挂载前端静态文件 (/) 之前调用，否则 /metrics 会被静态文件路由接管。
+    """
+    if not METRICS_ENABLED:
+        return
+    app.add_middleware(MetricsMiddleware)
+    app.add_api_route("/metrics", metrics_endpoint, methods=["GET"], include_in_schema=False)
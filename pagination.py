@@ -0,0 +1,137 @@
+import base64
+import binascii
+import json
+import math
+from typing import Any, Dict, List, Optional, Tuple
+
+# 允许排序的列 - 与各入口 sort_by 参数的正则保持一致
+SORTABLE_COLUMNS = ("title", "year", "average_rating", "rating_count", "collections", "watched")
+
+
+class InvalidCursor(ValueError):
+    """游标无法解码，或与当前排序方式不匹配"""
+
+
+def encode_cursor(sort_by: str, sort_order: str, row: Dict[str, Any]) -> str:
+    """将当前页最后一行的 (排序键, id) 编码为不透明的游标"""
+    payload = {"s": sort_by, "o": sort_order, "v": row[sort_by], "id": row["id"]}
+    raw = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token: str, sort_by: str, sort_order: str) -> Tuple[Any, int]:
+    """解码游标，返回 (排序键, id)"""
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")).decode("utf-8"))
+        value, last_id = payload["v"], int(payload["id"])
+        cursor_sort = (payload["s"], payload["o"])
+    except (ValueError, KeyError, TypeError, binascii.Error) as exc:
+        raise InvalidCursor(f"Malformed cursor: {exc}") from exc
+
+    if cursor_sort != (sort_by, sort_order):
+        raise InvalidCursor("Cursor was issued for a different sort_by/sort_order")
+    if not _valid_sort_value(sort_by, value):
+        raise InvalidCursor(f"Cursor value does not match sort column {sort_by}")
+
+    return value, last_id
+
+
+def _valid_sort_value(sort_by: str, value: Any) -> bool:
+    """排序键的类型须与列一致 - 标题为字符串，数值列为数字或 NULL；否则会在比较或 SQL 中出错"""
+    if sort_by == "title":
+        return isinstance(value, str)
+    if value is None:
+        return True
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value)
+
+
+def keyset_branches(sort_order: str, position: Tuple[Any, int], nulls_high: bool = True) -> List[tuple]:
+    """游标之后的行，拆成一到两个可以各自走 (col, id) 索引范围扫描的分支
+
+    PostgreSQL 把 NULL 视为最大值 (ASC 时排在最后，DESC 时排在最前)，SQLite 视为最小值
+    (nulls_high=False)。若把 NULL 块写成 OR 条件，规划器只能从索引开头逐行过滤，
+    因此 NULL 块单独作为一个分支，由调用方分别 ORDER BY ... LIMIT 后 UNION ALL 合并。
+
+    分支形式: ("after", value, id) / ("null_after", id) / ("null",) / ("not_null",)
+    """
+    value, last_id = position
+    nulls_at_end = nulls_high == (sort_order == "asc")
+
+    if value is None:
+        branches = [("null_after", last_id)]
+        if not nulls_at_end:
+            branches.append(("not_null",))
+    else:
+        branches = [("after", value, last_id)]
+        if nulls_at_end:
+            branches.append(("null",))
+    return branches
+
+
+def branch_condition(branch: tuple, sort_by: str, sort_order: str, placeholder: str = "%s") -> Tuple[str, List[Any]]:
+    """将 keyset 分支渲染为 SQL 条件 (PostgreSQL 与 SQLite 均支持行值比较)"""
+    if sort_by not in SORTABLE_COLUMNS:
+        raise ValueError(f"Unsupported sort column: {sort_by}")
+    operator = "<" if sort_order == "desc" else ">"
+
+    kind = branch[0]
+    if kind == "after":
+        return f"({sort_by}, id) {operator} ({placeholder}, {placeholder})", [branch[1], branch[2]]
+    if kind == "null_after":
+        return f"{sort_by} IS NULL AND id {operator} {placeholder}", [branch[1]]
+    if kind == "null":
+        return f"{sort_by} IS NULL", []
+    return f"{sort_by} IS NOT NULL", []
+
+
+def keyset_page_query(table: str, columns: str, where_clause: str, where_params: List[Any],
+                      sort_by: str, sort_order: str, position: Tuple[Any, int], limit: int,
+                      placeholder: str = "%s", nulls_high: bool = True) -> Tuple[str, List[Any]]:
+    """构建游标之后一页数据的查询；多个分支时每个分支单独 LIMIT，再合并排序"""
+    order_by = order_clause(sort_by, sort_order)
+    branches = keyset_branches(sort_order, position, nulls_high)
+
+    parts = []
+    params: List[Any] = []
+    for branch in branches:
+        condition, branch_params = branch_condition(branch, sort_by, sort_order, placeholder)
+        parts.append(
+            f"SELECT {columns} FROM {table} WHERE {where_clause} AND {condition} "
+            f"ORDER BY {order_by} LIMIT {placeholder}"
+        )
+        params.extend(list(where_params) + branch_params + [limit])
+
+    if len(parts) == 1:
+        return parts[0], params
+
+    # 子查询包裹后 UNION ALL (SQLite 不允许复合查询成员直接带 ORDER BY/LIMIT)
+    union = " UNION ALL ".join(f"SELECT * FROM ({part}) AS keyset_{i}" for i, part in enumerate(parts))
+    return f"SELECT * FROM ({union}) AS keyset_rows ORDER BY {order_by} LIMIT {placeholder}", params + [limit]
+
+
+def order_clause(sort_by: str, sort_order: str) -> str:
+    """排序子句，id 作为稳定的次级排序键"""
+    if sort_by not in SORTABLE_COLUMNS:
+        raise ValueError(f"Unsupported sort column: {sort_by}")
+    direction = "DESC" if sort_order == "desc" else "ASC"
+    return f"{sort_by} {direction}, id {direction}"
+
+
+def is_after(row: Dict[str, Any], sort_by: str, sort_order: str, position: Tuple[Any, int],
+             nulls_high: bool = True) -> bool:
+    """内存数据的 keyset 判断 - 行是否位于游标之后；NULL 的位置与 keyset_branches 相同"""
+    def key(value, row_id):
+        if value is None:
+            return (1 if nulls_high else 0, 0, row_id)
+        return (0 if nulls_high else 1, value, row_id)
+
+    row_key, cursor_key = key(row[sort_by], row["id"]), key(*position)
+    return row_key < cursor_key if sort_order == "desc" else row_key > cursor_key
+
+
+def next_cursor(rows, page_size: int, sort_by: str, sort_order: str) -> Optional[str]:
+    """多取一行判断是否还有下一页；rows 最多为 page_size + 1 行"""
+    if len(rows) <= page_size:
+        return None
+    return encode_cursor(sort_by, sort_order, rows[page_size - 1])
@@ -0,0 +1,116 @@
+"""多进程并行导入 (PostgreSQL)
+
+CSV 按字节范围切分为若干分区 (边界对齐到行首)，由进程池分别解析、转换，每个进程使用自己的数据库连接
+以 COPY 写入暂存表，全部完成后再建索引并原子切换 (见 dataset_swap.py)。
+id = 数据行 (pandas 解析出的行，空行不计) 的序号 + 1，与单进程导入一致，与分区方式和完成顺序无关。
+
+要求 CSV 字段中不含换行符 (引号内的换行会被当作行边界)。
+"""
+import io
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Tuple
+
+import pandas as pd
+import psycopg2
+
+from bulk_loader import ANIME_COLUMNS, copy_rows
+from csv_transform import CSV_CHUNK_SIZE, batch_rows, transform_chunk
+from dataset_swap import STAGING_TABLE, build_staging, create_staging, swap_in
+from db_schema import import_lock
+
+# 并行导入的进程数 (即并发的数据库连接数)；1 表示沿用单进程导入
+IMPORT_WORKERS = int(os.getenv("IMPORT_WORKERS", "1"))
+
+COLUMNS = ("id",) + ANIME_COLUMNS
+
+
+def csv_partitions(csv_path: str, parts: int) -> Tuple[bytes, List[Tuple[int, int]]]:
+    """返回表头与数据部分的字节范围 [(start, end)]，每个范围都从行首开始"""
+    size = os.path.getsize(csv_path)
+    with open(csv_path, "rb") as f:
+        header = f.readline()
+        data_start = f.tell()
+        boundaries = [data_start]
+        for i in range(1, parts):
+            f.seek(data_start + (size - data_start) * i // parts)
+            f.readline()  # 跳到下一行的行首
+            boundaries.append(max(f.tell(), boundaries[-1]))
+        boundaries.append(size)
+    ranges = [(start, end) for start, end in zip(boundaries, boundaries[1:]) if end > start]
+    return header, ranges
+
+
+def _read_range(csv_path: str, start: int, end: int) -> bytes:
+    with open(csv_path, "rb") as f:
+        f.seek(start)
+        return f.read(end - start)
+
+
+def _count_rows(task) -> int:
+    """分区中 pandas 解析出的数据行数；空行 (包括只含空白的行) 不计入，与 _load_partition 的行号一致"""
+    csv_path, header, start, end = task
+    reader = pd.read_csv(io.BytesIO(header + _read_range(csv_path, start, end)),
+                         chunksize=CSV_CHUNK_SIZE, dtype=str, usecols=[0])
+    return sum(len(chunk) for chunk in reader)
+
+
+def _load_partition(task) -> int:
+    """子进程: 解析并转换一个分区，通过独立连接 COPY 到目标表并提交"""
+    dsn, csv_path, header, start, end, first_row, table = task
+    reader = pd.read_csv(io.BytesIO(header + _read_range(csv_path, start, end)),
+                         chunksize=CSV_CHUNK_SIZE, dtype=str)
+
+    def rows():
+        for chunk in reader:
+            # 行号换算为整个文件中的位置，id 与单进程导入一致
+            chunk.index = chunk.index + first_row
+            for row in batch_rows(transform_chunk(chunk, int(chunk.index[0])), COLUMNS):
+                yield row
+
+    conn = psycopg2.connect(dsn)
+    try:
+        with conn.cursor() as cursor:
+            loaded = copy_rows(cursor, rows(), table=table, columns=COLUMNS)
+        conn.commit()
+    finally:
+        conn.close()
+    return loaded
+
+
+def parallel_copy(dsn: str, csv_path: str, workers: int = IMPORT_WORKERS, table: str = STAGING_TABLE) -> int:
+    """以 workers 个进程并行写入 table，返回写入的行数；任一分区失败时抛出异常"""
+    header, ranges = csv_partitions(csv_path, workers)
+    started = time.perf_counter()
+
+    # spawn: 子进程不继承父进程已打开的数据库连接
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+        counts = list(pool.map(_count_rows, [(csv_path, header, start, end) for start, end in ranges]))
+        first_rows = [sum(counts[:i]) for i in range(len(counts))]
+        tasks = [
+            (dsn, csv_path, header, start, end, first_row, table)
+            for (start, end), first_row in zip(ranges, first_rows)
+        ]
+        total = sum(pool.map(_load_partition, tasks))
+
+    elapsed = time.perf_counter() - started
+    rate = total / elapsed if elapsed > 0 else 0.0
+    print(f"Parallel import: {total} rows from {len(ranges)} partitions with {workers} workers "
+          f"in {elapsed:.2f}s ({rate:,.0f} rows/s)")
+    return total
+
+
+def parallel_swap_import(conn, dsn: str, csv_path: str, workers: int = IMPORT_WORKERS) -> int:
+    """并行写入暂存表后原子切换；任一分区失败时线上表保持不变
+
+    导入锁由协调连接 conn 持有，各子进程的连接只写入暂存表。
+    """
+    with import_lock(conn):
+        create_staging(conn)
+        imported = parallel_copy(dsn, csv_path, workers)
+        build_staging(conn)
+        swap_in(conn)
+    return imported
@@ -0,0 +1,204 @@
+import functools
+import inspect
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+from urllib.parse import urlencode
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.params import Depends as DependsParam
+from fastapi.responses import JSONResponse
+
+from http_cache import is_not_modified, validator_headers
+from server_timing import phase
+
+# RESPONSE_CACHE_SIZE=0 关闭缓存
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "256"))
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "60"))
+# 两次读取数据集版本之间的最短间隔 (秒)，间隔内的命中不访问数据库
+RESPONSE_CACHE_GENERATION_CHECK = float(os.getenv("RESPONSE_CACHE_GENERATION_CHECK", "5"))
+
+
+def query_defaults(endpoint: Callable) -> Dict[str, Any]:
+    """读取端点中查询与路径参数的默认值；依赖注入参数不参与缓存键"""
+    defaults = {}
+    for name, parameter in inspect.signature(endpoint).parameters.items():
+        if isinstance(parameter.default, DependsParam):
+            continue
+        # 路径参数没有默认值，始终写入缓存键
+        defaults[name] = getattr(parameter.default, "default", parameter.default)
+    return defaults
+
+
+def canonical_key(path: str, params: Dict[str, Any], defaults: Dict[str, Any]) -> str:
+    """规范化查询参数: 按名称排序，省略空值与等于默认值的参数"""
+    items = sorted(
+        (name, value) for name, value in params.items()
+        if name in defaults and value is not None and value != "" and value != defaults[name]
+    )
+    return f"{path}?{urlencode(items)}" if items else path
+
+
+def render_json(result: Any) -> bytes:
+    """按 FastAPI 默认方式序列化响应体"""
+    return JSONResponse(jsonable_encoder(result)).body
+
+
+class FallbackResponse(JSONResponse):
+    """示例数据 (数据库不可用) 的响应: 缓存装饰器原样返回，不写入缓存，也不带 ETag / Last-Modified
+
+    no-store 使浏览器不保存示例数据，数据库恢复后的下一次请求直接取得真实数据。
+    """
+
+    def __init__(self, content: Any, **kwargs):
+        super().__init__(jsonable_encoder(content), headers={"Cache-Control": "no-store"}, **kwargs)
+
+
+class VersionedResult:
+    """由某一数据集版本的数据 (如进程内快照) 计算出的结果
+
+    快照可能落后于数据库中的当前版本；缓存装饰器按 generation 生成 ETag / Last-Modified，
+    使验证器与响应体出自同一版本。
+    """
+
+    __slots__ = ("content", "generation")
+
+    def __init__(self, content: Any, generation: Any):
+        self.content = content
+        self.generation = generation
+
+
+class ResponseCache:
+    """已序列化 JSON 响应的 LRU + TTL 缓存，并按数据集版本回答条件请求
+
+    load_generation 返回当前数据集的 (版本, 更新时间) (导入脚本递增)；版本变化时清空全部条目。
+    读取版本失败时本次请求绕过缓存，也不附带 ETag。
+    """
+
+    def __init__(self, load_generation: Callable[[], Any], max_entries: int = RESPONSE_CACHE_SIZE,
+                 ttl: float = RESPONSE_CACHE_TTL, generation_check: float = RESPONSE_CACHE_GENERATION_CHECK):
+        self.load_generation = load_generation
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.generation_check = generation_check
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._generation = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    async def generation(self) -> Optional[Any]:
+        """当前数据集版本；到达检查间隔时重新读取 (load_generation 可以是协程函数)"""
+        if self._generation is not None and time.monotonic() - self._checked_at < self.generation_check:
+            return self._generation
+
+        try:
+            generation = self.load_generation()
+            if inspect.isawaitable(generation):
+                generation = await generation
+        except Exception as exc:
+            print(f"Response cache generation check failed: {exc}")
+            return None
+
+        with self._lock:
+            if generation != self._generation:
+                self._entries.clear()
+                self._generation = generation
+            self._checked_at = time.monotonic()
+        return generation
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            expires_at, body = entry
+            if time.monotonic() >= expires_at:
+                del self._entries[key]
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return body
+
+    def put(self, key: str, body: bytes, generation: Any) -> None:
+        with self._lock:
+            # 计算期间版本已变化 (或响应体出自旧版本的快照) 时不写入，避免旧数据占据新版本的缓存
+            if generation != self._generation:
+                return
+            self._entries[key] = (time.monotonic() + self.ttl, body)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def cached(self, path: str):
+        """端点装饰器
+
+        客户端验证器与当前版本一致时直接返回 304；命中缓存时返回已缓存的 JSON 字节，
+        两者都不访问数据库，也不重新序列化。
+        """
+        def decorator(endpoint):
+            defaults = query_defaults(endpoint)
+
+            @functools.wraps(endpoint)
+            async def wrapper(request: Request, **kwargs):
+                with phase("version"):
+                    generation = await self.generation()
+                if generation is None:
+                    return await endpoint(**kwargs)
+
+                key = canonical_key(path, kwargs, defaults)
+                headers = validator_headers(generation, key)
+                if is_not_modified(request.headers, headers, exists=False):
+                    return Response(status_code=304, headers=headers)
+
+                body = self.get(key) if self.enabled else None
+                headers["X-Cache"] = "HIT"
+                if body is None:
+                    result = await endpoint(**kwargs)
+                    # 端点自行构造的响应 (包括 FallbackResponse) 不缓存
+                    if isinstance(result, Response):
+                        return result
+                    body_generation = generation
+                    if isinstance(result, VersionedResult):
+                        # 响应体出自落后的快照时，验证器使用快照的版本而不是数据库的当前版本
+                        body_generation = result.generation
+                        if body_generation != generation:
+                            headers.update(validator_headers(body_generation, key))
+                        result = result.content
+                    with phase("serialize"):
+                        body = render_json(result)
+                    if self.enabled:
+                        # 按响应体所属的版本写入: 快照落后于数据库时 put 不写入，缓存中只有当前版本的数据
+                        self.put(key, body, body_generation)
+                    headers["X-Cache"] = "MISS"
+
+                # If-None-Match: * 在端点确认资源存在之后才能回答 304 (不存在时端点已抛出 404)
+                if is_not_modified(request.headers, headers):
+                    return Response(status_code=304, headers=headers)
+                return Response(content=body, media_type="application/json", headers=headers)
+
+            # 对 FastAPI 暴露原端点参数，并额外注入 Request 以读取条件请求头
+            signature = inspect.signature(endpoint)
+            wrapper.__signature__ = signature.replace(parameters=[
+                *signature.parameters.values(),
+                inspect.Parameter("request", inspect.Parameter.KEYWORD_ONLY, annotation=Request),
+            ])
+            return wrapper
+
+        return decorator
@@ -0,0 +1,203 @@
+"""可断点续传的分批导入 (PostgreSQL)
+
+数据按批写入暂存表 anime_staging，每批与检查点 (输入字节偏移、批次号、行数) 在同一事务中提交；
+中断后重新运行会从最后一次提交的批次继续，全部完成后再原子切换 (见 dataset_swap.py)。
+无法解析或无法写入的行记录到拒绝文件，不会中止导入。
+"""
+import csv
+import os
+import time
+from typing import List, Optional, Sequence, Tuple
+
+import pandas as pd
+import psycopg2
+
+from bulk_loader import ANIME_COLUMNS, copy_rows
+from csv_transform import CSV_CHUNK_SIZE, CSV_COLUMNS, batch_rows, iter_csv_byte_chunks, transform_chunk
+from dataset_swap import STAGING_TABLE, build_staging, create_staging, swap_in
+from db_schema import import_lock
+
+# 拒绝文件: 原始列 + 行号与原因，修正后可单独导入
+IMPORT_REJECT_FILE = os.getenv("IMPORT_REJECT_FILE", "import_rejects.csv")
+
+# 连接中断时在进程内自动重连并续传的次数
+IMPORT_RETRIES = int(os.getenv("IMPORT_RETRIES", "3"))
+
+COLUMNS = ("id",) + ANIME_COLUMNS
+
+CHECKPOINT_DDL = """
+    CREATE TABLE IF NOT EXISTS anime_import_checkpoint (
+        id INTEGER PRIMARY KEY,
+        input_fingerprint TEXT NOT NULL,
+        input_offset BIGINT,
+        batch_number INTEGER NOT NULL,
+        rows_read BIGINT NOT NULL,
+        rows_loaded BIGINT NOT NULL,
+        rows_rejected BIGINT NOT NULL,
+        updated_at TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+
+CHECKPOINT_SELECT_SQL = """
+    SELECT input_fingerprint, input_offset, batch_number, rows_read, rows_loaded, rows_rejected
+    FROM anime_import_checkpoint WHERE id = 1
+"""
+
+CHECKPOINT_SAVE_SQL = """
+    INSERT INTO anime_import_checkpoint
+        (id, input_fingerprint, input_offset, batch_number, rows_read, rows_loaded, rows_rejected)
+    VALUES (1, %s, %s, %s, %s, %s, %s)
+    ON CONFLICT (id) DO UPDATE SET
+        input_fingerprint = EXCLUDED.input_fingerprint,
+        input_offset = EXCLUDED.input_offset,
+        batch_number = EXCLUDED.batch_number,
+        rows_read = EXCLUDED.rows_read,
+        rows_loaded = EXCLUDED.rows_loaded,
+        rows_rejected = EXCLUDED.rows_rejected,
+        updated_at = CURRENT_TIMESTAMP
+"""
+
+INSERT_SQL = f"""
+    INSERT INTO {STAGING_TABLE} ({", ".join(COLUMNS)})
+    VALUES ({", ".join(["%s"] * len(COLUMNS))})
+"""
+
+
+def input_fingerprint(csv_path: str) -> str:
+    """输入文件的标识 - 文件被替换或修改后不会沿用旧的检查点"""
+    stat = os.stat(csv_path)
+    return f"{os.path.abspath(csv_path)}:{stat.st_size}:{stat.st_mtime_ns}"
+
+
+class ResumableImport:
+    """分批提交并记录检查点的导入任务"""
+
+    def __init__(self, dsn: str, csv_path: str, reject_path: str = IMPORT_REJECT_FILE,
+                 chunk_size: int = CSV_CHUNK_SIZE, retries: int = IMPORT_RETRIES):
+        self.dsn = dsn
+        self.csv_path = csv_path
+        self.reject_path = reject_path
+        self.chunk_size = chunk_size
+        self.retries = retries
+
+    def run(self) -> int:
+        """执行 (或续传) 导入并切换为线上数据，返回写入的行数"""
+        attempt = 0
+        while True:
+            try:
+                return self._run_once()
+            except psycopg2.OperationalError as exc:
+                attempt += 1
+                if attempt > self.retries:
+                    print(f"Import interrupted: {exc}; rerun to resume from the last checkpoint")
+                    raise
+                print(f"Import interrupted: {exc}; resuming from the last checkpoint ({attempt}/{self.retries})")
+                time.sleep(min(2 ** attempt, 30))
+
+    def _load_checkpoint(self, conn, fingerprint: str) -> Optional[Tuple]:
+        """可续传的检查点；输入已变化或暂存表不存在时返回 None"""
+        with conn.cursor() as cursor:
+            cursor.execute(CHECKPOINT_DDL)
+            cursor.execute(CHECKPOINT_SELECT_SQL)
+            checkpoint = cursor.fetchone()
+            cursor.execute("SELECT to_regclass(%s) IS NOT NULL", (f"public.{STAGING_TABLE}",))
+            staging_exists = cursor.fetchone()[0]
+        conn.commit()
+        if checkpoint and checkpoint[0] == fingerprint and staging_exists:
+            return checkpoint[1:]
+        return None
+
+    def _save_checkpoint(self, cursor, fingerprint: str, offset, batch_number: int,
+                         rows_read: int, rows_loaded: int, rows_rejected: int) -> None:
+        cursor.execute(CHECKPOINT_SAVE_SQL,
+                       (fingerprint, offset, batch_number, rows_read, rows_loaded, rows_rejected))
+
+    def _load_batch(self, cursor, rows: List[Tuple]) -> Tuple[int, List[Tuple[Tuple, str]]]:
+        """整批 COPY；数据库拒绝时在保存点内逐行写入，找出并跳过无法写入的行"""
+        cursor.execute("SAVEPOINT import_batch")
+        try:
+            copy_rows(cursor, rows, table=STAGING_TABLE, columns=COLUMNS)
+            cursor.execute("RELEASE SAVEPOINT import_batch")
+            return len(rows), []
+        except (psycopg2.DataError, psycopg2.IntegrityError):
+            cursor.execute("ROLLBACK TO SAVEPOINT import_batch")
+
+        loaded, rejected = 0, []
+        for row in rows:
+            cursor.execute("SAVEPOINT import_row")
+            try:
+                cursor.execute(INSERT_SQL, row)
+                cursor.execute("RELEASE SAVEPOINT import_row")
+                loaded += 1
+            except (psycopg2.DataError, psycopg2.IntegrityError) as exc:
+                cursor.execute("ROLLBACK TO SAVEPOINT import_row")
+                rejected.append((row, str(exc).strip().splitlines()[0]))
+        cursor.execute("RELEASE SAVEPOINT import_batch")
+        return loaded, rejected
+
+    def _write_rejects(self, parse_rejects: Sequence[pd.DataFrame], db_rejects: Sequence[Tuple[Tuple, str]]) -> None:
+        if not parse_rejects and not db_rejects:
+            return
+        headers = list(CSV_COLUMNS)
+        new_file = not os.path.exists(self.reject_path)
+        with open(self.reject_path, "a", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            if new_file:
+                writer.writerow(["row", "reason"] + headers)
+            for frame in parse_rejects:
+                for position, record in zip(frame.index, frame.reindex(columns=headers).itertuples(index=False)):
+                    writer.writerow([position, "non-numeric value"] + ["" if pd.isna(v) else v for v in record])
+            for row, reason in db_rejects:
+                # CSV 列与 ANIME_COLUMNS 顺序一致，row[0] 为 id
+                writer.writerow([row[0] - 1, reason] + list(row[1:]))
+
+    def _run_once(self) -> int:
+        fingerprint = input_fingerprint(self.csv_path)
+        conn = psycopg2.connect(self.dsn)
+        try:
+            # 检查点、暂存表与切换都在导入锁内，同时运行的第二个导入等待而不是重建暂存表
+            with import_lock(conn):
+                checkpoint = self._load_checkpoint(conn, fingerprint)
+                if checkpoint is None:
+                    offset, batch_number, rows_read, rows_loaded, rows_rejected = None, 0, 0, 0, 0
+                    create_staging(conn)
+                    if os.path.exists(self.reject_path):
+                        os.remove(self.reject_path)
+                    with conn.cursor() as cursor:
+                        self._save_checkpoint(cursor, fingerprint, offset, batch_number, rows_read, rows_loaded, rows_rejected)
+                    conn.commit()
+                    print(f"Starting import of {self.csv_path}")
+                else:
+                    offset, batch_number, rows_read, rows_loaded, rows_rejected = checkpoint
+                    print(f"Resuming import after batch {batch_number} (offset {offset}, {rows_loaded} rows loaded)")
+
+                for end_offset, chunk in iter_csv_byte_chunks(self.csv_path, offset, self.chunk_size):
+                    # 行号为整个文件中的位置，续传后 id 与一次完成的导入相同
+                    chunk.index = chunk.index + rows_read
+                    parse_rejects: List[pd.DataFrame] = []
+                    rows = batch_rows(transform_chunk(chunk, rows_read, parse_rejects), COLUMNS)
+
+                    with conn.cursor() as cursor:
+                        loaded, db_rejects = self._load_batch(cursor, rows)
+                        batch_number += 1
+                        rows_read += len(chunk)
+                        rows_loaded += loaded
+                        rows_rejected += sum(len(frame) for frame in parse_rejects) + len(db_rejects)
+                        self._save_checkpoint(cursor, fingerprint, end_offset, batch_number,
+                                              rows_read, rows_loaded, rows_rejected)
+                    conn.commit()
+                    self._write_rejects(parse_rejects, db_rejects)
+                    print(f"Checkpoint: batch {batch_number}, offset {end_offset}, "
+                          f"{rows_loaded} rows loaded, {rows_rejected} rejected")
+
+                build_staging(conn)
+                # 删除检查点与切换在同一事务中提交
+                with conn.cursor() as cursor:
+                    cursor.execute("DELETE FROM anime_import_checkpoint WHERE id = 1")
+                swap_in(conn)
+        finally:
+            conn.close()
+
+        if rows_rejected:
+            print(f"{rows_rejected} rejected rows written to {self.reject_path}")
+        return rows_loaded
@@ -0,0 +1,142 @@
+import json
+import os
+import time
+from contextvars import ContextVar
+from typing import List, Optional, Tuple
+
+# SERVER_TIMING=true: 响应附带 Server-Timing 头 (各阶段耗时，毫秒)
+SERVER_TIMING = os.getenv("SERVER_TIMING", "false").lower() == "true"
+# SERVER_TIMING_LOG=true: 每个请求输出一行 JSON 计时日志
+SERVER_TIMING_LOG = os.getenv("SERVER_TIMING_LOG", "false").lower() == "true"
+
+_current: ContextVar[Optional["RequestTiming"]] = ContextVar("server_timing", default=None)
+
+
+class RequestTiming:
+    """一个请求中各阶段的耗时；同名阶段出现多次时累加，嵌套阶段记为 外层.内层"""
+
+    __slots__ = ("started", "phases", "prefix")
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases: List[Tuple[str, float]] = []
+        self.prefix = ""
+
+    def add(self, name: str, seconds: float) -> None:
+        self.phases.append((name, seconds))
+
+    def totals(self) -> List[Tuple[str, float]]:
+        totals = {}
+        for name, seconds in self.phases:
+            totals[name] = totals.get(name, 0.0) + seconds
+        return list(totals.items())
+
+    def header(self, total: float) -> str:
+        entries = [f"{name};dur={seconds * 1000:.2f}" for name, seconds in self.totals()]
+        entries.append(f"total;dur={total * 1000:.2f}")
+        return ", ".join(entries)
+
+
+class _Phase:
+    __slots__ = ("timing", "name", "outer", "started")
+
+    def __init__(self, timing: RequestTiming, name: str):
+        self.timing = timing
+        self.name = name
+
+    def __enter__(self):
+        # 例如版本检查 (version) 内部的连接池与查询记为 version.pool、version.query
+        self.outer = self.timing.prefix
+        self.name = self.outer + self.name
+        self.timing.prefix = self.name + "."
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.timing.add(self.name, time.perf_counter() - self.started)
+        self.timing.prefix = self.outer
+        return False
+
+
+class _NoPhase:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NO_PHASE = _NoPhase()
+
+
+def enabled() -> bool:
+    return SERVER_TIMING or SERVER_TIMING_LOG
+
+
+def phase(name: str):
+    """with phase("query"): ... 记录一个阶段；当前请求未计时 (中间件未启用) 时为空操作"""
+    timing = _current.get()
+    if timing is None:
+        return _NO_PHASE
+    return _Phase(timing, name)
+
+
+def record(name: str, seconds: float) -> None:
+    """记录一个已在别处测得的阶段耗时"""
+    timing = _current.get()
+    if timing is not None:
+        timing.add(name, seconds)
+
+
+class ServerTimingMiddleware:
+    """ASGI 中间件: 为每个请求建立计时上下文，在响应头中写入 Server-Timing 并可输出 JSON 日志
+
+    同步的处理代码经线程池执行时会复制上下文变量，因此线程中记录的阶段也计入同一请求。
+    """
+
+    def __init__(self, app, header: bool = SERVER_TIMING, log: bool = SERVER_TIMING_LOG):
+        self.app = app
+        self.header = header
+        self.log = log
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timing = RequestTiming()
+        token = _current.set(timing)
+        status = None
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if self.header:
+                    value = timing.header(time.perf_counter() - timing.started)
+                    message = {**message, "headers": [*message.get("headers", []),
+                                                      (b"server-timing", value.encode("latin-1"))]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            if self.log:
+                print(json.dumps({
+                    "event": "request_timing",
+                    "method": scope.get("method"),
+                    "path": scope.get("path"),
+                    "query": scope.get("query_string", b"").decode("latin-1"),
+                    "status": status,
+                    "total_ms": round((time.perf_counter() - timing.started) * 1000, 2),
+                    "phases_ms": {name: round(seconds * 1000, 2) for name, seconds in timing.totals()},
+                }, ensure_ascii=False))
+
+
+def install(app) -> None:
+    """SERVER_TIMING 或 SERVER_TIMING_LOG 开启时为应用添加中间件；关闭时不做任何事"""
+    if enabled():
+        app.add_middleware(ServerTimingMiddleware)
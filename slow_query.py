@@ -0,0 +1,234 @@
+import asyncio
+import hashlib
+import inspect
+import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+from anime_queries import MAX_QUERY_SHAPES
+
+# 超过该耗时 (毫秒) 的查询记为慢查询；0 关闭
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "500"))
+# SLOW_QUERY_EXPLAIN=true: 在后台对慢查询执行 EXPLAIN (ANALYZE, BUFFERS) 以捕获执行计划
+# 默认关闭 - ANALYZE 会再完整执行一次本就很慢的查询，数据库过载时反而加重负载
+SLOW_QUERY_EXPLAIN = os.getenv("SLOW_QUERY_EXPLAIN", "false").lower() == "true"
+# 同一查询形状两次捕获计划之间的最短间隔 (秒)
+SLOW_QUERY_EXPLAIN_INTERVAL = float(os.getenv("SLOW_QUERY_EXPLAIN_INTERVAL", "300"))
+# SLOW_QUERY_LOG_PARAMS=true: 日志与汇总中记录查询参数的实际值；默认每个值替换为 "?" (检索词等可能含用户输入)
+SLOW_QUERY_LOG_PARAMS = os.getenv("SLOW_QUERY_LOG_PARAMS", "false").lower() == "true"
+# SLOW_QUERY_ENDPOINT=true: 提供 GET /debug/slow-queries (按形状汇总，含参数与计划，勿在公开部署中开启)
+SLOW_QUERY_ENDPOINT = os.getenv("SLOW_QUERY_ENDPOINT", "false").lower() == "true"
+
+EXPLAIN_PREFIX = "EXPLAIN (ANALYZE, BUFFERS) "
+
+_COMMENT = re.compile(r"--[^\n]*|/\*.*?\*/", re.S)
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_PLACEHOLDER = re.compile(r"%\(\w+\)s|%s|\$\d+")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_VALUE_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_SPACE = re.compile(r"\s+")
+
+
+def normalize(sql: str) -> str:
+    """查询形状: 去掉注释，字面量与占位符统一为 ?，合并空白"""
+    shape = _COMMENT.sub(" ", sql)
+    shape = _STRING.sub("?", shape)
+    shape = _PLACEHOLDER.sub("?", shape)
+    shape = _NUMBER.sub("?", shape)
+    shape = _VALUE_LIST.sub("(?, ...)", shape)
+    return _SPACE.sub(" ", shape).strip()
+
+
+class QueryShape:
+    """一种查询形状的慢查询汇总与最近一次捕获的执行计划"""
+
+    __slots__ = ("shape_id", "shape", "sql", "count", "total", "max", "last_params", "plan", "plan_at", "pending")
+
+    def __init__(self, shape: str, sql: str):
+        self.shape_id = hashlib.sha1(shape.encode("utf-8")).hexdigest()[:12]
+        self.shape = shape
+        self.sql = sql
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.last_params = None
+        self.plan: Optional[List[str]] = None
+        self.plan_at = 0.0
+        self.pending = False
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "shape_id": self.shape_id,
+            "shape": self.shape,
+            "count": self.count,
+            "total_ms": round(self.total * 1000, 2),
+            "mean_ms": round(self.total / self.count * 1000, 2) if self.count else 0.0,
+            "max_ms": round(self.max * 1000, 2),
+            "last_params": self.last_params,
+            "plan": self.plan,
+        }
+
+
+_shapes: Dict[str, QueryShape] = {}
+# 慢查询本身很少，只有超过阈值时才加锁
+_lock = threading.Lock()
+_executor: Optional[ThreadPoolExecutor] = None
+_tasks = set()
+
+
+def enabled() -> bool:
+    return SLOW_QUERY_MS > 0
+
+
+def _jsonable(params):
+    if params is None:
+        return None
+    if isinstance(params, dict):
+        return {key: _jsonable_value(value) for key, value in params.items()}
+    return [_jsonable_value(value) for value in params]
+
+
+def _jsonable_value(value):
+    if not SLOW_QUERY_LOG_PARAMS:
+        return "?"
+    return value if isinstance(value, (str, int, float, bool, type(None))) else str(value)
+
+
+def observe(sql: str, params, seconds: float, explain: Optional[Callable] = None) -> None:
+    """记录一次查询耗时；超过阈值时输出 JSON 日志，并按需在后台捕获执行计划
+
+    explain(sql, params) 执行给定的 EXPLAIN 语句并返回计划文本行；可以是普通函数 (在后台线程中执行)
+    或协程函数 (在当前事件循环中作为任务执行)。
+    """
+    if not enabled() or seconds * 1000 < SLOW_QUERY_MS:
+        return
+
+    shape_text = normalize(sql)
+    with _lock:
+        shape = _shapes.get(shape_text)
+        if shape is None:
+            if len(_shapes) >= MAX_QUERY_SHAPES:
+                _shapes.clear()
+            shape = _shapes[shape_text] = QueryShape(shape_text, sql)
+        shape.count += 1
+        shape.total += seconds
+        shape.max = max(shape.max, seconds)
+        shape.last_params = _jsonable(params)
+        capture = (SLOW_QUERY_EXPLAIN and explain is not None and not shape.pending
+                   and shape_text.upper().startswith(("SELECT", "WITH"))
+                   and time.monotonic() - shape.plan_at >= SLOW_QUERY_EXPLAIN_INTERVAL)
+        if capture:
+            shape.pending = True
+        count, total = shape.count, shape.total
+
+    print(json.dumps({
+        "event": "slow_query",
+        "shape_id": shape.shape_id,
+        "shape": shape_text,
+        "params": shape.last_params,
+        "duration_ms": round(seconds * 1000, 2),
+        "shape_count": count,
+        "shape_total_ms": round(total * 1000, 2),
+    }, ensure_ascii=False))
+
+    if capture:
+        _schedule_explain(shape, sql, params, explain)
+
+
+def _schedule_explain(shape: QueryShape, sql: str, params, explain: Callable) -> None:
+    global _executor
+    explain_sql = EXPLAIN_PREFIX + sql
+    if inspect.iscoroutinefunction(explain):
+        task = asyncio.get_running_loop().create_task(_explain_async(shape, explain_sql, params, explain))
+        # 保留引用，避免任务在完成前被回收
+        _tasks.add(task)
+        task.add_done_callback(_tasks.discard)
+        return
+
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="slow-query-explain")
+    _executor.submit(_explain_sync, shape, explain_sql, params, explain)
+
+
+def _explain_sync(shape: QueryShape, explain_sql: str, params, explain: Callable) -> None:
+    try:
+        _store_plan(shape, explain(explain_sql, params))
+    except Exception as exc:
+        _store_plan(shape, None, exc)
+
+
+async def _explain_async(shape: QueryShape, explain_sql: str, params, explain: Callable) -> None:
+    try:
+        _store_plan(shape, await explain(explain_sql, params))
+    except Exception as exc:
+        _store_plan(shape, None, exc)
+
+
+def _store_plan(shape: QueryShape, plan: Optional[List[str]], error: Optional[Exception] = None) -> None:
+    if plan is not None and not SLOW_QUERY_LOG_PARAMS:
+        # 计划中的过滤条件带有参数的实际值 (如 title ~~* '%...%')
+        plan = [_STRING.sub("'?'", line) for line in plan]
+    with _lock:
+        shape.pending = False
+        shape.plan_at = time.monotonic()
+        if plan is not None:
+            shape.plan = plan
+    if error is not None:
+        print(f"Slow query EXPLAIN failed for {shape.shape_id}: {error}")
+        return
+    print(json.dumps({"event": "slow_query_plan", "shape_id": shape.shape_id, "plan": plan}, ensure_ascii=False))
+
+
+def report(limit: int = 20) -> List[Dict[str, Any]]:
+    """按累计耗时排序的慢查询形状 (最严重的在前)"""
+    with _lock:
+        shapes = sorted(_shapes.values(), key=lambda shape: shape.total, reverse=True)[:limit]
+        return [shape.summary() for shape in shapes]
+
+
+def instrument_engine(engine) -> None:
+    """为 SQLAlchemy 引擎的每条语句计时；PostgreSQL 上经独立的原始连接捕获执行计划"""
+    from sqlalchemy import event
+
+    def explain(explain_sql, params):
+        raw = engine.raw_connection()
+        try:
+            cursor = raw.cursor()
+            cursor.execute(explain_sql, params)
+            return [row[0] for row in cursor.fetchall()]
+        finally:
+            raw.rollback()
+            raw.close()
+
+    plan_capture = explain if engine.dialect.name == "postgresql" else None
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("slow_query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["slow_query_started"].pop()
+        if not executemany:
+            observe(statement, parameters, time.perf_counter() - started, plan_capture)
+
+    @event.listens_for(engine, "handle_error")
+    def _error(context):
+        # 出错的语句不会触发 after_cursor_execute
+        if context.connection is not None and context.connection.info.get("slow_query_started"):
+            context.connection.info["slow_query_started"].pop()
+
+
+async def slow_queries_endpoint(limit: int = 20):
+    return {"threshold_ms": SLOW_QUERY_MS, "shapes": report(limit)}
+
+
+def install(app) -> None:
+    """SLOW_QUERY_ENDPOINT=true 时添加 GET /debug/slow-queries；需在挂载前端静态文件 (/) 之前调用"""
+    if SLOW_QUERY_ENDPOINT:
+        app.add_api_route("/debug/slow-queries", slow_queries_endpoint, methods=["GET"], include_in_schema=False)
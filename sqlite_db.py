@@ -0,0 +1,320 @@
+import os
+import shutil
+import sqlite3
+import time
+from itertools import islice
+from typing import Any, Iterable, List, Sequence, Tuple
+
+from db_schema import DATASET_VERSION_DDL, DATASET_VERSION_INIT_SQL, get_dataset_version
+
+# main.py 使用的表结构与索引
+SQLITE_ANIME_DDL = """
+    CREATE TABLE IF NOT EXISTS anime (
+        id INTEGER PRIMARY KEY,
+        title TEXT,
+        year INTEGER,
+        average_rating REAL,
+        rating_count INTEGER,
+        collections INTEGER,
+        watched INTEGER,
+        completion_rate REAL,
+        img_url TEXT,
+        tags TEXT
+    )
+"""
+
+# 每个可排序列一个索引 (与 db_schema.ANIME_INDEXES 对应)；SQLite 的二级索引隐含 rowid (即 id)，
+# 因此 (列) 索引同时满足 ORDER BY 列, id 与 keyset 的 (列, id) 范围扫描
+SQLITE_ANIME_INDEXES = [
+    ("idx_year", "year"),
+    ("idx_rating", "average_rating"),
+    ("idx_rating_count", "rating_count"),
+    ("idx_collections", "collections"),
+    ("idx_watched", "watched"),
+    ("idx_title", "title"),
+]
+
+# 从 CSV 导入时写入的列 (tags 不在 CSV 中)
+SQLITE_IMPORT_COLUMNS = ("id", "title", "year", "average_rating", "rating_count", "collections", "watched",
+                         "completion_rate", "img_url")
+
+SQLITE_INSERT_BATCH_SIZE = 5000
+
+# FTS5 三元组分词 (SQLite >= 3.34)，中日韩子串也能走全文索引
+FTS_TABLE_DDL = """
+    CREATE VIRTUAL TABLE anime_fts USING fts5(
+        title,
+        content='anime',
+        content_rowid='id',
+        tokenize='trigram'
+    )
+"""
+
+# 外部内容表需要触发器保持同步
+FTS_TRIGGERS = [
+    """
+    CREATE TRIGGER IF NOT EXISTS anime_fts_ai AFTER INSERT ON anime BEGIN
+        INSERT INTO anime_fts(rowid, title) VALUES (new.id, new.title);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS anime_fts_ad AFTER DELETE ON anime BEGIN
+        INSERT INTO anime_fts(anime_fts, rowid, title) VALUES ('delete', old.id, old.title);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS anime_fts_au AFTER UPDATE OF id, title ON anime BEGIN
+        INSERT INTO anime_fts(anime_fts, rowid, title) VALUES ('delete', old.id, old.title);
+        INSERT INTO anime_fts(rowid, title) VALUES (new.id, new.title);
+    END
+    """,
+]
+
+# 三元组分词无法匹配少于 3 个字符的检索词，这类检索退回 LIKE
+FTS_MIN_TERM_LENGTH = 3
+
+_fts_ready = False
+
+
+def fts_ready() -> bool:
+    """FTS5 三元组索引是否可用"""
+    return _fts_ready
+
+
+def ensure_fts(conn: sqlite3.Connection) -> bool:
+    """建立并同步标题全文索引；SQLite 不支持 FTS5/trigram 时返回 False"""
+    global _fts_ready
+
+    try:
+        exists = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'anime_fts'"
+        ).fetchone()
+
+        if not exists:
+            conn.execute(FTS_TABLE_DDL)
+        for trigger in FTS_TRIGGERS:
+            conn.execute(trigger)
+        if not exists:
+            # 新建索引时从 anime 表全量构建
+            conn.execute("INSERT INTO anime_fts(anime_fts) VALUES ('rebuild')")
+
+        conn.commit()
+    except sqlite3.Error as exc:
+        print(f"FTS5 trigram search unavailable, falling back to LIKE: {exc}")
+        conn.rollback()
+        _fts_ready = False
+        return False
+
+    _fts_ready = True
+    return True
+
+
+def detect_fts(conn: sqlite3.Connection) -> bool:
+    """只读数据库 (快照) 不建立索引，只检测其中是否已包含标题全文索引"""
+    global _fts_ready
+
+    _fts_ready = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'anime_fts'"
+    ).fetchone() is not None
+    return _fts_ready
+
+
+def ensure_dataset_version(conn: sqlite3.Connection) -> None:
+    """建立数据集版本表 (与 PostgreSQL 共用 DDL)，供响应缓存判断数据是否变化"""
+    conn.execute(DATASET_VERSION_DDL)
+    conn.execute(DATASET_VERSION_INIT_SQL)
+    conn.commit()
+
+
+def enable_wal(conn: sqlite3.Connection) -> str:
+    """切换为 WAL 日志模式 (持久保存在数据库文件中)，读连接不会被写入阻塞"""
+    return conn.execute("PRAGMA journal_mode = WAL").fetchone()[0]
+
+
+def fts_query(term: str) -> str:
+    """将检索词转换为 FTS5 短语 - 三元组分词下等价于子串匹配"""
+    return '"' + term.replace('"', '""') + '"'
+
+
+def search_join(search: str, ranked: bool = False) -> Tuple[str, List[Any]]:
+    """标题检索的 JOIN 子句；返回空字符串表示应退回 LIKE
+
+    子查询只暴露 fts_id 与 search_rank 两列，外层条件中的列名不会产生歧义。
+    """
+    if not _fts_ready or len(search) < FTS_MIN_TERM_LENGTH:
+        return "", []
+
+    rank_column = "bm25(anime_fts)" if ranked else "0"
+    join = (
+        f"JOIN (SELECT rowid AS fts_id, {rank_column} AS search_rank "
+        f"FROM anime_fts WHERE anime_fts MATCH ?) AS fts ON fts.fts_id = anime.id"
+    )
+    return join, [fts_query(search)]
+
+
+def _set_dataset_version(path: str, version: int) -> None:
+    conn = sqlite3.connect(path)
+    try:
+        ensure_dataset_version(conn)
+        conn.execute(
+            "UPDATE anime_dataset_version SET version = ?, updated_at = CURRENT_TIMESTAMP WHERE id = 1",
+            (version,),
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def _file_version(path: str) -> int:
+    if not os.path.exists(path):
+        return 0
+    conn = sqlite3.connect(path)
+    try:
+        return get_dataset_version(conn)[0]
+    except sqlite3.Error:
+        return 0
+    finally:
+        conn.close()
+
+
+def _discard_sidecars(db_path: str) -> None:
+    """换入新文件前移除旧文件的 -wal / -shm 文件名
+
+    已打开的连接继续使用各自的文件句柄；之后打开新文件的连接会建立新的 -wal / -shm，
+    不会把旧文件的 WAL 帧或共享内存索引套用到新文件上。
+    """
+    for suffix in ("-wal", "-shm"):
+        if os.path.exists(db_path + suffix):
+            os.remove(db_path + suffix)
+
+
+def _snapshot_file(source: str, target: str) -> None:
+    """不移走 source 的前提下原子地生成 target (优先硬链接)"""
+    temporary = target + ".tmp"
+    if os.path.exists(temporary):
+        os.remove(temporary)
+    try:
+        os.link(source, temporary)
+    except OSError:
+        shutil.copy2(source, temporary)
+    os.replace(temporary, target)
+
+
+def ensure_indexes(conn: sqlite3.Connection) -> None:
+    """补建缺少的排序列索引 (旧版本建立的数据库文件没有 rating_count / watched 索引)"""
+    for index_name, column in SQLITE_ANIME_INDEXES:
+        conn.execute(f"CREATE INDEX IF NOT EXISTS {index_name} ON anime({column})")
+    conn.commit()
+
+
+def missing_indexes(conn: sqlite3.Connection) -> List[str]:
+    """SQLITE_ANIME_INDEXES 中数据库文件尚未建立的索引名 (只读快照无法在启动时补建)"""
+    existing = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    return [index_name for index_name, _ in SQLITE_ANIME_INDEXES if index_name not in existing]
+
+
+def build_database(path: str, rows: Iterable[Sequence[Any]], columns: Sequence[str]) -> int:
+    """在新文件中写入数据、建索引、全文索引与数据集版本并 ANALYZE，返回写入的行数"""
+    for leftover in (path, path + "-journal"):
+        if os.path.exists(leftover):
+            os.remove(leftover)
+
+    conn = sqlite3.connect(path)
+    try:
+        conn.execute(SQLITE_ANIME_DDL)
+        insert_sql = f"INSERT INTO anime ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+        iterator = iter(rows)
+        total = 0
+        while True:
+            batch = [tuple(row) for row in islice(iterator, SQLITE_INSERT_BATCH_SIZE)]
+            if not batch:
+                break
+            conn.executemany(insert_sql, batch)
+            total += len(batch)
+        ensure_indexes(conn)
+
+        ensure_dataset_version(conn)
+        ensure_fts(conn)
+        conn.execute("ANALYZE")
+        conn.commit()
+        enable_wal(conn)
+    finally:
+        conn.close()
+    return total
+
+
+def swap_database(db_path: str, rows: Iterable[Sequence[Any]], columns: Sequence[str]) -> int:
+    """原子替换 SQLite 数据库文件，上一代保留为 <db_path>.previous
+
+    新数据在 <db_path>.staging 中完整建好后用 os.replace 换入；
+    已打开的连接继续读取旧文件，之后新建的连接读取新文件，任何时刻都不会看到空表或半成品。
+    """
+    staging = db_path + ".staging"
+    imported = build_database(staging, rows, columns)
+
+    # 版本号必须大于线上与上一代，缓存与 ETag 才会失效且不会与历史版本重复
+    version = max(_file_version(db_path), _file_version(db_path + ".previous")) + 1
+    _set_dataset_version(staging, version)
+
+    if os.path.exists(db_path):
+        _snapshot_file(db_path, db_path + ".previous")
+    _discard_sidecars(db_path)
+    os.replace(staging, db_path)
+    print(f"Swapped {staging} in as {db_path} (dataset version {version})")
+    return imported
+
+
+def build_snapshot(path: str, rows: Iterable[Sequence[Any]], columns: Sequence[str]) -> int:
+    """构建用于部署的只读快照: 全部排序列索引 (SQLITE_ANIME_INDEXES)、合并全文索引、VACUUM 与 ANALYZE，
+    使用 rollback journal
+
+    rollback journal 模式下只读打开 (immutable=1) 不需要 -wal / -shm 文件；
+    数据集版本取构建时间，重新部署的快照不会与旧快照的 ETag 重复。
+    """
+    temporary = path + ".tmp"
+    imported = build_database(temporary, rows, columns)
+    _set_dataset_version(temporary, int(time.time()))
+
+    conn = sqlite3.connect(temporary)
+    try:
+        conn.execute("PRAGMA journal_mode = DELETE")
+        conn.execute("INSERT INTO anime_fts(anime_fts) VALUES ('optimize')")
+        conn.commit()
+        conn.execute("VACUUM")
+        conn.execute("ANALYZE")
+        conn.execute("PRAGMA optimize")
+        conn.commit()
+    finally:
+        conn.close()
+
+    os.replace(temporary, path)
+    print(f"Snapshot written to {path}: {imported} rows, {os.path.getsize(path) / 1e6:.1f} MB")
+    return imported
+
+
+def copy_snapshot(snapshot_path: str, db_path: str) -> None:
+    """将快照复制为可写的数据库文件 (复制完成后原子换入)"""
+    staging = db_path + ".staging"
+    shutil.copyfile(snapshot_path, staging)
+    _discard_sidecars(db_path)
+    os.replace(staging, db_path)
+    print(f"Copied snapshot {snapshot_path} to {db_path}")
+
+
+def rollback_database(db_path: str) -> bool:
+    """切回上一代数据库文件，当前文件成为新的上一代；没有上一代时返回 False"""
+    previous = db_path + ".previous"
+    if not os.path.exists(previous):
+        print(f"No previous generation at {previous} to roll back to")
+        return False
+
+    version = max(_file_version(db_path), _file_version(previous)) + 1
+    _set_dataset_version(previous, version)
+
+    current = db_path + ".rollback"
+    _snapshot_file(db_path, current)
+    _discard_sidecars(db_path)
+    os.replace(previous, db_path)
+    os.replace(current, previous)
+    print(f"Rolled back {db_path} to the previous generation (dataset version {version})")
+    return True
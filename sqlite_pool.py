@@ -0,0 +1,141 @@
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import quote
+
+from server_timing import phase
+
+# 每个进程保留的空闲读连接数 (超出部分用完即关闭)
+SQLITE_POOL_SIZE = int(os.getenv("SQLITE_POOL_SIZE", "4"))
+# 内存映射读取的上限 (字节)，命中时省去 read() 系统调用与页缓存复制
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+# 每个连接的页缓存；负数表示 KiB (默认 64 MB)
+SQLITE_CACHE_SIZE = int(os.getenv("SQLITE_CACHE_SIZE", "-65536"))
+# 每个连接缓存的预编译语句数 (sqlite3 模块按 SQL 文本 LRU 复用)
+SQLITE_STATEMENT_CACHE = int(os.getenv("SQLITE_STATEMENT_CACHE", "256"))
+# immutable=1: 跳过文件锁与变更检测，仅适用于只读部署；auto 表示数据库文件或目录不可写时启用
+SQLITE_IMMUTABLE = os.getenv("SQLITE_IMMUTABLE", "auto").lower()
+
+
+def is_read_only(db_path: str) -> bool:
+    """数据库文件或其所在目录不可写 (只读部署)"""
+    directory = os.path.dirname(os.path.abspath(db_path))
+    return not os.access(db_path, os.W_OK) or not os.access(directory, os.W_OK)
+
+
+class SQLitePool:
+    """进程内复用的只读 SQLite 连接
+
+    连接以 mode=ro 打开并设置 query_only、mmap_size 与 cache_size，页缓存与预编译语句在请求之间保留。
+    每次取连接时检查数据库文件是否已被替换 (sqlite_db.swap_database)，替换后旧连接全部关闭重开。
+    """
+
+    def __init__(self, db_path: str, size: int = SQLITE_POOL_SIZE, immutable: Optional[bool] = None):
+        self.db_path = db_path
+        self.size = size
+        self.immutable = immutable
+        self._idle: List[sqlite3.Connection] = []
+        self._generations: Dict[sqlite3.Connection, Any] = {}
+        self._generation = None
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+        self._counters = {"opened": 0, "reused": 0, "reopened": 0}
+        self._in_use = 0
+
+    def _immutable(self) -> bool:
+        if self.immutable is not None:
+            return self.immutable
+        if SQLITE_IMMUTABLE in ("true", "false"):
+            return SQLITE_IMMUTABLE == "true"
+        return is_read_only(self.db_path)
+
+    def _file_id(self, immutable: bool) -> Optional[Tuple]:
+        """文件标识: 替换文件后 inode 变化；immutable 连接看不到原地修改，因此同时比较大小与修改时间"""
+        try:
+            stat = os.stat(self.db_path)
+        except FileNotFoundError:
+            return None
+        if immutable:
+            return stat.st_dev, stat.st_ino, stat.st_size, stat.st_mtime_ns
+        return stat.st_dev, stat.st_ino
+
+    def _connect(self, immutable: bool) -> sqlite3.Connection:
+        uri = f"file:{quote(os.path.abspath(self.db_path))}?mode=ro"
+        if immutable:
+            uri += "&immutable=1"
+        conn = sqlite3.connect(uri, uri=True, check_same_thread=False, cached_statements=SQLITE_STATEMENT_CACHE)
+        conn.execute("PRAGMA query_only = ON")
+        conn.execute(f"PRAGMA mmap_size = {SQLITE_MMAP_SIZE}")
+        conn.execute(f"PRAGMA cache_size = {SQLITE_CACHE_SIZE}")
+        return conn
+
+    def _reset(self) -> None:
+        for conn in self._idle:
+            conn.close()
+        self._idle.clear()
+        self._generations.clear()
+
+    def getconn(self) -> sqlite3.Connection:
+        """取出一个读连接；用完后必须 putconn"""
+        immutable = self._immutable()
+        generation = self._file_id(immutable)
+
+        with self._lock:
+            if os.getpid() != self._pid:
+                # fork 之后不复用父进程的连接
+                self._idle.clear()
+                self._generations.clear()
+                self._pid = os.getpid()
+                self._in_use = 0
+            if generation != self._generation:
+                if self._generation is not None:
+                    self._counters["reopened"] += 1
+                self._reset()
+                self._generation = generation
+            self._in_use += 1
+            if self._idle:
+                self._counters["reused"] += 1
+                return self._idle.pop()
+            self._counters["opened"] += 1
+
+        try:
+            conn = self._connect(immutable)
+        except sqlite3.Error:
+            with self._lock:
+                self._in_use -= 1
+            raise
+        with self._lock:
+            self._generations[conn] = generation
+        return conn
+
+    def putconn(self, conn: sqlite3.Connection) -> None:
+        """归还连接；文件已被替换或空闲连接已满时直接关闭"""
+        if conn.in_transaction:
+            conn.rollback()
+        with self._lock:
+            self._in_use -= 1
+            if self._generations.get(conn) == self._generation and len(self._idle) < self.size:
+                self._idle.append(conn)
+                return
+            self._generations.pop(conn, None)
+        conn.close()
+
+    @contextmanager
+    def connection(self):
+        """with pool.connection() as conn: ... 取出读连接，退出时 (包括异常) 归还"""
+        with phase("pool"):
+            conn = self.getconn()
+        try:
+            yield conn
+        finally:
+            self.putconn(conn)
+
+    def closeall(self) -> None:
+        with self._lock:
+            self._reset()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"idle": len(self._idle), "in_use": self._in_use, "max_idle": self.size, **self._counters}
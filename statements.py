@@ -0,0 +1,131 @@
+import hashlib
+import os
+import threading
+import weakref
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+from anime_queries import MAX_QUERY_SHAPES
+
+# STATEMENT_CACHE=prepare: 每个连接上 PREPARE 一次，之后 EXECUTE 复用解析与计划结果
+# STATEMENT_CACHE=client: 不在服务端保留状态，适用于事务级连接池 (PgBouncer / Vercel 的 POSTGRES_URL)
+# STATEMENT_CACHE=auto (默认): 连接串指向连接池时使用 client，否则使用 prepare
+STATEMENT_CACHE = os.getenv("STATEMENT_CACHE", "auto").lower()
+
+# invalid_sql_statement_name - 服务端连接已重建，预编译语句不存在
+UNDEFINED_STATEMENT = "26000"
+# duplicate_prepared_statement - 上次 PREPARE 成功但同一往返中的 EXECUTE 失败 (PREPARE 不随事务回滚)
+DUPLICATE_STATEMENT = "42P05"
+
+
+def is_pooled_url(database_url: Optional[str]) -> bool:
+    """连接串是否指向事务级连接池"""
+    if not database_url:
+        return False
+    return "pgbouncer=true" in database_url or "-pooler." in database_url
+
+
+def resolve_mode(database_url: Optional[str], pooled: bool = False) -> str:
+    """确定语句缓存模式；pooled 表示连接串来自 POSTGRES_URL 等连接池地址"""
+    if STATEMENT_CACHE in ("prepare", "client"):
+        return STATEMENT_CACHE
+    return "client" if pooled or is_pooled_url(database_url) else "prepare"
+
+
+def to_positional(sql: str) -> Tuple[str, int]:
+    """将 psycopg2 的 %s 占位符转换为 PREPARE 使用的 $1..$n，%% 还原为 %"""
+    parts = []
+    count = 0
+    i = 0
+    while i < len(sql):
+        if sql[i] == "%" and i + 1 < len(sql):
+            if sql[i + 1] == "s":
+                count += 1
+                parts.append(f"${count}")
+                i += 2
+                continue
+            if sql[i + 1] == "%":
+                parts.append("%")
+                i += 2
+                continue
+        parts.append(sql[i])
+        i += 1
+    return "".join(parts), count
+
+
+class Statement:
+    """一种查询形状: 名称、PREPARE 语句与对应的 EXECUTE 语句"""
+
+    def __init__(self, sql: str):
+        positional, self.param_count = to_positional(sql)
+        self.sql = sql
+        self.name = "anime_" + hashlib.sha1(sql.encode("utf-8")).hexdigest()[:16]
+        # PREPARE 与 EXECUTE 拼接后仍经过 psycopg2 参数替换，语句中的 % 需要转义
+        self.prepare_sql = f"PREPARE {self.name} AS {positional}".replace("%", "%%")
+        arguments = ", ".join(["%s"] * self.param_count)
+        self.execute_sql = f"EXECUTE {self.name} ({arguments})" if self.param_count else f"EXECUTE {self.name}"
+
+
+class StatementRegistry:
+    """按 SQL 文本登记查询形状，并记录每个连接上已经 PREPARE 过的语句
+
+    首次在某个连接上使用时，PREPARE 与 EXECUTE 在同一次往返中发送；之后只发送 EXECUTE。
+    client 模式下直接执行原始 SQL，不在服务端留下任何状态。
+    """
+
+    def __init__(self, mode: str = "prepare"):
+        self.mode = mode
+        self._statements: Dict[str, Statement] = {}
+        self._prepared = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+        self._counters = {"prepares": 0, "executions": 0, "reprepares": 0}
+
+    def statement(self, sql: str) -> Statement:
+        statement = self._statements.get(sql)
+        if statement is None:
+            with self._lock:
+                statement = self._statements.get(sql)
+                if statement is None:
+                    if len(self._statements) >= MAX_QUERY_SHAPES:
+                        self._statements.clear()
+                    statement = self._statements[sql] = Statement(sql)
+        return statement
+
+    def execute(self, cursor, sql: str, params: Optional[Sequence[Any]] = None) -> None:
+        """在 cursor 上执行查询，prepare 模式下复用该连接上的预编译语句"""
+        if self.mode != "prepare":
+            cursor.execute(sql, params)
+            return
+
+        statement = self.statement(sql)
+        conn = cursor.connection
+        with self._lock:
+            prepared = self._prepared.setdefault(conn, set())
+            self._counters["executions"] += 1
+
+        if statement.name in prepared:
+            try:
+                cursor.execute(statement.execute_sql, params)
+                return
+            except Exception as exc:
+                if getattr(exc, "pgcode", None) != UNDEFINED_STATEMENT:
+                    raise
+                # 服务端会话已更换 (例如连接被代理重建)，回滚失败的事务后重新 PREPARE
+                conn.rollback()
+                prepared.clear()
+                with self._lock:
+                    self._counters["reprepares"] += 1
+
+        try:
+            cursor.execute(f"{statement.prepare_sql}; {statement.execute_sql}", params)
+        except Exception as exc:
+            if getattr(exc, "pgcode", None) != DUPLICATE_STATEMENT:
+                raise
+            conn.rollback()
+            cursor.execute(statement.execute_sql, params)
+        prepared.add(statement.name)
+        with self._lock:
+            self._counters["prepares"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"mode": self.mode, "statements": len(self._statements), **self._counters}
@@ -0,0 +1,74 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("numpy")
+
+import server_timing  # noqa: E402
+from columnar import AnimeSnapshot, SnapshotEngine  # noqa: E402
+from pagination import decode_cursor  # noqa: E402
+
+# 数据库 (不区分大小写的排序规则) 返回的 ORDER BY title, id 顺序；码位顺序会把 "Banana" 排在最前
+ROWS = [
+    {"id": 4, "title": "apple"},
+    {"id": 2, "title": "Banana"},
+    {"id": 5, "title": "Banana"},
+    {"id": 1, "title": "cherry"},
+    {"id": 3, "title": "date"},
+]
+
+
+def _snapshot():
+    return AnimeSnapshot([{**row, "year": 2000, "average_rating": 8.0} for row in ROWS], (1, None))
+
+
+def _titles(snapshot, sort_order, page_size=10, position=None):
+    result = snapshot.query(1, page_size, None, None, None, None, None, "title", sort_order, position)
+    return [(row["title"], row["id"]) for row in result["data"]], result["next_cursor"]
+
+
+@pytest.mark.parametrize("sort_order", ["asc", "desc"])
+def test_title_order_follows_the_database_collation(sort_order):
+    expected = [(row["title"], row["id"]) for row in ROWS]
+    titles, _ = _titles(_snapshot(), sort_order)
+    assert titles == (expected if sort_order == "asc" else expected[::-1])
+
+
+@pytest.mark.parametrize("sort_order", ["asc", "desc"])
+def test_title_cursor_walk_matches_database_order(sort_order):
+    snapshot = _snapshot()
+    seen, cursor = _titles(snapshot, sort_order, page_size=2)
+    while cursor:
+        page, cursor = _titles(snapshot, sort_order, 2, decode_cursor(cursor, "title", sort_order))
+        seen += page
+    expected = [(row["title"], row["id"]) for row in ROWS]
+    assert seen == (expected if sort_order == "asc" else expected[::-1])
+
+
+def test_unknown_title_cursor_is_left_to_the_database():
+    assert _snapshot().query(1, 10, None, None, None, None, None, "title", "asc", ("blueberry", 9)) is None
+
+
+def test_background_refresh_does_not_record_into_the_triggering_request():
+    async def load_version():
+        with server_timing.phase("query"):
+            return (1, None)
+
+    async def load_rows():
+        with server_timing.phase("query"):
+            return [{**row, "year": 2000, "average_rating": 8.0} for row in ROWS]
+
+    async def request():
+        timing = server_timing.RequestTiming()
+        token = server_timing._current.set(timing)
+        try:
+            engine = SnapshotEngine()
+            engine.refresh_in_background(load_version, load_rows)
+            await engine._task
+        finally:
+            server_timing._current.reset(token)
+        return engine, timing
+
+    engine, timing = asyncio.run(request())
+    assert len(engine.snapshot) == len(ROWS)
+    assert not timing.phases
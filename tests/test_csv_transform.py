@@ -0,0 +1,24 @@
+from csv_transform import row_hashes, rows_to_batch, with_import_keys
+
+ROWS = [
+    ("anime", 2001, 7.5, 10, 20, 30, 0.5, "http://img"),
+    ("anime\t2", 0, 0.0, 0, 0, 0, 0.0, ""),
+]
+
+
+def test_row_hash_is_sha1_of_the_canonical_text():
+    """固定值: 已写入 anime_import_state 的哈希在升级 pandas 后仍然匹配"""
+    assert row_hashes(rows_to_batch(ROWS))[0] == 9163422453809137051
+
+
+def test_row_hash_does_not_depend_on_column_dtypes():
+    batch = rows_to_batch(ROWS)
+    narrow = batch.astype({"year": "int32", "rating_count": "int16", "average_rating": "float32"})
+    assert row_hashes(narrow) == row_hashes(batch)
+
+
+def test_import_keys_carry_bigint_row_hashes():
+    batch = next(with_import_keys([rows_to_batch(ROWS)]))
+    assert batch["row_hash"].dtype == "int64"
+    assert batch["row_hash"].tolist() == row_hashes(batch)
+    assert batch["row_hash"].nunique() == 2
@@ -0,0 +1,104 @@
+import base64
+import json
+import sqlite3
+
+import pytest
+
+from pagination import (
+    InvalidCursor, decode_cursor, encode_cursor, is_after, keyset_branches, keyset_page_query, order_clause,
+)
+
+# id, year (含 NULL)；重复的年份用于检验 (排序键, id) 的次级排序
+ROWS = [(1, 2011), (2, None), (3, 2011), (4, 2022), (5, None), (6, 1998), (7, 2022), (8, None), (9, 2005)]
+
+
+def _cursor(sort_by, value, sort_order="desc", last_id=5):
+    payload = {"s": sort_by, "o": sort_order, "v": value, "id": last_id}
+    return base64.urlsafe_b64encode(json.dumps(payload).encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def _expected_order(sort_order, nulls_high):
+    """数据库的排序结果: nulls_high 时 NULL 视为最大值 (PostgreSQL)，否则视为最小值 (SQLite)"""
+    def key(row):
+        row_id, year = row
+        null_rank = (year is None) == nulls_high
+        return (null_rank, year if year is not None else 0, row_id)
+    return [row_id for row_id, _ in sorted(ROWS, key=key, reverse=sort_order == "desc")]
+
+
+def test_cursor_round_trip():
+    token = encode_cursor("year", "desc", {"id": 7, "year": None})
+    assert decode_cursor(token, "year", "desc") == (None, 7)
+
+
+@pytest.mark.parametrize("sort_by, value", [
+    ("title", 5), ("title", None), ("title", [1]),
+    ("year", "x"), ("year", {}), ("year", [2011]), ("year", True),
+])
+def test_decode_cursor_rejects_values_of_the_wrong_type(sort_by, value):
+    with pytest.raises(InvalidCursor):
+        decode_cursor(_cursor(sort_by, value), sort_by, "desc")
+
+
+def test_decode_cursor_rejects_other_sort():
+    with pytest.raises(InvalidCursor):
+        decode_cursor(_cursor("year", 2011), "collections", "desc")
+
+
+@pytest.mark.parametrize("sort_order, nulls_high, value, expected", [
+    # NULL 排在最后: 非 NULL 游标之后还有整个 NULL 块
+    ("asc", True, 2011, [("after", 2011, 5), ("null",)]),
+    ("desc", False, 2011, [("after", 2011, 5), ("null",)]),
+    # NULL 排在最前: 非 NULL 游标之后只有更小 (或更大) 的值
+    ("desc", True, 2011, [("after", 2011, 5)]),
+    ("asc", False, 2011, [("after", 2011, 5)]),
+    # 游标位于 NULL 块中: NULL 块的剩余部分，NULL 在前时再接全部非 NULL 行
+    ("asc", True, None, [("null_after", 5)]),
+    ("desc", False, None, [("null_after", 5)]),
+    ("desc", True, None, [("null_after", 5), ("not_null",)]),
+    ("asc", False, None, [("null_after", 5), ("not_null",)]),
+])
+def test_keyset_branches_null_placement(sort_order, nulls_high, value, expected):
+    assert keyset_branches(sort_order, (value, 5), nulls_high) == expected
+
+
+def test_keyset_page_query_unions_branches_with_their_own_limit():
+    query, params = keyset_page_query("anime", "*", "TRUE", [], "year", "desc", (None, 5), 3, nulls_high=True)
+    assert query.count("LIMIT %s") == 3
+    assert "year IS NULL AND id < %s" in query
+    assert "year IS NOT NULL" in query
+    assert params == [5, 3, 3, 3]
+
+
+@pytest.mark.parametrize("sort_order", ["asc", "desc"])
+def test_keyset_page_query_walks_every_row_on_sqlite(sort_order):
+    """SQLite 中 NULL 最小 (nulls_high=False): 逐页翻完应与一次 ORDER BY 的结果完全一致"""
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE anime (id INTEGER PRIMARY KEY, year INTEGER)")
+    conn.executemany("INSERT INTO anime VALUES (?, ?)", ROWS)
+
+    first = conn.execute(f"SELECT id, year FROM anime ORDER BY {order_clause('year', sort_order)} LIMIT 2").fetchall()
+    seen = [row[0] for row in first]
+    position = (first[-1][1], first[-1][0])
+    while True:
+        query, params = keyset_page_query("anime", "id, year", "1 = 1", [], "year", sort_order, position, 2,
+                                          placeholder="?", nulls_high=False)
+        page = conn.execute(query, params).fetchall()
+        if not page:
+            break
+        seen += [row[0] for row in page]
+        position = (page[-1][1], page[-1][0])
+
+    assert seen == _expected_order(sort_order, nulls_high=False)
+
+
+@pytest.mark.parametrize("nulls_high", [True, False])
+@pytest.mark.parametrize("sort_order", ["asc", "desc"])
+def test_is_after_matches_database_null_ordering(sort_order, nulls_high):
+    """内存后备数据的游标判断与数据库的 NULL 位置一致: 每个位置之后恰好是排序结果中的其余行"""
+    order = _expected_order(sort_order, nulls_high)
+    years = dict(ROWS)
+    for index, row_id in enumerate(order):
+        after = [other for other in order
+                 if is_after({"id": other, "year": years[other]}, "year", sort_order, (years[row_id], row_id), nulls_high)]
+        assert after == order[index + 1:]
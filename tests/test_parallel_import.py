@@ -0,0 +1,24 @@
+import pandas as pd
+import pytest
+
+pytest.importorskip("psycopg2")
+
+from parallel_import import _count_rows, csv_partitions  # noqa: E402
+
+
+def test_partition_counts_skip_blank_lines_like_read_csv(tmp_path):
+    """分区行数之和等于 pandas 解析出的行数，空行与只含空白的行不会让后续分区的 id 偏移"""
+    lines = ["title,year"]
+    for i in range(500):
+        lines.append(f"anime {i},{2000 + i % 20}")
+        if i % 7 == 0:
+            lines.append("")
+        if i % 11 == 0:
+            lines.append("   ")
+    path = tmp_path / "anime.csv"
+    path.write_text("\n".join(lines) + "\n\n", encoding="utf-8")
+
+    header, ranges = csv_partitions(str(path), 4)
+    counts = [_count_rows((str(path), header, start, end)) for start, end in ranges]
+    assert len(counts) == 4
+    assert sum(counts) == len(pd.read_csv(path, dtype=str)) == 500
@@ -0,0 +1,55 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from response_cache import ResponseCache, VersionedResult
+
+
+def make_app(max_entries):
+    """数据库版本与快照版本分别可调的应用: 响应体始终出自快照"""
+    state = {"db": (1, None), "snapshot": (1, None)}
+    cache = ResponseCache(lambda: state["db"], max_entries=max_entries, generation_check=0)
+    app = FastAPI()
+
+    @app.get("/stats")
+    @cache.cached("/stats")
+    async def stats():
+        return VersionedResult({"version": state["snapshot"][0]}, state["snapshot"])
+
+    return TestClient(app), state
+
+
+def test_validators_follow_the_snapshot_that_built_the_body():
+    client, state = make_app(max_entries=0)
+    first = client.get("/stats")
+    assert first.json() == {"version": 1} and first.headers["etag"].startswith('"1-')
+
+    # 导入后数据库已是版本 2，快照仍是版本 1: ETag 仍标记版本 1
+    state["db"] = (2, None)
+    lagging = client.get("/stats")
+    assert lagging.json() == {"version": 1} and lagging.headers["etag"] == first.headers["etag"]
+    assert client.get("/stats", headers={"If-None-Match": first.headers["etag"]}).status_code == 304
+
+    # 快照追上后，旧 ETag 不再匹配
+    state["snapshot"] = (2, None)
+    fresh = client.get("/stats", headers={"If-None-Match": first.headers["etag"]})
+    assert fresh.status_code == 200
+    assert fresh.json() == {"version": 2} and fresh.headers["etag"].startswith('"2-')
+
+
+def test_bodies_from_a_lagging_snapshot_are_not_cached():
+    client, state = make_app(max_entries=16)
+    assert client.get("/stats").json() == {"version": 1}
+    assert client.get("/stats").headers["x-cache"] == "HIT"
+
+    # 数据库已是版本 2、快照仍是版本 1: 旧数据不得写入版本 2 的缓存
+    state["db"] = (2, None)
+    assert client.get("/stats").headers["x-cache"] == "MISS"
+    assert client.get("/stats").headers["x-cache"] == "MISS"
+
+    # 快照追上后第一次请求取得新数据，随后才命中缓存
+    state["snapshot"] = (2, None)
+    fresh = client.get("/stats")
+    assert fresh.json() == {"version": 2} and fresh.headers["x-cache"] == "MISS"
+    cached = client.get("/stats")
+    assert cached.json() == {"version": 2} and cached.headers["x-cache"] == "HIT"
+    assert cached.headers["etag"].startswith('"2-')
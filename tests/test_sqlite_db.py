@@ -0,0 +1,45 @@
+import sqlite3
+
+import pytest
+
+from db_schema import ANIME_INDEXES
+from sqlite_db import SQLITE_IMPORT_COLUMNS, build_snapshot, missing_indexes
+from sqlite_pool import SQLitePool
+
+ROWS = [(i, f"anime {i}", 2000 + i % 20, 7.0 + i % 3, i * 3, i * 7, i * 5, 0.5, "") for i in range(1, 201)]
+
+
+@pytest.fixture(scope="module")
+def snapshot(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("snapshot") / "anime.db")
+    build_snapshot(path, ROWS, SQLITE_IMPORT_COLUMNS)
+    conn = sqlite3.connect(f"file:{path}?mode=ro&immutable=1", uri=True)
+    yield conn
+    conn.close()
+
+
+def test_snapshot_has_every_index(snapshot):
+    assert missing_indexes(snapshot) == []
+
+
+@pytest.mark.parametrize("column", [columns.split(",")[0] for _, columns in ANIME_INDEXES])
+def test_snapshot_sorts_every_postgres_indexed_column_by_index(snapshot, column):
+    """与 PostgreSQL 的 ANIME_INDEXES 一致: 每个排序列的深分页按索引顺序读取，不在临时 B-tree 中排序"""
+    plan = " ".join(row[3] for row in snapshot.execute(
+        f"EXPLAIN QUERY PLAN SELECT * FROM anime ORDER BY {column} DESC, id DESC LIMIT 20 OFFSET 150"))
+    assert "USING INDEX" in plan
+    assert "TEMP B-TREE" not in plan
+
+
+def test_pool_connection_is_returned_when_the_query_fails(tmp_path):
+    path = str(tmp_path / "anime.db")
+    build_snapshot(path, ROWS, SQLITE_IMPORT_COLUMNS)
+    pool = SQLitePool(path, size=1)
+    with pytest.raises(sqlite3.OperationalError):
+        with pool.connection() as conn:
+            conn.execute("SELECT missing_column FROM anime")
+    assert pool.stats()["in_use"] == 0
+    with pool.connection():
+        assert pool.stats()["in_use"] == 1
+    assert pool.stats()["in_use"] == 0
+    pool.closeall()